@@ -21,4 +21,125 @@ OLLAMA_MODEL = os.getenv('OLLAMA_MODEL', 'llama2')
 DATABASE_URL = os.getenv('DATABASE_URL', f'sqlite:///{BASE_DIR}/data/reddit.db')
 
 # Search index settings
-WHOOSH_INDEX_DIR = os.path.join(BASE_DIR, 'data', 'search_index') 
\ No newline at end of file
+WHOOSH_INDEX_DIR = os.path.join(BASE_DIR, 'data', 'search_index') 
+
+# Comment summarization settings (map-reduce over comment threads)
+SUMMARY_COMMENTS_PER_POST = int(os.getenv('SUMMARY_COMMENTS_PER_POST', '20'))
+SUMMARY_CHUNK_CHARS = int(os.getenv('SUMMARY_CHUNK_CHARS', '3000'))
+SUMMARY_MAP_CONCURRENCY = int(os.getenv('SUMMARY_MAP_CONCURRENCY', '4'))
+COMMENT_DIGEST_CACHE_TTL = int(os.getenv('COMMENT_DIGEST_CACHE_TTL', '3600'))
+COMMENT_DIGEST_CACHE_SIZE = int(os.getenv('COMMENT_DIGEST_CACHE_SIZE', '512'))
+
+# Batch search settings
+OLLAMA_MAX_CONCURRENCY = int(os.getenv('OLLAMA_MAX_CONCURRENCY', '2'))
+MAX_BATCH_SEARCHES = int(os.getenv('MAX_BATCH_SEARCHES', '50'))
+
+# Response serialization settings
+RESPONSE_COMPRESSION_MIN_BYTES = int(os.getenv('RESPONSE_COMPRESSION_MIN_BYTES', '1024'))
+RESPONSE_COMPRESSION_LEVEL = int(os.getenv('RESPONSE_COMPRESSION_LEVEL', '5'))
+
+# Embedding settings
+EMBEDDING_BACKEND = os.getenv('EMBEDDING_BACKEND', 'default')  # default (ONNX MiniLM) or sentence-transformers
+EMBEDDING_MODEL = os.getenv('EMBEDDING_MODEL', 'sentence-transformers/all-MiniLM-L6-v2')
+EMBEDDING_BATCH_SIZE = int(os.getenv('EMBEDDING_BATCH_SIZE', '64'))
+EMBEDDING_THREADS = int(os.getenv('EMBEDDING_THREADS', '0'))  # 0 = let the runtime decide
+EMBEDDING_QUANTIZE = os.getenv('EMBEDDING_QUANTIZE', 'int8')  # int8 or none
+EMBEDDING_WARMUP = os.getenv('EMBEDDING_WARMUP', 'true').lower() == 'true'
+
+# Startup warmup settings
+OLLAMA_KEEP_ALIVE = os.getenv('OLLAMA_KEEP_ALIVE', '30m')
+WARMUP_OLLAMA = os.getenv('WARMUP_OLLAMA', 'true').lower() == 'true'
+WARMUP_REDDIT = os.getenv('WARMUP_REDDIT', 'true').lower() == 'true'
+
+# Vector index settings (HNSW parameters apply to newly created or compacted collections)
+HNSW_M = int(os.getenv('HNSW_M', '16'))
+HNSW_CONSTRUCTION_EF = int(os.getenv('HNSW_CONSTRUCTION_EF', '100'))
+HNSW_SEARCH_EF = int(os.getenv('HNSW_SEARCH_EF', '100'))
+
+# Vector index retention and compaction
+VECTOR_MAX_DOCUMENTS = int(os.getenv('VECTOR_MAX_DOCUMENTS', '200000'))  # 0 = unlimited
+VECTOR_MAX_AGE_DAYS = int(os.getenv('VECTOR_MAX_AGE_DAYS', '365'))  # 0 = keep forever
+VECTOR_COMPACTION_INTERVAL = int(os.getenv('VECTOR_COMPACTION_INTERVAL', '86400'))  # seconds, 0 = disabled
+
+# Reddit search streaming (pages are pulled per subreddit only while they can still change the top results)
+REDDIT_SEARCH_SORT = os.getenv('REDDIT_SEARCH_SORT', 'relevance')  # relevance, or top for exact early termination
+REDDIT_SEARCH_OVERFETCH = float(os.getenv('REDDIT_SEARCH_OVERFETCH', '2.0'))
+REDDIT_SEARCH_TIMEOUT = float(os.getenv('REDDIT_SEARCH_TIMEOUT', '10'))  # seconds
+
+# Default latency budget of a /search request when it doesn't set deadline_ms (0 = no deadline)
+SEARCH_DEADLINE_MS = int(os.getenv('SEARCH_DEADLINE_MS', '0'))
+
+# Circuit breakers for the Reddit API and JSON scraping backends
+CIRCUIT_FAILURE_RATE = float(os.getenv('CIRCUIT_FAILURE_RATE', '0.5'))
+CIRCUIT_WINDOW = int(os.getenv('CIRCUIT_WINDOW', '20'))  # recent calls considered
+CIRCUIT_MIN_CALLS = int(os.getenv('CIRCUIT_MIN_CALLS', '5'))
+CIRCUIT_RESET_SECONDS = float(os.getenv('CIRCUIT_RESET_SECONDS', '30'))
+CIRCUIT_SLOW_CALL_SECONDS = float(os.getenv('CIRCUIT_SLOW_CALL_SECONDS', '8'))  # slower calls count as failures
+REDDIT_HEDGE_REQUESTS = os.getenv('REDDIT_HEDGE_REQUESTS', 'true').lower() == 'true'
+REDDIT_HEDGE_MIN_DELAY = float(os.getenv('REDDIT_HEDGE_MIN_DELAY', '0.5'))  # seconds
+
+# HTTP response cache for /search, /summarize and /ask (also sent as Cache-Control max-age)
+RESPONSE_CACHE_TTL = int(os.getenv('RESPONSE_CACHE_TTL', '300'))  # seconds, 0 = disabled
+RESPONSE_CACHE_SIZE = int(os.getenv('RESPONSE_CACHE_SIZE', '256'))
+
+# Async database access (posts and comments are persisted by a single batching writer)
+PERSIST_RESULTS = os.getenv('PERSIST_RESULTS', 'true').lower() == 'true'
+DB_READ_POOL_SIZE = int(os.getenv('DB_READ_POOL_SIZE', '4'))
+DB_WRITE_BATCH_ROWS = int(os.getenv('DB_WRITE_BATCH_ROWS', '2000'))  # rows per write transaction
+DB_WRITE_BATCH_DELAY_MS = int(os.getenv('DB_WRITE_BATCH_DELAY_MS', '50'))  # wait for more writes to group
+
+# Semantic query cache (serves results of earlier queries with the same meaning)
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv('SEMANTIC_CACHE_THRESHOLD', '0.92'))  # cosine similarity
+SEMANTIC_CACHE_TTL = int(os.getenv('SEMANTIC_CACHE_TTL', '1800'))  # seconds, 0 = disabled
+SEMANTIC_CACHE_REFRESH_AFTER = int(os.getenv('SEMANTIC_CACHE_REFRESH_AFTER', '600'))  # refresh in the background after this
+SEMANTIC_CACHE_SIZE = int(os.getenv('SEMANTIC_CACHE_SIZE', '1000'))
+
+# Near-duplicate (crosspost / repost) elimination by SimHash of title and body
+DEDUPLICATE_POSTS = os.getenv('DEDUPLICATE_POSTS', 'true').lower() == 'true'
+SIMHASH_MAX_DISTANCE = int(os.getenv('SIMHASH_MAX_DISTANCE', '6'))  # differing bits out of 64
+
+# Summary context selection (maximal marginal relevance over the result embeddings)
+SUMMARY_MAX_POSTS = int(os.getenv('SUMMARY_MAX_POSTS', '5'))
+SUMMARY_TOKEN_BUDGET = int(os.getenv('SUMMARY_TOKEN_BUDGET', '1500'))  # estimated prompt tokens for all posts
+SUMMARY_POST_TOKENS = int(os.getenv('SUMMARY_POST_TOKENS', '400'))  # content of a single post is cut here
+SUMMARY_DIVERSITY = float(os.getenv('SUMMARY_DIVERSITY', '0.3'))  # 0 = pure relevance, 1 = pure novelty
+
+# Conversations about a single post (/summarize and /ask)
+POST_SESSION_TTL = int(os.getenv('POST_SESSION_TTL', '1800'))  # seconds without a question before a session is dropped
+POST_SESSION_CACHE_SIZE = int(os.getenv('POST_SESSION_CACHE_SIZE', '128'))
+POST_SESSION_MAX_TOKENS = int(os.getenv('POST_SESSION_MAX_TOKENS', '3500'))  # restart once the context grows past this
+POST_MAX_CHARS = int(os.getenv('POST_MAX_CHARS', '8000'))  # post body sent to the model
+
+# Incremental summary refresh (semantic cache refreshes update the previous summary)
+SUMMARY_INCREMENTAL_MAX_NEW = int(os.getenv('SUMMARY_INCREMENTAL_MAX_NEW', '2'))  # more new posts: regenerate
+SUMMARY_INCREMENTAL_MIN_OVERLAP = float(os.getenv('SUMMARY_INCREMENTAL_MIN_OVERLAP', '0.6'))  # share of posts kept
+
+# Subreddit watching: keep the index of these subreddits fresh by polling their new posts
+WATCHED_SUBREDDITS = [name.strip() for name in os.getenv('WATCHED_SUBREDDITS', '').split(',') if name.strip()]
+WATCH_MIN_INTERVAL = float(os.getenv('WATCH_MIN_INTERVAL', '30'))  # seconds between polls of one subreddit
+WATCH_MAX_INTERVAL = float(os.getenv('WATCH_MAX_INTERVAL', '900'))
+WATCH_TARGET_NEW_POSTS = int(os.getenv('WATCH_TARGET_NEW_POSTS', '25'))  # new posts per poll the interval aims for
+WATCH_REQUESTS_PER_MINUTE = int(os.getenv('WATCH_REQUESTS_PER_MINUTE', '30'))  # leaves room for live searches
+WATCH_BACKFILL_PAGES = int(os.getenv('WATCH_BACKFILL_PAGES', '3'))  # pages of 100 posts read back per poll at most
+WATCH_BATCH_SIZE = int(os.getenv('WATCH_BATCH_SIZE', '50'))  # posts per ingestion batch
+WATCH_FLUSH_SECONDS = float(os.getenv('WATCH_FLUSH_SECONDS', '10'))
+
+# Vector index snapshot a fresh instance bootstraps from when its collection is empty (see snapshot.py)
+VECTOR_SNAPSHOT_PATH = os.getenv('VECTOR_SNAPSHOT_PATH', '')
+
+# Request profiling (send "X-Debug-Profile: 1" or ?profile=1 to sample a request)
+PROFILE_SAMPLE_INTERVAL_MS = float(os.getenv('PROFILE_SAMPLE_INTERVAL_MS', '10'))
+PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', '0'))  # share of all requests sampled anyway
+SLOW_REQUEST_MS = float(os.getenv('SLOW_REQUEST_MS', '10000'))  # slower requests are kept with their trace, 0 = never
+TRACE_BUFFER_SIZE = int(os.getenv('TRACE_BUFFER_SIZE', '50'))  # traces kept on disk
+
+# Per-request memory budget
+POST_CONTENT_MAX_CHARS = int(os.getenv('POST_CONTENT_MAX_CHARS', '1000'))  # post body kept when fetching search results
+INDEX_POST_MAX_CHARS = int(os.getenv('INDEX_POST_MAX_CHARS', '40000'))  # post body kept for watched and bulk-ingested posts
+REQUEST_CONTENT_BUDGET_CHARS = int(os.getenv('REQUEST_CONTENT_BUDGET_CHARS', '30000'))  # post bodies in one search response, 0 = no limit
+SEARCH_MAX_LIMIT = int(os.getenv('SEARCH_MAX_LIMIT', '100'))  # largest result count a search may ask for
+MEMORY_TRACEMALLOC = os.getenv('MEMORY_TRACEMALLOC', 'false').lower() == 'true'  # also count Python allocations per stage (slower)
+
+# Admin endpoints (/admin/*) and request profiling are only available to this machine,
+# or to callers sending "Authorization: Bearer <ADMIN_TOKEN>" when it is set
+ADMIN_TOKEN = os.getenv('ADMIN_TOKEN', '')
@@ -2,6 +2,8 @@ from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, crea
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
+from typing import Any, Dict
+from app.config.settings import DATABASE_URL
 
 Base = declarative_base()
 
@@ -29,4 +31,43 @@ class RedditComment(Base):
     score = Column(Integer)
     created_at = Column(DateTime, default=datetime.utcnow)
     fetched_at = Column(DateTime, default=datetime.utcnow)
-    post = relationship("RedditPost", back_populates="comments") 
\ No newline at end of file
+    post = relationship("RedditPost", back_populates="comments")
+
+def get_engine(database_url: str = DATABASE_URL):
+    """Create a synchronous engine and make sure the tables exist."""
+    engine = create_engine(database_url)
+    Base.metadata.create_all(engine)
+    return engine
+
+def _to_datetime(timestamp: Any) -> datetime:
+    try:
+        return datetime.utcfromtimestamp(float(timestamp))
+    except (TypeError, ValueError):
+        return datetime.utcnow()
+
+def post_to_row(post) -> Dict[str, Any]:
+    """Map a ``Post`` record to a `posts` table row."""
+    return {
+        'id': post.id,
+        'title': post.title,
+        'content': post.content,
+        'subreddit': post.subreddit,
+        'author': post.author,
+        'score': int(post.score),
+        'url': post.url,
+        'created_at': _to_datetime(post.created_at) if post.created_at else datetime.utcnow(),
+        'fetched_at': datetime.utcnow()
+    }
+
+def comment_to_row(post_id: str, comment: Dict[str, Any]) -> Dict[str, Any]:
+    """Map a comment dict (as returned by ``RedditClient.get_post_comments``) to a `comments` table row."""
+    created_at = comment.get('created_at')
+    return {
+        'id': comment['id'],
+        'post_id': post_id,
+        'content': comment.get('content', ''),
+        'author': comment.get('author', ''),
+        'score': int(comment.get('score') or 0),
+        'created_at': _to_datetime(created_at) if created_at else datetime.utcnow(),
+        'fetched_at': datetime.utcnow()
+    }
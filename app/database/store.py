@@ -0,0 +1,216 @@
+import asyncio
+import os
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import Table, event, select
+from sqlalchemy.engine import URL, make_url
+
+from app.config.settings import DATABASE_URL, DB_READ_POOL_SIZE, DB_WRITE_BATCH_ROWS, DB_WRITE_BATCH_DELAY_MS
+from app.database.models import Base, RedditComment, RedditPost, comment_to_row, post_to_row
+
+# Async drivers for the synchronous URLs DATABASE_URL is written with
+_ASYNC_DRIVERS = {
+    'sqlite': 'sqlite+aiosqlite',
+    'postgresql': 'postgresql+asyncpg'
+}
+
+# Stay well below SQLite's bound parameter limit
+_ROWS_PER_STATEMENT = 500
+
+# Columns refreshed when a row that is already stored is written again
+_UPDATE_COLUMNS = {
+    'posts': ('title', 'content', 'score', 'fetched_at'),
+    'comments': ('content', 'score', 'fetched_at')
+}
+
+def to_async_url(database_url: str) -> URL:
+    """Switch a database URL to its async driver (sqlite:// -> sqlite+aiosqlite://)."""
+    url = make_url(database_url)
+    if '+' not in url.drivername and url.drivername in _ASYNC_DRIVERS:
+        url = url.set(drivername=_ASYNC_DRIVERS[url.drivername])
+    return url
+
+def _configure_sqlite(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    # WAL lets readers run while the writer commits; NORMAL sync is safe in WAL mode
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA busy_timeout=5000")
+    cursor.close()
+
+def _consume_exception(future: asyncio.Future):
+    # Writes are usually fire-and-forget; errors are logged by the writer
+    if not future.cancelled():
+        future.exception()
+
+class Database:
+    """Async access to the posts and comments tables.
+
+    Reads go through a small pool of connections. Writes are queued and applied by
+    a single writer task, which groups everything queued within
+    ``DB_WRITE_BATCH_DELAY_MS`` into one transaction of bulk upserts, so requests
+    never wait on (or fight over) SQLite's write lock. SQLite runs in WAL mode, so
+    reads are not blocked by the writer either.
+    """
+
+    def __init__(self, database_url: str = DATABASE_URL):
+        self.url = to_async_url(database_url)
+        self._read_engine = None
+        self._write_engine = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._writer_task: Optional[asyncio.Task] = None
+        self.rows_written = 0
+
+    async def start(self):
+        """Create the engines and tables and start the writer task."""
+        from sqlalchemy.ext.asyncio import create_async_engine
+        from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+        is_sqlite = self.url.get_backend_name() == 'sqlite'
+        if is_sqlite and self.url.database:
+            os.makedirs(os.path.dirname(os.path.abspath(self.url.database)), exist_ok=True)
+
+        # One connection for the single writer, a pool for concurrent readers
+        self._write_engine = create_async_engine(self.url, poolclass=AsyncAdaptedQueuePool, pool_size=1, max_overflow=0)
+        self._read_engine = create_async_engine(self.url, poolclass=AsyncAdaptedQueuePool, pool_size=DB_READ_POOL_SIZE)
+        if is_sqlite:
+            for engine in (self._write_engine, self._read_engine):
+                event.listen(engine.sync_engine, "connect", _configure_sqlite)
+
+        async with self._write_engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+        self._queue = asyncio.Queue()
+        self._writer_task = asyncio.create_task(self._writer())
+
+    async def close(self):
+        """Write everything still queued, then release all connections."""
+        if self._writer_task is not None:
+            self._queue.put_nowait(None)
+            try:
+                await asyncio.wait_for(self._writer_task, timeout=10)
+            except asyncio.TimeoutError:
+                print("Database writer did not finish in time, dropping queued writes")
+            self._writer_task = None
+        for engine in (self._write_engine, self._read_engine):
+            if engine is not None:
+                await engine.dispose()
+
+    def upsert_posts(self, posts: List[Any]) -> asyncio.Future:
+        """Queue ``Post`` records for writing; await the result to wait until they are committed."""
+        return self._enqueue(RedditPost.__table__, [post_to_row(post) for post in posts])
+
+    def upsert_comments(self, post_id: str, comments: List[Dict[str, Any]]) -> asyncio.Future:
+        """Queue the comments of a post for writing."""
+        return self._enqueue(RedditComment.__table__, [comment_to_row(post_id, comment) for comment in comments])
+
+    async def get_posts(self, ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Stored posts by id; ids that aren't stored are left out."""
+        table = RedditPost.__table__
+        found = {}
+        async with self._read_engine.connect() as conn:
+            for start in range(0, len(ids), _ROWS_PER_STATEMENT):
+                result = await conn.execute(select(table).where(table.c.id.in_(ids[start:start + _ROWS_PER_STATEMENT])))
+                for row in result.mappings():
+                    found[row['id']] = dict(row)
+        return found
+
+    async def get_comments(self, post_ids: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """Stored comments of each post, highest score first."""
+        table = RedditComment.__table__
+        found = {post_id: [] for post_id in post_ids}
+        async with self._read_engine.connect() as conn:
+            for start in range(0, len(post_ids), _ROWS_PER_STATEMENT):
+                result = await conn.execute(
+                    select(table)
+                    .where(table.c.post_id.in_(post_ids[start:start + _ROWS_PER_STATEMENT]))
+                    .order_by(table.c.score.desc())
+                )
+                for row in result.mappings():
+                    found[row['post_id']].append(dict(row))
+        return found
+
+    def _enqueue(self, table: Table, rows: List[Dict[str, Any]]) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        future.add_done_callback(_consume_exception)
+        if not rows:
+            future.set_result(0)
+        elif self._queue is None:
+            future.set_exception(RuntimeError("Database.start() has not been called"))
+        else:
+            self._queue.put_nowait((table, rows, future))
+        return future
+
+    async def _writer(self):
+        """Apply queued writes in batches, one transaction per batch."""
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            rows = len(item[1])
+
+            # Give concurrent requests a moment to add their writes to this transaction
+            deadline = loop.time() + DB_WRITE_BATCH_DELAY_MS / 1000
+            while rows < DB_WRITE_BATCH_ROWS:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+                rows += len(item[1])
+
+            await self._write_batch(batch)
+
+    async def _write_batch(self, batch: List[tuple]):
+        rows_by_table: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        tables = {}
+        for table, rows, _ in batch:
+            tables[table.name] = table
+            # Keyed by id so a post queued twice is written once, with its latest values
+            rows_by_table.setdefault(table.name, {}).update((row['id'], row) for row in rows)
+
+        written = 0
+        try:
+            async with self._write_engine.begin() as conn:
+                # Posts first, so the comments' post rows exist
+                for name in ('posts', 'comments'):
+                    rows = list(rows_by_table.get(name, {}).values())
+                    for start in range(0, len(rows), _ROWS_PER_STATEMENT):
+                        chunk = rows[start:start + _ROWS_PER_STATEMENT]
+                        await conn.execute(self._upsert_statement(tables[name], chunk))
+                        written += len(chunk)
+        except Exception as e:
+            print(f"Database write of {len(batch)} queued batches failed: {str(e)}")
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self.rows_written += written
+        for _, rows, future in batch:
+            if not future.done():
+                future.set_result(len(rows))
+
+    def _upsert_statement(self, table: Table, rows: List[Dict[str, Any]]):
+        dialect = self._write_engine.dialect.name
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        elif dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            raise NotImplementedError(f"Bulk upserts are not supported for {dialect}")
+
+        stmt = insert(table).values(rows)
+        return stmt.on_conflict_do_update(
+            index_elements=[table.c.id],
+            set_={column: stmt.excluded[column] for column in _UPDATE_COLUMNS[table.name]}
+        )
@@ -1,16 +1,37 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import Depends, FastAPI, HTTPException, Request, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse, FileResponse
+from fastapi.responses import HTMLResponse, FileResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from pydantic import BaseModel
-from typing import List, Optional
-from app.utils.reddit_client import RedditClient
+from pydantic import BaseModel, Field
+from typing import List, Optional, Tuple
+from app.utils.reddit_client import RedditClient, to_reddit_time_filter
 from app.utils.ollama_client import OllamaClient
 from app.utils.vector_store import VectorStore
+from app.utils.post import Post
+from app.database.store import Database
+from app.utils.deadline import Deadline
+from app.utils.http_cache import ResponseCache, make_etag, normalize_text
+from app.utils.query_cache import CachedResult, SemanticQueryCache
+from app.utils.serialization import dumps, json_response, parse_fields, project_posts
+from app.utils.watcher import SubredditWatcher
+from app.utils import profiling
+from app.utils.memory import apply_content_budget, current_rss_bytes, peak_rss_bytes
+from app.config.settings import (
+    BASE_DIR, WATCHED_SUBREDDITS, VECTOR_SNAPSHOT_PATH, PROFILE_SAMPLE_RATE, SLOW_REQUEST_MS,
+    OLLAMA_MAX_CONCURRENCY, MAX_BATCH_SEARCHES, EMBEDDING_WARMUP, WARMUP_OLLAMA, WARMUP_REDDIT,
+    VECTOR_COMPACTION_INTERVAL, SEARCH_DEADLINE_MS, PERSIST_RESULTS, SEMANTIC_CACHE_TTL,
+    SUMMARY_MAX_POSTS, SUMMARY_INCREMENTAL_MAX_NEW, SUMMARY_INCREMENTAL_MIN_OVERLAP,
+    SEARCH_MAX_LIMIT, MEMORY_TRACEMALLOC, REQUEST_CONTENT_BUDGET_CHARS, ADMIN_TOKEN
+)
 from datetime import datetime
+import asyncio
 import os
+import random
 import re
+import secrets
+import time
+import tracemalloc
 
 app = FastAPI(title="Reddit Search & Summarization")
 
@@ -45,44 +66,357 @@ async def favicon():
     
     return FileResponse(favicon_path)
 
-# Initialize clients
-reddit_client = RedditClient()
-ollama_client = OllamaClient()
-vector_store = VectorStore()
+# Clients are created in startup_event, so importing the app stays cheap
+reddit_client: RedditClient = None
+ollama_client: OllamaClient = None
+vector_store: VectorStore = None
+database: Database = None
+semantic_cache: SemanticQueryCache = None
+watcher: SubredditWatcher = None
+
+# Progress of the startup warmup (stage durations in ms), reported by /ready
+warmup_state = {"ready": False, "stages": {}, "errors": {}}
+_warmup_task = None
+_compaction_task = None
+
+# Background admin jobs by name: their task and last outcome, reported by /admin/index
+admin_jobs = {}
+
+# Finished responses of /search, /summarize and /ask, keyed on normalized requests
+response_cache = ResponseCache()
+
+def _is_admin(request: Request) -> bool:
+    """Whether the caller is on this machine or sent the admin token (the server may run with --public)."""
+    authorization = request.headers.get("authorization", "")
+    if ADMIN_TOKEN and secrets.compare_digest(authorization.encode(), f"Bearer {ADMIN_TOKEN}".encode()):
+        return True
+    host = request.client.host if request.client else None
+    return host in ("127.0.0.1", "::1", "localhost")
+
+def require_admin(request: Request):
+    if not _is_admin(request):
+        raise HTTPException(status_code=403, detail="Admin actions are only allowed locally or with the admin token.")
+
+# Traces of slow and explicitly profiled requests
+trace_store = profiling.TraceStore(os.path.join(BASE_DIR, "data", "traces"))
+
+# Fire-and-forget work, referenced until it is done so it isn't garbage collected
+_background_tasks = set()
+
+def _run_in_background(coro, description: str) -> asyncio.Task:
+    """Start a task without waiting for it, logging it if it fails."""
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    
+    def finished(task: asyncio.Task):
+        _background_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            print(f"{description} failed: {str(task.exception())}")
+    
+    task.add_done_callback(finished)
+    return task
+
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    """Record the stage timeline of every request; keep the slow and profiled ones.
+    
+    ``X-Debug-Profile: 1`` (or ``?profile=1``) also samples the request's stacks,
+    and returns its stage durations in ``Server-Timing`` and its id in ``X-Trace-Id``.
+    The flag is only honored for admin callers, so others can't force profiling overhead.
+    """
+    if request.url.path.startswith(("/static", "/admin/traces")):
+        return await call_next(request)
+    
+    requested = (
+        (request.headers.get("x-debug-profile") == "1" or request.query_params.get("profile") == "1")
+        and _is_admin(request)
+    )
+    sampling = requested or random.random() < PROFILE_SAMPLE_RATE
+    with profiling.trace_request(request.method, request.url.path, sampling=sampling) as trace:
+        response = await call_next(request)
+    trace.finish(response.status_code)
+    
+    if requested:
+        response.headers["X-Trace-Id"] = trace.id
+        response.headers["Server-Timing"] = trace.server_timing()
+    if sampling or (SLOW_REQUEST_MS > 0 and trace.total_ms >= SLOW_REQUEST_MS):
+        if not sampling:
+            print(f"Slow request {request.method} {request.url.path}: {trace.total_ms}ms (trace {trace.id})")
+        _run_in_background(asyncio.to_thread(trace_store.save, trace), f"Saving trace {trace.id}")
+    return response
+
+async def _warmup_stage(name: str, func):
+    """Run one warmup stage, recording how long it took or why it failed."""
+    started = time.perf_counter()
+    try:
+        result = func()
+        if asyncio.iscoroutine(result):
+            await result
+        warmup_state["stages"][name] = round((time.perf_counter() - started) * 1000, 1)
+        print(f"Warmup stage '{name}' done in {warmup_state['stages'][name]}ms")
+    except Exception as e:
+        warmup_state["errors"][name] = str(e)
+        print(f"Warmup stage '{name}' failed: {str(e)}")
+
+async def _warm_vector_store():
+    if VECTOR_SNAPSHOT_PATH and os.path.exists(VECTOR_SNAPSHOT_PATH):
+        # A new replica loads a snapshot instead of starting cold
+        count = await asyncio.to_thread(vector_store.collection.count)
+        if count == 0:
+            await _warmup_stage(
+                "vector_snapshot", lambda: asyncio.to_thread(vector_store.import_snapshot, VECTOR_SNAPSHOT_PATH)
+            )
+    if EMBEDDING_WARMUP:
+        # Load the embedding model and run a dummy inference
+        await _warmup_stage("embedding_model", lambda: asyncio.to_thread(vector_store.warmup))
+    # Documents indexed before subreddit filtering existed can't be found by scoped searches until backfilled
+    await _warmup_stage("filter_keys", lambda: asyncio.to_thread(vector_store.backfill_filter_keys))
+    # Load the HNSW index from disk
+    await _warmup_stage("vector_index", lambda: asyncio.to_thread(vector_store.warmup_index))
+
+async def _run_warmup():
+    """Warm every slow dependency in parallel, off the request path."""
+    started = time.perf_counter()
+    stages = [_warm_vector_store()]
+    if WARMUP_OLLAMA:
+        # Loads the model into Ollama's memory and primes the connection pool
+        stages.append(_warmup_stage("ollama_model", ollama_client.preload))
+    if WARMUP_REDDIT:
+        stages.append(_warmup_stage("reddit_api", reddit_client.prime))
+    await asyncio.gather(*stages)
+    
+    warmup_state["total_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    warmup_state["ready"] = True
+    print(f"Warmup finished in {warmup_state['total_ms']}ms")
 
 # Add startup and shutdown events
 @app.on_event("startup")
 async def startup_event():
     """Initialize clients and resources on application startup."""
+    global reddit_client, ollama_client, vector_store, database, semantic_cache, watcher, _warmup_task, _compaction_task
     print("Starting up Reddit Agent application...")
-    # Clients are already initialized, no additional action needed
+    
+    started = time.perf_counter()
+    # Tasks created while serving a profiled request are sampled along with it
+    profiling.install(asyncio.get_running_loop())
+    if MEMORY_TRACEMALLOC and not tracemalloc.is_tracing():
+        # Counts the Python allocations of every request stage, at some CPU cost
+        tracemalloc.start()
+    reddit_client = RedditClient()
+    ollama_client = OllamaClient()
+    vector_store = await asyncio.to_thread(VectorStore)
+    if SEMANTIC_CACHE_TTL > 0:
+        # Queries are embedded with the same model as the posts
+        semantic_cache = SemanticQueryCache(vector_store.embed_documents)
+    if PERSIST_RESULTS:
+        try:
+            database = Database()
+            await database.start()
+        except Exception as e:
+            # Persistence is optional, searches work without it
+            print(f"Database unavailable, fetched posts won't be persisted: {str(e)}")
+            database = None
+    warmup_state["stages"]["clients"] = round((time.perf_counter() - started) * 1000, 1)
+    
+    # Warm up in the background; /ready reports when it is done
+    _warmup_task = asyncio.create_task(_run_warmup())
+    
+    if VECTOR_COMPACTION_INTERVAL > 0:
+        _compaction_task = asyncio.create_task(_compaction_loop())
+    
+    if WATCHED_SUBREDDITS:
+        # Keep the watched subreddits indexed so searches in them don't call Reddit
+        watcher = SubredditWatcher(
+            reddit_client,
+            WATCHED_SUBREDDITS,
+            _ingest_watched_posts,
+            cursor_path=os.path.join(BASE_DIR, "data", "watch_cursors.json")
+        )
+        watcher.start()
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Clean up resources on application shutdown."""
     print("Shutting down Reddit Agent application...")
+    for task in (_warmup_task, _compaction_task):
+        if task and not task.done():
+            task.cancel()
+    if watcher is not None:
+        await watcher.stop()
     # Properly close the Reddit client session
     await reddit_client.close()
+    await ollama_client.close()
+    if database is not None:
+        await database.close()
     print("Resources cleaned up successfully")
 
+async def _compaction_loop():
+    """Periodically apply retention policies and rebuild the vector index."""
+    while True:
+        await asyncio.sleep(VECTOR_COMPACTION_INTERVAL)
+        try:
+            # Compaction is blocking Chroma work, keep it off the event loop
+            await asyncio.to_thread(vector_store.compact)
+        except Exception as e:
+            print(f"Vector index compaction failed: {str(e)}")
+
+def _job_state(name: str) -> dict:
+    job = admin_jobs.get(name)
+    return {key: value for key, value in job.items() if key != "task"} if job else {"status": "never_run"}
+
+def _start_admin_job(name: str, func, *args) -> dict:
+    """Run a blocking admin job in a worker thread, keeping its task and recording how it ended."""
+    job = admin_jobs.get(name)
+    if job is not None and job["status"] == "running":
+        return _job_state(name)
+    
+    task = asyncio.create_task(asyncio.to_thread(func, *args))
+    job = {"task": task, "status": "running", "started_at": datetime.now().isoformat()}
+    admin_jobs[name] = job
+    
+    def finished(task: asyncio.Task):
+        job["finished_at"] = datetime.now().isoformat()
+        if task.cancelled():
+            job["status"] = "cancelled"
+        elif task.exception() is not None:
+            job["status"] = "failed"
+            job["error"] = str(task.exception())
+            print(f"Admin job '{name}' failed: {job['error']}")
+        else:
+            job["status"] = "finished"
+            job["result"] = task.result()
+    
+    task.add_done_callback(finished)
+    return _job_state(name)
+
+@app.get("/admin/index", dependencies=[Depends(require_admin)])
+async def index_stats():
+    """Vector index size, memory estimate, last compaction result and the state of admin jobs."""
+    stats = await asyncio.to_thread(vector_store.index_stats)
+    stats["jobs"] = {name: _job_state(name) for name in ("compaction", "snapshot")}
+    return json_response(stats)
+
+@app.post("/admin/index/compact", status_code=202, dependencies=[Depends(require_admin)])
+async def compact_index(force: bool = False):
+    """Start a compaction in the background (``force`` rebuilds even if nothing changed)."""
+    return json_response(_start_admin_job("compaction", vector_store.compact, force), status_code=202)
+
+@app.post("/admin/index/snapshot", status_code=202, dependencies=[Depends(require_admin)])
+async def snapshot_index():
+    """Export a consistent snapshot of the vector index in the background, for new replicas to import."""
+    path = VECTOR_SNAPSHOT_PATH or os.path.join(BASE_DIR, "data", "snapshots", "latest")
+    return json_response({**_start_admin_job("snapshot", vector_store.export_snapshot, path), "path": path}, status_code=202)
+
+@app.get("/admin/reddit", dependencies=[Depends(require_admin)])
+async def reddit_health():
+    """Circuit breaker state and recent latency of the Reddit API and scraping backends."""
+    return json_response(reddit_client.backend_health())
+
+@app.get("/admin/watch", dependencies=[Depends(require_admin)])
+async def watch_status():
+    """Poll interval, post rate and cursor of each watched subreddit."""
+    return json_response(watcher.snapshot() if watcher is not None else {})
+
+@app.get("/admin/ollama", dependencies=[Depends(require_admin)])
+async def ollama_stats():
+    """Query rewrite fallback rate and token cost of each kind of generation."""
+    return json_response(ollama_client.generation_stats())
+
+@app.get("/admin/memory", dependencies=[Depends(require_admin)])
+async def memory_stats():
+    """Current and peak RSS of the process, and the memory accounting of each request stage."""
+    stats = {
+        "rss_bytes": current_rss_bytes(),
+        "peak_rss_bytes": peak_rss_bytes(),
+        "stages": profiling.stage_memory.snapshot()
+    }
+    if tracemalloc.is_tracing():
+        allocated, peak = tracemalloc.get_traced_memory()
+        stats["python_allocated_bytes"] = allocated
+        stats["python_peak_allocated_bytes"] = peak
+    return json_response(stats)
+
+@app.get("/admin/traces", dependencies=[Depends(require_admin)])
+async def list_traces():
+    """Stored traces of slow and profiled requests, newest first."""
+    return json_response(await asyncio.to_thread(trace_store.list))
+
+@app.get("/admin/traces/{trace_id}", dependencies=[Depends(require_admin)])
+async def get_trace(trace_id: str):
+    """Download a trace: its stage timeline and sampled stacks (collapsed, flamegraph-ready)."""
+    path = trace_store.path_of(trace_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Trace not found")
+    return FileResponse(path, media_type="application/json", filename=os.path.basename(path))
+
+@app.get("/ready")
+async def ready():
+    """Readiness probe: 200 once warmup has finished, 503 while it is still running."""
+    return json_response(warmup_state, status_code=200 if warmup_state["ready"] else 503)
+
 # Templates
 templates = Jinja2Templates(directory="app/templates")
 
 class SearchRequest(BaseModel):
     query: str
     subreddit: Optional[str] = None
-    limit: Optional[int] = 10
+    # Bounded so one request can't pull an arbitrary number of posts into memory
+    limit: Optional[int] = Field(10, gt=0, le=SEARCH_MAX_LIMIT)
     model: Optional[str] = "llama2"
+    include_comments: Optional[bool] = False
+    # Latency budget in milliseconds; stages that run out of time return partial results
+    deadline_ms: Optional[int] = Field(None, gt=0)
+
+class PostModel(BaseModel):
+    id: str
+    title: str
+    content: str
+    author: str
+    subreddit: str
+    score: float
+    url: str
+    created_at: float
+    num_comments: int
+    # Unknown for posts indexed before these fields were stored
+    upvote_ratio: Optional[float] = None
+    is_self: Optional[bool] = None
+    is_original_content: bool
+    has_awards: bool
+    link_flair_text: Optional[str] = None
+    domain: Optional[str] = None
+    relevance_score: float
+    engagement_score: float
+    time_relevance: float
+    similarity: Optional[float] = None
+
+POST_FIELDS = set(PostModel.__annotations__)
+
+class SearchMetadata(BaseModel):
+    total_posts_found: int
+    processing_approach: str
+    subreddit: Optional[str] = None
+    timestamp: str
+    truncated_stages: List[str] = []
+    # Set when the result was served for an earlier query with the same meaning
+    cached_query: Optional[str] = None
+    cache_similarity: Optional[float] = None
+    # How the summary was made: full, incremental (earlier summary updated), reused or extractive
+    summary_mode: Optional[str] = None
 
 class SearchResponse(BaseModel):
     original_query: str
     rewritten_query: str
-    posts: List[dict]
+    posts: List[PostModel]
     summary: str
+    metadata: Optional[SearchMetadata] = None
+
+class BatchSearchRequest(BaseModel):
+    requests: List[SearchRequest]
 
 class QuestionRequest(BaseModel):
     post_id: str
     question: str
+    model: Optional[str] = None
 
 @app.get("/", response_class=HTMLResponse)
 async def home():
@@ -111,8 +445,198 @@ async def home():
     </html>
     """
 
+def _extract_query_filters(query: str):
+    """Extract an explicit subreddit and a time period from the raw query."""
+    # Look for subreddit mentions with case preservation
+    subreddit_from_query = None
+    subreddit_match = re.search(r'(?:r/|subreddit\s+)(\w+)', query, re.IGNORECASE)
+    if subreddit_match:
+        # Get the original capitalization from the match
+        subreddit_from_query = subreddit_match.group(1)
+        # For the special case of "cooking", capitalize to "Cooking" which is the correct Reddit name
+        if subreddit_from_query.lower() == "cooking":
+            subreddit_from_query = "Cooking"
+    
+    # Extract time period from query for time-sensitive searches
+    time_period = None
+    time_match = re.search(r'\b(today|yesterday|this week|this month|recent|latest|new)\b', query, re.IGNORECASE)
+    if time_match:
+        time_period = time_match.group(1).lower()
+    
+    return subreddit_from_query, time_period
+
+def _posts_for_summary(posts: List[Post], similar_posts: List[Post]) -> List[Post]:
+    """Pick the posts to summarize, preferring semantically similar ones.
+    
+    The vector store already returns a relevant, diverse set that fits the
+    summary token budget, in the order it should be presented.
+    """
+    return similar_posts if similar_posts else _basic_ranking(posts)
+
+def _basic_ranking(posts: List[Post]) -> List[Post]:
+    """Fallback ranking used when the vector store is unavailable."""
+    return sorted(
+        posts[:SUMMARY_MAX_POSTS],
+        key=lambda x: float(x.score) + float(x.num_comments) * 2,
+        reverse=True
+    )
+
+def _build_search_response(request: SearchRequest, rewritten_query: str, posts: List[Post],
+                           posts_for_summary: List[Post], similar_posts: List[Post], summary: str,
+                           truncated_stages: List[str] = None, summary_mode: str = "full") -> dict:
+    # Posts are only converted to plain dicts here, at the response boundary. The
+    # copies share the per-request content budget; the indexed posts stay whole.
+    post_dicts = [post.to_dict() for post in posts_for_summary]
+    apply_content_budget(post_dicts, REQUEST_CONTENT_BUDGET_CHARS)
+    return {
+        "original_query": request.query,
+        "rewritten_query": rewritten_query,
+        "posts": post_dicts,
+        "summary": summary,
+        "metadata": {
+            "total_posts_found": len(posts),
+            "processing_approach": "semantic_search" if similar_posts else "basic_ranking",
+            "subreddit": request.subreddit,
+            "timestamp": datetime.now().isoformat(),
+            "truncated_stages": truncated_stages or [],
+            "summary_mode": summary_mode
+        }
+    }
+
+def _empty_search_response(request: SearchRequest, rewritten_query: str, truncated_stages: List[str] = None) -> dict:
+    return {
+        "original_query": request.query,
+        "rewritten_query": rewritten_query,
+        "posts": [],
+        "summary": "No relevant discussions found. Try adjusting your search terms or exploring a different subreddit.",
+        "metadata": {
+            "total_posts_found": 0,
+            "processing_approach": "none",
+            "subreddit": request.subreddit,
+            "timestamp": datetime.now().isoformat(),
+            "truncated_stages": truncated_stages or []
+        }
+    }
+
+def _is_cacheable(payload: dict) -> bool:
+    """Whether a search result may be reused: complete, and with a generated summary."""
+    metadata = payload["metadata"]
+    return not metadata["truncated_stages"] and metadata.get("summary_mode") != "extractive"
+
+def _search_json_response(payload: dict, http_request: Request, fields: List[str]):
+    """Serialize a search payload with the fast encoder, applying field projection."""
+    etag = make_etag([post["id"] for post in payload["posts"]], payload["summary"], *fields)
+    if fields:
+        payload = {**payload, "posts": project_posts(payload["posts"], fields)}
+    return response_cache.respond(http_request, etag, payload, cacheable=_is_cacheable(payload))
+
+def _search_cache_key(request: SearchRequest):
+    return ResponseCache.make_key("search", {
+        "query": normalize_text(request.query),
+        "subreddit": normalize_text(request.subreddit),
+        "limit": request.limit,
+        "model": request.model,
+        "include_comments": bool(request.include_comments)
+    })
+
+def _parse_post_fields(fields: Optional[str]) -> List[str]:
+    requested = parse_fields(fields)
+    unknown = [field for field in requested if field not in POST_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown post fields: {', '.join(unknown)}")
+    return requested
+
+def _fallback_summary(posts_for_summary: List[Post]) -> str:
+    """Extractive stand-in for the LLM summary when synthesis fails or runs out of time."""
+    lines = ["The summary could not be generated. The most relevant discussions are:"]
+    for post in posts_for_summary[:5]:
+        lines.append(f"- {post.title} (r/{post.subreddit}, score {post.score:g}): {post.url}")
+    return "\n".join(lines)
+
+def _index_and_search(posts: List[Post], query: str, subreddit: Optional[str], time_filter: Optional[str]) -> List[Post]:
+    """Store posts and find the most similar ones (blocking; run in a worker thread)."""
+    # Store posts with enhanced metadata
+    vector_store.add_posts(posts)
+    
+    # Find semantically similar posts with improved ranking, scoped to the
+    # requested subreddit and time window
+    print("Finding most relevant discussions...")
+    return vector_store.search_similar(query, subreddit=subreddit, time_filter=time_filter)
+
+async def _ingest_watched_posts(posts: List[Post]):
+    """Index and persist a micro-batch of new posts from the watched subreddits."""
+    _persist_posts(posts)
+    await asyncio.to_thread(vector_store.add_posts, posts)
+
+def _persist_posts(posts: List[Post]):
+    """Queue fetched posts for the database writer without waiting for the write."""
+    if database is not None and posts:
+        database.upsert_posts(posts)
+
+async def _fetch_comments(post_id: str, limit: int = 10) -> List[dict]:
+    """Fetch the top comments of a post and queue them for the database writer."""
+    comments = await reddit_client.get_post_comments(post_id, limit=limit)
+    if database is not None and comments:
+        database.upsert_comments(post_id, comments)
+    return comments
+
+async def _summarize(request: SearchRequest, posts_for_summary: List[Post]) -> str:
+    if request.include_comments:
+        # Map-reduce over the top comments of each post
+        return await ollama_client.synthesize_answer_with_comments(
+            request.query,
+            posts_for_summary,
+            _fetch_comments,
+            model=request.model
+        )
+    return await ollama_client.synthesize_answer(
+        request.query,
+        posts_for_summary,
+        model=request.model
+    )
+
+def _summary_delta(previous: dict, posts_for_summary: List[Post]) -> Optional[Tuple[List[Post], List[str]]]:
+    """New posts and the titles of dropped ones since an earlier result, or None if too much changed."""
+    previous_posts = {post["id"]: post for post in previous["posts"]}
+    new_posts = [post for post in posts_for_summary if post.id not in previous_posts]
+    current_ids = {post.id for post in posts_for_summary}
+    dropped_titles = [post["title"] for post_id, post in previous_posts.items() if post_id not in current_ids]
+    
+    kept = len(posts_for_summary) - len(new_posts)
+    if len(new_posts) > SUMMARY_INCREMENTAL_MAX_NEW or kept < SUMMARY_INCREMENTAL_MIN_OVERLAP * len(posts_for_summary):
+        return None
+    return new_posts, dropped_titles
+
+async def _synthesize(request: SearchRequest, posts_for_summary: List[Post], previous: dict = None) -> Tuple[str, str]:
+    """Summary of the posts and how it was made.
+    
+    When refreshing an earlier result whose posts mostly stayed the same, the
+    earlier summary is updated with just the new posts (or reused as is when the
+    posts did not change) instead of being generated again.
+    """
+    # Only a generated summary is worth keeping; an extractive stand-in is always regenerated
+    real_summary = previous is not None and previous["metadata"].get("summary_mode") in ("full", "incremental", "reused")
+    if real_summary and not request.include_comments:
+        delta = _summary_delta(previous, posts_for_summary)
+        if delta is not None:
+            new_posts, dropped_titles = delta
+            if not new_posts and not dropped_titles:
+                return previous["summary"], "reused"
+            try:
+                summary = await ollama_client.update_summary(
+                    request.query, previous["summary"], new_posts, dropped_titles, model=request.model
+                )
+                return summary, "incremental"
+            except Exception as e:
+                print(f"Incremental summary update failed, regenerating: {str(e)}")
+    return await _summarize(request, posts_for_summary), "full"
+
 @app.post("/search", response_model=SearchResponse)
-async def search(request: SearchRequest):
+async def search(
+    request: SearchRequest,
+    http_request: Request,
+    fields: Optional[str] = Query(None, description="Comma-separated post fields to return, e.g. id,title,url")
+):
     """Search Reddit posts and generate a comprehensive summary.
     
     This endpoint provides:
@@ -120,142 +644,357 @@ async def search(request: SearchRequest):
     2. Enhanced relevance using semantic search
     3. Time-saving summaries of discussions
     4. Privacy-conscious local processing
+    
+    The response is serialized directly (orjson when available) rather than
+    re-validated through ``SearchResponse``, and is gzip/brotli compressed when
+    the client sends a matching ``Accept-Encoding``. Finished results are cached
+    per normalized request and carry an ETag, so polling clients can revalidate
+    with ``If-None-Match`` and get a 304.
     """
-    try:
-        # Extract subreddit from query if specified but not provided as a parameter
-        subreddit_from_query = None
-        if not request.subreddit:
-            # Look for subreddit mentions with case preservation
-            subreddit_match = re.search(r'(?:r/|subreddit\s+)(\w+)', request.query, re.IGNORECASE)
-            if subreddit_match:
-                # Get the original capitalization from the match
-                subreddit_from_query = subreddit_match.group(1)
-                # For the special case of "cooking", capitalize to "Cooking" which is the correct Reddit name
-                if subreddit_from_query.lower() == "cooking":
-                    subreddit_from_query = "Cooking"
-                print(f"Extracted subreddit from query: r/{subreddit_from_query}")
-        
-        # Extract time period from query for time-sensitive searches
-        time_period = None
-        if re.search(r'\b(today|yesterday|this week|this month|recent|latest|new)\b', request.query, re.IGNORECASE):
-            time_match = re.search(r'\b(today|yesterday|this week|this month|recent|latest|new)\b', request.query, re.IGNORECASE)
-            if time_match:
-                time_period = time_match.group(1).lower()
-                print(f"Detected time period in query: {time_period}")
-        
-        # 1. Rewrite the query using LLM for better content discovery
-        print(f"Optimizing search query using {request.model}...")
-        rewritten_query = await ollama_client.rewrite_query(request.query, model=request.model)
-        print(f"Using search terms: \"{rewritten_query}\"")
-        
-        # 2. Fetch posts from Reddit with enhanced metadata
-        print("Discovering relevant content from Reddit...")
-        posts = await reddit_client.search_posts(
-            query=rewritten_query,
-            subreddit=request.subreddit or subreddit_from_query,
-            limit=request.limit,
-            time_filter=time_period
-        )
-        print(f"Found {len(posts)} relevant discussions")
-        
-        if not posts:
-            return {
-                "original_query": request.query,
-                "rewritten_query": rewritten_query,
-                "posts": [],
-                "summary": "No relevant discussions found. Try adjusting your search terms or exploring a different subreddit."
-            }
-        
-        # 3. Process posts through vector store for semantic relevance
-        print("Analyzing content relevance...")
+    post_fields = _parse_post_fields(fields)
+    cache_key = _search_cache_key(request)
+    payload = response_cache.get(cache_key)
+    if payload is None:
         try:
-            # Store posts with enhanced metadata
-            vector_store.add_posts(posts)
-            
-            # Find semantically similar posts with improved ranking
-            print("Finding most relevant discussions...")
-            similar_posts = vector_store.search_similar(rewritten_query)
-            print(f"Identified {len(similar_posts)} highly relevant discussions")
-            
-            # Use similar posts if available, otherwise use top posts
-            posts_for_summary = similar_posts if similar_posts else posts[:5]
-            
-            # Sort posts by engagement and relevance
-            posts_for_summary.sort(
-                key=lambda x: (
-                    x.get('similarity', 0) * 0.6 +  # 60% weight on semantic similarity
-                    x.get('engagement_score', 0) * 0.3 +  # 30% weight on engagement
-                    x.get('time_relevance', 0) * 0.1  # 10% weight on recency
-                ),
-                reverse=True
-            )
-            
+            payload = await _search_with_semantic_cache(request)
         except Exception as e:
-            print(f"Vector store processing error: {str(e)}")
-            # Fallback to basic post ranking if vector store fails
-            posts_for_summary = sorted(
-                posts[:5],
-                key=lambda x: float(x.get('score', 0)) + float(x.get('num_comments', 0)) * 2,
-                reverse=True
+            print(f"Search error: {str(e)}")
+            raise HTTPException(
+                status_code=500,
+                detail="An error occurred while processing your search. Please try again."
             )
-        
-        # 4. Generate comprehensive summary using LLM
-        print(f"Synthesizing insights using {request.model}...")
-        summary = await ollama_client.synthesize_answer(
-            request.query,
-            posts_for_summary,
-            model=request.model
-        )
-        
-        # 5. Return enhanced response with metadata
+        # Partial and degraded results are returned but never reused
+        if _is_cacheable(payload):
+            response_cache.set(cache_key, payload)
+    return _search_json_response(payload, http_request, post_fields)
+
+def _semantic_scope(request: SearchRequest) -> tuple:
+    """Requests only share semantically cached results within the same scope."""
+    subreddit_from_query, time_period = _extract_query_filters(request.query)
+    subreddit = request.subreddit or subreddit_from_query
+    return (
+        normalize_text(subreddit),
+        to_reddit_time_filter(time_period),
+        request.limit,
+        request.model,
+        bool(request.include_comments)
+    )
+
+async def _search_with_semantic_cache(request: SearchRequest) -> dict:
+    """Serve a search from the result of an earlier query with the same meaning, if any."""
+    if semantic_cache is None:
+        return await _search_payload(request)
+    
+    scope = _semantic_scope(request)
+    try:
+        embedding = await profiling.to_thread(semantic_cache.embed_query, request.query)
+    except Exception as e:
+        print(f"Semantic cache unavailable: {str(e)}")
+        return await _search_payload(request)
+    
+    match = semantic_cache.lookup(embedding, scope)
+    if match is not None:
+        entry, similarity = match
+        print(f"Semantic cache hit: \"{request.query}\" ~ \"{entry.query}\" ({similarity:.3f})")
+        if semantic_cache.needs_refresh(entry):
+            # Serve the cached result now and recompute it in the background
+            entry.refreshing = True
+            _run_in_background(_refresh_cached_search(request, embedding, scope, entry), "Semantic cache refresh")
         return {
+            **entry.payload,
             "original_query": request.query,
-            "rewritten_query": rewritten_query,
-            "posts": [
-                {
-                    **post,
-                    "relevance_score": post.get('similarity', 0),
-                    "engagement_score": post.get('engagement_score', 0),
-                    "time_relevance": post.get('time_relevance', 1.0),
-                    "is_original_content": post.get('is_original_content', False),
-                    "has_awards": post.get('has_awards', False)
-                }
-                for post in posts_for_summary
-            ],
-            "summary": summary,
             "metadata": {
-                "total_posts_found": len(posts),
-                "processing_approach": "semantic_search" if similar_posts else "basic_ranking",
-                "subreddit": request.subreddit,
-                "timestamp": datetime.now().isoformat()
+                **entry.payload["metadata"],
+                "cached_query": entry.query,
+                "cache_similarity": round(similarity, 4)
             }
         }
+    
+    payload = await _search_payload(request)
+    if payload["posts"] and _is_cacheable(payload):
+        semantic_cache.store(request.query, embedding, scope, payload)
+    return payload
+
+async def _refresh_cached_search(request: SearchRequest, embedding, scope: tuple, entry: CachedResult):
+    try:
+        payload = await _search_payload(request, previous=entry.payload)
+        if payload["posts"] and _is_cacheable(payload):
+            semantic_cache.store(request.query, embedding, scope, payload, replaces=entry)
+    finally:
+        # Also on failure or cancellation, so a later hit can try again
+        entry.refreshing = False
+
+async def _search_payload(request: SearchRequest, previous: dict = None) -> dict:
+    """Run the search pipeline and build the response payload.
+    
+    ``previous`` is an earlier payload for the same search, whose summary is
+    updated rather than regenerated when only a few posts changed.
+    """
+    deadline = Deadline(request.deadline_ms or SEARCH_DEADLINE_MS or None)
+    subreddit_from_query, time_period = _extract_query_filters(request.query)
+    # Extract subreddit from query if specified but not provided as a parameter
+    if request.subreddit:
+        subreddit_from_query = None
+    elif subreddit_from_query:
+        print(f"Extracted subreddit from query: r/{subreddit_from_query}")
+    if time_period:
+        print(f"Detected time period in query: {time_period}")
+    
+    # 1. Rewrite the query using LLM for better content discovery
+    print(f"Optimizing search query using {request.model}...")
+    rewritten_query = await deadline.run(
+        "rewrite",
+        ollama_client.rewrite_query(request.query, model=request.model),
+        fallback=request.query
+    )
+    print(f"Using search terms: \"{rewritten_query}\"")
+    
+    subreddit = request.subreddit or subreddit_from_query
+    time_filter = to_reddit_time_filter(time_period)
+    
+    # 2. Watched subreddits are kept indexed: search the local index without calling Reddit
+    posts = None
+    if watcher is not None and watcher.covers(subreddit):
+        print(f"Searching the local index of watched r/{subreddit}...")
+        try:
+            posts = await deadline.run(
+                "vector_search",
+                profiling.to_thread(vector_store.search_similar, rewritten_query, subreddit=subreddit, time_filter=time_filter)
+            )
+        except Exception as e:
+            print(f"Vector store processing error: {str(e)}")
+    
+    if posts:
+        similar_posts = posts_for_summary = posts
+    else:
+        ranked = await _fetch_and_rank(rewritten_query, subreddit, request.limit, time_period, deadline)
+        if ranked is None:
+            return _empty_search_response(request, rewritten_query, deadline.truncated)
+        posts, similar_posts, posts_for_summary = ranked
+    
+    # 3. Generate comprehensive summary using LLM
+    print(f"Synthesizing insights using {request.model}...")
+    try:
+        summary, summary_mode = await deadline.run(
+            "synthesis",
+            _synthesize(request, posts_for_summary, previous),
+            fallback=lambda: (_fallback_summary(posts_for_summary), "extractive")
+        )
+    except Exception as e:
+        print(f"Synthesis failed: {str(e)}")
+        summary, summary_mode = _fallback_summary(posts_for_summary), "extractive"
+    
+    # 4. Return enhanced response with metadata
+    return _build_search_response(
+        request, rewritten_query, posts, posts_for_summary, similar_posts, summary, deadline.truncated, summary_mode
+    )
+
+async def _fetch_and_rank(
+    rewritten_query: str,
+    subreddit: Optional[str],
+    limit: int,
+    time_period: Optional[str],
+    deadline: Deadline
+) -> Optional[Tuple[List[Post], List[Post], List[Post]]]:
+    """Fetch posts from Reddit and rank them; returns (posts, similar posts, posts to summarize), or None if nothing was found."""
+    # Fetch posts from Reddit with enhanced metadata
+    print("Discovering relevant content from Reddit...")
+    posts = await reddit_client.search_posts(
+        query=rewritten_query,
+        subreddit=subreddit,
+        limit=limit,
+        time_filter=time_period,
+        deadline=deadline
+    )
+    print(f"Found {len(posts)} relevant discussions")
+    _persist_posts(posts)
+    
+    if not posts:
+        return None
+    
+    # Process posts through vector store for semantic relevance
+    print("Analyzing content relevance...")
+    similar_posts = []
+    try:
+        similar_posts = await deadline.run(
+            "vector_search",
+            profiling.to_thread(
+                _index_and_search,
+                posts,
+                rewritten_query,
+                subreddit,
+                to_reddit_time_filter(time_period)
+            )
+        )
+        if similar_posts is None:
+            # Out of time: rank the fetched posts without embeddings
+            similar_posts = []
+            posts_for_summary = _basic_ranking(posts)
+        else:
+            print(f"Identified {len(similar_posts)} highly relevant discussions")
+            posts_for_summary = _posts_for_summary(posts, similar_posts)
         
     except Exception as e:
-        print(f"Search error: {str(e)}")
+        print(f"Vector store processing error: {str(e)}")
+        # Fallback to basic post ranking if vector store fails
+        posts_for_summary = _basic_ranking(posts)
+    
+    return posts, similar_posts, posts_for_summary
+
+@app.post("/search/batch")
+async def search_batch(
+    batch: BatchSearchRequest,
+    fields: Optional[str] = Query(None, description="Comma-separated post fields to return, e.g. id,title,url")
+):
+    """Run many searches as one shared pipeline.
+    
+    Query rewrites and summaries are scheduled on a bounded LLM queue, subreddit
+    discovery and Reddit fetches are deduplicated across queries, and all posts
+    are embedded in a single vector store pass. Results are streamed back as
+    newline-delimited JSON, one line per query as soon as it finishes:
+    ``{"index": <position in the batch>, "result": {...}}`` or
+    ``{"index": ..., "error": "..."}``.
+    """
+    if not batch.requests:
+        raise HTTPException(status_code=400, detail="At least one search request is required.")
+    if len(batch.requests) > MAX_BATCH_SEARCHES:
         raise HTTPException(
-            status_code=500,
-            detail="An error occurred while processing your search. Please try again."
+            status_code=400,
+            detail=f"A batch can contain at most {MAX_BATCH_SEARCHES} searches."
         )
+    
+    post_fields = _parse_post_fields(fields)
+    return StreamingResponse(_run_search_batch(batch.requests, post_fields), media_type="application/x-ndjson")
 
-@app.post("/summarize/{post_id}")
-async def summarize_post(post_id: str):
+async def _run_search_batch(requests: List[SearchRequest], post_fields: List[str] = None):
+    llm_semaphore = asyncio.Semaphore(OLLAMA_MAX_CONCURRENCY)
+    
+    async def bounded(coro):
+        async with llm_semaphore:
+            return await coro
+    
+    # 1. Rewrite every distinct query once
+    rewrite_tasks = {}
+    for request in requests:
+        key = (request.query.strip(), request.model)
+        if key not in rewrite_tasks:
+            rewrite_tasks[key] = asyncio.ensure_future(
+                bounded(ollama_client.rewrite_query(request.query, model=request.model))
+            )
+    await asyncio.gather(*rewrite_tasks.values(), return_exceptions=True)
+    rewritten_queries = []
+    for request in requests:
+        task = rewrite_tasks[(request.query.strip(), request.model)]
+        rewritten_queries.append(request.query if task.exception() else task.result())
+    
+    # 2. Fetch posts for all queries, sharing discovery and subreddit fetches
+    searches = []
+    for request, rewritten_query in zip(requests, rewritten_queries):
+        subreddit_from_query, time_period = _extract_query_filters(request.query)
+        searches.append({
+            'query': rewritten_query,
+            'subreddit': request.subreddit or subreddit_from_query,
+            'limit': request.limit,
+            'time_filter': time_period
+        })
+    print(f"Batch search: discovering content for {len(searches)} queries...")
+    posts_per_search = await reddit_client.search_posts_batch(searches)
+    _persist_posts(list({post.id: post for posts in posts_per_search for post in posts}.values()))
+    
+    # 3. Embed all posts and run all similarity queries in one pass each
+    similar_per_search = [[] for _ in requests]
+    vector_store_ok = True
     try:
-        post = await reddit_client.reddit.submission(id=post_id)
-        summary = await ollama_client.generate_summary(post.selftext)
-        return {"summary": summary}
+        # Embedding and Chroma queries block, keep them off the event loop
+        await profiling.to_thread(vector_store.add_posts, [post for posts in posts_per_search for post in posts])
+        active = [i for i, posts in enumerate(posts_per_search) if posts]
+        similar = await profiling.to_thread(
+            vector_store.search_similar_batch,
+            [rewritten_queries[i] for i in active],
+            filters=[
+                (searches[i]['subreddit'], to_reddit_time_filter(searches[i]['time_filter']))
+                for i in active
+            ]
+        )
+        for i, similar_posts in zip(active, similar):
+            similar_per_search[i] = similar_posts
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        print(f"Vector store processing error: {str(e)}")
+        vector_store_ok = False
+    
+    # 4. Summarize each query on the bounded LLM queue and stream results as they finish
+    async def finish(index: int):
+        request = requests[index]
+        posts = posts_per_search[index]
+        if not posts:
+            return index, _empty_search_response(request, rewritten_queries[index])
+        
+        similar_posts = similar_per_search[index]
+        if vector_store_ok:
+            posts_for_summary = _posts_for_summary(posts, similar_posts)
+        else:
+            posts_for_summary = _basic_ranking(posts)
+        try:
+            summary, summary_mode = await bounded(_summarize(request, posts_for_summary)), "full"
+        except Exception as e:
+            print(f"Synthesis failed: {str(e)}")
+            summary, summary_mode = _fallback_summary(posts_for_summary), "extractive"
+        return index, _build_search_response(
+            request, rewritten_queries[index], posts, posts_for_summary, similar_posts, summary,
+            summary_mode=summary_mode
+        )
+    
+    tasks = [asyncio.ensure_future(finish(i)) for i in range(len(requests))]
+    index_by_task = {task: i for i, task in enumerate(tasks)}
+    pending = set(tasks)
+    while pending:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            if task.exception():
+                print(f"Batch search error: {str(task.exception())}")
+                line = {"index": index_by_task[task], "error": "An error occurred while processing this search."}
+            else:
+                index, result = task.result()
+                if post_fields:
+                    result["posts"] = project_posts(result["posts"], post_fields)
+                line = {"index": index, "result": result}
+            yield dumps(line) + b"\n"
+
+@app.post("/summarize/{post_id}")
+async def summarize_post(post_id: str, http_request: Request):
+    cache_key = ResponseCache.make_key("summarize", {"post_id": post_id})
+    payload = response_cache.get(cache_key)
+    if payload is None:
+        try:
+            summary = await ollama_client.generate_summary(post_id, lambda: reddit_client.get_post(post_id))
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+        payload = {"summary": summary}
+        response_cache.set(cache_key, payload)
+    return response_cache.respond(http_request, make_etag([post_id], payload["summary"]), payload)
 
 @app.post("/ask")
-async def ask_question(request: QuestionRequest):
-    try:
-        post = await reddit_client.reddit.submission(id=request.post_id)
-        context = f"Title: {post.title}\n\nContent: {post.selftext}"
-        answer = await ollama_client.answer_question(context, request.question)
-        return {"answer": answer}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+async def ask_question(request: QuestionRequest, http_request: Request):
+    cache_key = ResponseCache.make_key("ask", {
+        "post_id": request.post_id,
+        "question": normalize_text(request.question),
+        "model": request.model
+    })
+    payload = response_cache.get(cache_key)
+    if payload is None:
+        try:
+            # Follow-up questions continue the post's conversation, without refetching the post
+            answer = await ollama_client.answer_question(
+                request.post_id,
+                request.question,
+                lambda: reddit_client.get_post(request.post_id),
+                model=request.model
+            )
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+        payload = {"answer": answer}
+        response_cache.set(cache_key, payload)
+    return response_cache.respond(http_request, make_etag([request.post_id], payload["answer"]), payload)
 
 @app.get("/test", response_class=HTMLResponse)
 async def test():
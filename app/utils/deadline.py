@@ -0,0 +1,62 @@
+import asyncio
+import time
+from typing import Any, Awaitable, List, Optional
+
+from app.utils import profiling
+
+# Share of the remaining budget each search stage may use. Time a stage doesn't
+# use carries over to the stages after it; synthesis gets whatever is left.
+STAGE_SHARES = {
+    'rewrite': 0.1,
+    'discovery': 0.15,
+    'reddit_fetch': 0.3,
+    'vector_search': 0.25,
+    'synthesis': 1.0
+}
+
+
+class Deadline:
+    """Latency budget of one request, shared out across its pipeline stages.
+
+    A stage that runs out of its slice records itself in ``truncated`` and the
+    request continues with that stage's best partial result, so the caller gets
+    a partial answer instead of a timeout. A deadline without a budget never
+    expires.
+    """
+
+    def __init__(self, budget_ms: Optional[float] = None):
+        self.budget_ms = budget_ms
+        self.expires_at = time.monotonic() + budget_ms / 1000 if budget_ms else None
+        self.truncated: List[str] = []
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left, or None when there is no budget."""
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def timeout(self, stage: str, cap: Optional[float] = None) -> Optional[float]:
+        """Seconds the given stage may take, optionally capped by a stage's own timeout."""
+        remaining = self.remaining()
+        if remaining is None:
+            return cap
+        timeout = remaining * STAGE_SHARES.get(stage, 1.0)
+        return timeout if cap is None else min(timeout, cap)
+
+    def truncate(self, stage: str) -> None:
+        """Record that a stage returned a partial result because its time ran out."""
+        if stage not in self.truncated:
+            self.truncated.append(stage)
+            print(f"Deadline: stage '{stage}' ran out of time, continuing with partial results")
+
+    async def run(self, stage: str, awaitable: Awaitable, fallback: Any = None) -> Any:
+        """Await a stage within its slice, returning ``fallback`` if the slice runs out.
+
+        ``fallback`` may be a callable, which is only called when it is needed.
+        """
+        try:
+            with profiling.stage(stage):
+                return await asyncio.wait_for(awaitable, self.timeout(stage))
+        except asyncio.TimeoutError:
+            self.truncate(stage)
+            return fallback() if callable(fallback) else fallback
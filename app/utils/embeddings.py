@@ -0,0 +1,157 @@
+import os
+import re
+import threading
+from typing import List
+
+from app.config.settings import (
+    EMBEDDING_BACKEND, EMBEDDING_MODEL, EMBEDDING_BATCH_SIZE,
+    EMBEDDING_THREADS, EMBEDDING_QUANTIZE
+)
+
+
+class EmbeddingProvider:
+    """Base class for embedding backends used by the vector store.
+
+    Providers are callable with a list of documents, so they can be handed to
+    Chroma directly as a collection's embedding function. Models are loaded
+    lazily on first use, or eagerly through ``warmup``.
+    """
+
+    name = "base"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaded = False
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        raise NotImplementedError
+
+    def __call__(self, input: List[str]) -> List[List[float]]:
+        return self.embed(list(input))
+
+    def load(self) -> None:
+        """Load the model once, even when called from several threads."""
+        if self._loaded:
+            return
+        with self._lock:
+            if not self._loaded:
+                self._load()
+                self._loaded = True
+
+    def _load(self) -> None:
+        pass
+
+    def warmup(self) -> None:
+        """Load the model and run one dummy inference so the first request is fast."""
+        self.load()
+        self.embed(["warmup"])
+
+    @property
+    def collection_suffix(self) -> str:
+        """Suffix for collection names, since vectors of different models can't share one."""
+        return re.sub(r"[^A-Za-z0-9_-]+", "-", self.name).strip("-")
+
+
+class OnnxMiniLMProvider(EmbeddingProvider):
+    """Chroma's default all-MiniLM-L6-v2 model, run through onnxruntime.
+
+    This is the model the ``reddit_posts`` collection has always been embedded with.
+    Batch size and intra-op threads are applied through Chroma's internals
+    (``_forward`` and the ``model`` session), as pinned in requirements.txt.
+    """
+
+    name = "default"
+
+    def __init__(self, batch_size: int = EMBEDDING_BATCH_SIZE, threads: int = EMBEDDING_THREADS):
+        super().__init__()
+        self.batch_size = batch_size
+        self.threads = threads
+        self._function = None
+
+    def _load(self) -> None:
+        from chromadb.utils import embedding_functions
+
+        function = embedding_functions.ONNXMiniLM_L6_V2()
+        if self.threads > 0:
+            # The session Chroma would create, with pinned intra-op threads so
+            # concurrent requests don't oversubscribe the CPU
+            function._download_model_if_not_exists()
+            options = function.ort.SessionOptions()
+            options.log_severity_level = 3
+            options.intra_op_num_threads = self.threads
+            function.model = function.ort.InferenceSession(
+                os.path.join(function.DOWNLOAD_PATH, function.EXTRACTED_FOLDER_NAME, "model.onnx"),
+                providers=function.ort.get_available_providers(),
+                sess_options=options
+            )
+        self._function = function
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        self.load()
+        # Calling the function directly would always use batches of 32
+        self._function._download_model_if_not_exists()
+        return self._function._forward(texts, batch_size=self.batch_size).tolist()
+
+
+class SentenceTransformerProvider(EmbeddingProvider):
+    """CPU sentence-transformers backend with batching, pinned threads and int8 quantization."""
+
+    def __init__(
+        self,
+        model_name: str = EMBEDDING_MODEL,
+        batch_size: int = EMBEDDING_BATCH_SIZE,
+        threads: int = EMBEDDING_THREADS,
+        quantize: str = EMBEDDING_QUANTIZE
+    ):
+        super().__init__()
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.threads = threads
+        self.quantize = quantize
+        self._model = None
+
+    @property
+    def name(self) -> str:
+        model = self.model_name.split("/")[-1]
+        return f"st-{model}-{self.quantize}" if self.quantize != "none" else f"st-{model}"
+
+    def _load(self) -> None:
+        import torch
+        from sentence_transformers import SentenceTransformer
+
+        if self.threads > 0:
+            # Pin intra-op threads so concurrent requests don't oversubscribe the CPU
+            torch.set_num_threads(self.threads)
+
+        model = SentenceTransformer(self.model_name, device="cpu")
+        if self.quantize == "int8":
+            # Dynamic int8 quantization of the linear layers: ~2-3x faster on CPU
+            model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        model.eval()
+        self._model = model
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        self.load()
+        embeddings = self._model.encode(
+            texts,
+            batch_size=self.batch_size,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            show_progress_bar=False
+        )
+        return embeddings.tolist()
+
+
+EMBEDDING_BACKENDS = {
+    "default": OnnxMiniLMProvider,
+    "onnx": OnnxMiniLMProvider,
+    "sentence-transformers": SentenceTransformerProvider,
+}
+
+
+def get_embedding_provider(backend: str = None) -> EmbeddingProvider:
+    """Create the embedding provider configured by ``EMBEDDING_BACKEND``."""
+    backend = (backend or EMBEDDING_BACKEND).lower()
+    if backend not in EMBEDDING_BACKENDS:
+        raise ValueError(f"Unknown embedding backend '{backend}'. Choose one of: {', '.join(EMBEDDING_BACKENDS)}")
+    return EMBEDDING_BACKENDS[backend]()
@@ -0,0 +1,86 @@
+import hashlib
+from typing import Any, Dict, Hashable, Iterable, Optional
+
+from fastapi import Request, Response
+
+from app.config.settings import RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL
+from app.utils.cache import TTLCache
+from app.utils.serialization import dumps, json_response
+
+
+def normalize_text(text: Optional[str]) -> str:
+    """Case- and whitespace-insensitive form of free text used in cache keys."""
+    return " ".join((text or "").lower().split())
+
+
+def make_etag(post_ids: Iterable[str], text: str, *variant: str) -> str:
+    """Weak ETag over the set of result post ids and the generated text.
+
+    ``variant`` covers anything else that changes the body, like a field
+    projection. The ETag is weak because the same result is sent with different
+    content encodings.
+    """
+    digest = hashlib.sha1()
+    digest.update("\n".join(sorted(str(post_id) for post_id in post_ids)).encode("utf-8"))
+    digest.update(b"\0")
+    digest.update((text or "").encode("utf-8"))
+    for part in variant:
+        digest.update(b"\0")
+        digest.update(str(part).encode("utf-8"))
+    return f'W/"{digest.hexdigest()[:20]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an ``If-None-Match`` header against an ETag."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+class ResponseCache:
+    """Caches the JSON payloads of expensive endpoints, keyed on normalized requests.
+
+    Responses carry an ETag and ``Cache-Control`` so clients and reverse proxies
+    can cache too, and a matching ``If-None-Match`` gets an empty 304.
+    """
+
+    def __init__(self, max_size: int = RESPONSE_CACHE_SIZE, ttl: float = RESPONSE_CACHE_TTL):
+        self.ttl = ttl
+        self._cache = TTLCache(max_size, ttl)
+
+    @staticmethod
+    def make_key(endpoint: str, params: Dict[str, Any]) -> Hashable:
+        """Cache key for an endpoint and its (already normalized) parameters."""
+        return endpoint, hashlib.sha1(dumps(dict(sorted(params.items())))).hexdigest()
+
+    def get(self, key: Hashable) -> Any:
+        return self._cache.get(key)
+
+    def set(self, key: Hashable, payload: Any) -> None:
+        if self.ttl > 0:
+            self._cache.set(key, payload)
+
+    def respond(self, http_request: Request, etag: str, payload: Any, cacheable: bool = True) -> Response:
+        """JSON response with validators, or a 304 when the client already has this result."""
+        if not cacheable:
+            # Partial or degraded results (e.g. cut short by a deadline) must not be reused
+            return json_response(
+                payload, accept_encoding=http_request.headers.get("accept-encoding"), headers={"Cache-Control": "no-store"}
+            )
+        headers = {
+            "ETag": etag,
+            "Cache-Control": f"public, max-age={int(self.ttl)}" if self.ttl > 0 else "no-store"
+        }
+        if etag_matches(http_request.headers.get("if-none-match"), etag):
+            headers["Vary"] = "Accept-Encoding"
+            return Response(status_code=304, headers=headers)
+        return json_response(payload, accept_encoding=http_request.headers.get("accept-encoding"), headers=headers)
@@ -0,0 +1,55 @@
+import os
+import sys
+from typing import Any, Dict, List
+
+
+def current_rss_bytes() -> int:
+    """Resident set size of this process, or 0 when it can't be determined."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return peak_rss_bytes()
+
+
+def peak_rss_bytes() -> int:
+    """Peak resident set size of this process, or 0 when it can't be determined."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def directory_size_bytes(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                continue
+    return total
+
+
+def apply_content_budget(posts: List[Dict[str, Any]], budget_chars: int) -> int:
+    """Cut the ``content`` of post dicts so that together they stay within ``budget_chars`` (pass them best first).
+
+    Only meant for response copies: the ``Post`` objects that are indexed and
+    persisted keep their full content. Earlier posts keep their whole body,
+    later ones get what is left of the budget. Returns how many characters were
+    dropped.
+    """
+    if budget_chars <= 0:
+        return 0
+    remaining = budget_chars
+    dropped = 0
+    for post in posts:
+        content = post.get("content") or ""
+        if len(content) > remaining:
+            post["content"] = content[:remaining]
+            dropped += len(content) - remaining
+        remaining -= len(post.get("content") or "")
+    return dropped
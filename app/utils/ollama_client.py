@@ -1,102 +1,179 @@
 import httpx
 import json
-from typing import Dict, Any, List
-from app.config.settings import OLLAMA_BASE_URL, OLLAMA_MODEL
+import asyncio
+from typing import Dict, Any, List, Callable, Awaitable, Optional, Tuple
+from app.config.settings import (
+    OLLAMA_BASE_URL, OLLAMA_MODEL, OLLAMA_KEEP_ALIVE,
+    SUMMARY_COMMENTS_PER_POST, SUMMARY_CHUNK_CHARS, SUMMARY_MAP_CONCURRENCY,
+    COMMENT_DIGEST_CACHE_TTL, COMMENT_DIGEST_CACHE_SIZE,
+    SUMMARY_MAX_POSTS, SUMMARY_POST_TOKENS,
+    POST_SESSION_TTL, POST_SESSION_CACHE_SIZE, POST_SESSION_MAX_TOKENS
+)
+from app.utils import profiling
+from app.utils.cache import TTLCache
+from app.utils.post import Post
+from app.utils.selection import CHARS_PER_TOKEN
 import re
 
+# JSON schema Ollama constrains query rewrites to
+REWRITE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "keywords": {"type": "array", "items": {"type": "string"}, "minItems": 2, "maxItems": 5}
+    },
+    "required": ["keywords"]
+}
+
+# Output format and sampling options for each kind of generation
+GENERATION_PROFILES = {
+    # A handful of keywords: short, near-deterministic, schema-constrained output
+    "rewrite": {
+        "format": REWRITE_SCHEMA,
+        "options": {"temperature": 0.1, "top_k": 20, "num_predict": 64}
+    },
+    "synthesis": {
+        "options": {
+            "temperature": 0.7,  # Balance between creativity and consistency
+            "top_p": 0.9,        # Maintain natural language flow
+            "top_k": 40,         # Diverse but relevant token selection
+            "num_predict": 1000,  # Allow for comprehensive responses
+            "stop": ["[END]"]    # Clear end marker
+        }
+    },
+    "comment_digest": {"options": {"temperature": 0.3, "top_p": 0.9, "num_predict": 300}},
+    "conversation": {"options": {"temperature": 0.3, "top_p": 0.9, "num_predict": 500}}
+}
+
+_PLACEHOLDER_RE = re.compile(r'^(term|keyword|search term)\s*\d*$', re.IGNORECASE)
+
+def parse_keywords(response: str, max_keywords: int = 5) -> List[str]:
+    """Keywords of a schema-constrained rewrite response.
+    
+    Raises:
+        ValueError: if the response isn't the expected JSON or has fewer than two usable keywords
+    """
+    try:
+        data = json.loads(response)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"rewrite is not JSON: {str(e)}")
+    raw = data.get("keywords") if isinstance(data, dict) else None
+    if not isinstance(raw, list):
+        raise ValueError("rewrite has no keyword list")
+    
+    keywords = []
+    seen = set()
+    for item in raw:
+        if not isinstance(item, str):
+            continue
+        keyword = " ".join(re.sub(r"[^\w\s/'-]", " ", item).split())
+        if not keyword or _PLACEHOLDER_RE.match(keyword) or keyword.lower() in seen:
+            continue
+        seen.add(keyword.lower())
+        keywords.append(keyword)
+    
+    if len(keywords) < 2:
+        raise ValueError(f"rewrite has {len(keywords)} usable keywords")
+    return keywords[:max_keywords]
+
+class PostSession:
+    """An ongoing conversation about one post.
+    
+    ``context`` is the token state Ollama returned for the last turn; sending it
+    back with the next prompt continues the conversation without the post being
+    sent (and evaluated) again.
+    """
+    
+    __slots__ = ('context', 'lock', 'summary')
+    
+    def __init__(self):
+        self.context: Optional[List[int]] = None
+        self.lock = asyncio.Lock()
+        self.summary: Optional[str] = None
+
 class OllamaClient:
     def __init__(self):
         self.base_url = OLLAMA_BASE_URL
         self.default_model = OLLAMA_MODEL
         self.timeout = httpx.Timeout(60.0, connect=15.0)  # 60s timeout, 15s for connection
+        
+        # Per-post comment digests, so a popular thread is only summarized once
+        self._comment_digests = TTLCache(max_size=COMMENT_DIGEST_CACHE_SIZE, ttl=COMMENT_DIGEST_CACHE_TTL)
+        self._digest_tasks: Dict[str, asyncio.Task] = {}
+        self._map_semaphore = None
+        
+        # Conversations per (model, post), so follow-up questions only send the question
+        self._post_sessions = TTLCache(max_size=POST_SESSION_CACHE_SIZE, ttl=POST_SESSION_TTL)
+        
+        # How query rewrites turned out, and the token cost of each generation profile
+        self.rewrite_outcomes = {"parsed": 0, "fallback_unparseable": 0, "fallback_error": 0}
+        self._profile_stats = {
+            profile: {"calls": 0, "prompt_tokens": 0, "generated_tokens": 0, "seconds": 0.0}
+            for profile in GENERATION_PROFILES
+        }
+        
+        # Shared HTTP client so requests reuse pooled keep-alive connections
+        self._client = None
+    
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=20, max_keepalive_connections=10)
+            )
+        return self._client
+    
+    async def preload(self, model: str = None) -> None:
+        """Load the model into Ollama's memory and keep it there.
+        
+        A generate request without a prompt only loads the model, so the first
+        real request doesn't pay the model load time. It also opens a pooled
+        connection to Ollama.
+        """
+        response = await self._get_client().post(
+            f"{self.base_url}/api/generate",
+            json={"model": model or self.default_model, "keep_alive": OLLAMA_KEEP_ALIVE},
+            timeout=httpx.Timeout(300.0, connect=15.0)  # Loading a model from disk can be slow
+        )
+        response.raise_for_status()
+    
+    async def close(self) -> None:
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
     
     async def rewrite_query(self, query: str, model: str = None) -> str:
         """Transform raw user query into optimized search keywords for better search results."""
-        try:
-            # Extract specific subreddit if mentioned in the query to use it later
-            subreddit_match = re.search(r'(?:r/|subreddit\s+)(\w+)', query, re.IGNORECASE)
-            
-            # Extract time period if mentioned
-            time_period = None
-            if re.search(r'\b(today|yesterday|this week|this month|recent|latest|new)\b', query, re.IGNORECASE):
-                time_period = "recent"
-            
-            # MUCH simpler prompt - the LLM is struggling with complex instructions
-            prompt = f"""Extract 3-5 search keywords from: "{query}"
-
-OUTPUT FORMAT: keyword1, keyword2, keyword3
+        # Extract time period if mentioned
+        time_period = None
+        if re.search(r'\b(today|yesterday|this week|this month|recent|latest|new)\b', query, re.IGNORECASE):
+            time_period = "recent"
+        
+        prompt = f"""Extract 3-5 search keywords for finding Reddit posts about: "{query}"
 
-EXAMPLES:
+Answer in JSON, for example:
 "What are the most recommended productivity apps according to r/productivity?"
-productivity apps, recommended apps, top productivity tools
-
-"What are the top discussions about artificial intelligence on Reddit this week?"
-artificial intelligence, AI discussions, machine learning, neural networks, AI ethics"""
-            
-            response = await self._generate(prompt, model)
-            
-            # Clean and normalize the response
-            cleaned = response.strip()
-            
-            # Extreme preprocessing - if the model output contains placeholders, reject it completely
-            if re.search(r'\bterm\d\b|\bkeyword\d\b', cleaned, re.IGNORECASE) or "search terms" in cleaned.lower():
-                print("Model output contains placeholders - falling back to keyword extraction")
-                keywords = self._extract_keywords(query)
-                return ", ".join(keywords)
-            
-            # Super aggressive pattern to catch ALL forms of prefixes and explanations
-            prefix_patterns = [
-                r"^(Sure|Here|I'll|These|Following|Best|Top|Absolutely|Certainly|Definitely|Let me|I'd|I've|I have|I think|I will|I would|Here's|Based on|As requested).+?:",
-                r"^.+?(search terms|keywords|searching|search on|search in|search for|to find|finding posts|find relevant|find information).+?:",
-                r"^.*?(Output|Terms|Results|Keywords).*?:",
-                r"^.*?(\d+)\s*(simple|effective|useful|key|important|main|relevant|primary|essential).*:"
-            ]
-            
-            # Apply all prefix patterns
-            for pattern in prefix_patterns:
-                cleaned = re.sub(pattern, "", cleaned, flags=re.IGNORECASE | re.DOTALL)
-            
-            # Remove any remaining text that looks like a heading or explanation
-            cleaned = re.sub(r"^.*?:(\s*)", "", cleaned, flags=re.DOTALL)
-            
-            # Remove "Sure, " or similar at the beginning
-            cleaned = re.sub(r"^(Sure\s*,?\s*|Okay\s*,?\s*|Here\s*,?\s*|Well\s*,?\s*)", "", cleaned, flags=re.IGNORECASE)
-            
-            # Remove numbered list formatting
-            cleaned = re.sub(r"^\d+[\.\)]\s*", "", cleaned, flags=re.MULTILINE)
-            cleaned = re.sub(r"\n+\d+[\.\)]\s*", ", ", cleaned, flags=re.MULTILINE)
-            
-            # Replace multiple consecutive newlines with a single comma
-            cleaned = re.sub(r"\n+", ", ", cleaned)
-            
-            # Remove any remaining non-essential characters but preserve commas and alphanumerics
-            cleaned = re.sub(r"[^\w\s,]", "", cleaned)
-            
-            # Remove extra whitespace around commas and standardize to comma-space format
-            cleaned = re.sub(r"\s*,\s*", ", ", cleaned)
-            
-            # Remove trailing comma if present
-            cleaned = re.sub(r",\s*$", "", cleaned)
-            
-            # Ensure we don't have multiple consecutive commas
-            cleaned = re.sub(r",\s*,", ",", cleaned)
-            
-            # Final validation - check for bad outputs
-            if len(cleaned.split()) > 15 or cleaned.startswith("Sure") or "Here are" in cleaned or len(cleaned.split(",")) < 2:
-                print("Model output is problematic - falling back to keyword extraction")
-                keywords = self._extract_keywords(query)
-                return ", ".join(keywords)
-            
-            # Add time period indicator if it was in the original query
-            if time_period and "recent" not in cleaned.lower() and "latest" not in cleaned.lower():
-                cleaned += ", recent posts"
-            
-            return cleaned
-            
+{{"keywords": ["productivity apps", "recommended apps", "top productivity tools"]}}"""
+        
+        try:
+            keywords = parse_keywords(await self._generate(prompt, model, profile="rewrite"))
+        except ValueError as e:
+            print(f"Unusable query rewrite ({str(e)}) - falling back to keyword extraction")
+            self.rewrite_outcomes["fallback_unparseable"] += 1
+            # Queries made only of stopwords leave no keywords; search for the query as asked
+            return ", ".join(self._extract_keywords(query)) or query
         except Exception as e:
             print(f"Error rewriting query: {str(e)}")
+            self.rewrite_outcomes["fallback_error"] += 1
             return query  # Fallback to original query
-            
+        
+        self.rewrite_outcomes["parsed"] += 1
+        
+        # Add time period indicator if it was in the original query
+        cleaned = ", ".join(keywords)
+        if time_period and "recent" not in cleaned.lower() and "latest" not in cleaned.lower():
+            cleaned += ", recent posts"
+        return cleaned
+    
     def _extract_keywords(self, query: str) -> List[str]:
         """Extract meaningful keywords from a query."""
         # Remove common stop words
@@ -126,21 +203,270 @@ artificial intelligence, AI discussions, machine learning, neural networks, AI e
             
         return keywords
     
-    async def synthesize_answer(self, query: str, posts: List[Dict[str, Any]], model: str = None) -> str:
-        """Generate a coherent summary/answer based on the original query and relevant posts."""
+    async def synthesize_answer(self, query: str, posts: List[Post], model: str = None) -> str:
+        """Generate a coherent summary/answer based on the original query and relevant posts.
+        
+        Raises on failure, so an error is never mistaken for (and cached as) a summary.
+        """
+        if not posts:
+            return "No relevant posts found to synthesize an answer."
+        
+        # Build context from posts, prioritizing highly relevant ones
+        context = []
+        for i, post in enumerate(posts[:SUMMARY_MAX_POSTS], 1):
+            context.append(self._format_post_context(i, post))
+        
+        prompt = self._build_synthesis_prompt(context)
+        return await self._generate(prompt, model)
+    
+    async def update_summary(
+        self,
+        query: str,
+        summary: str,
+        new_posts: List[Post],
+        dropped_titles: List[str],
+        model: str = None
+    ) -> str:
+        """Update an earlier summary with a few new posts instead of summarizing everything again.
+        
+        Raises on failure, so the caller can fall back to a full summary.
+        """
+        context = [self._format_post_context(i, post) for i, post in enumerate(new_posts, 1)]
+        dropped = ""
+        if dropped_titles:
+            dropped = "\nThese discussions are no longer among the results; drop points that only came from them:\n{}\n".format(
+                "\n".join(f"- {title}" for title in dropped_titles)
+            )
+        prompt = f"""Below is a summary of Reddit discussions about "{query}". New discussions have appeared since it was written.
+Rewrite the summary so it also covers the new discussions. Keep its structure, sections and tone, and keep everything that still holds.
+
+CURRENT SUMMARY:
+{summary}
+
+NEW DISCUSSIONS:
+{chr(10).join(context) if context else "(none)"}
+{dropped}"""
+        updated = await self._generate(prompt, model)
+        if not updated:
+            raise ValueError("empty summary update")
+        return updated
+    
+    async def synthesize_answer_with_comments(
+        self,
+        query: str,
+        posts: List[Post],
+        fetch_comments: Callable[..., Awaitable[List[Dict[str, Any]]]],
+        model: str = None
+    ) -> str:
+        """Map-reduce summary over the posts and their top comments.
+        
+        Comments for each post are fetched concurrently and summarized in chunks
+        (map), the chunk summaries are merged into one digest per post, and the
+        digests are combined into the final answer (reduce). Digests are cached
+        per post so popular threads are only summarized once.
+        """
         try:
             if not posts:
                 return "No relevant posts found to synthesize an answer."
             
-            # Build context from posts, prioritizing highly relevant ones
+            posts = posts[:SUMMARY_MAX_POSTS]
+            digests = await asyncio.gather(
+                *(self._get_comment_digest(post, fetch_comments, model) for post in posts),
+                return_exceptions=True
+            )
+            
             context = []
-            for i, post in enumerate(posts[:5], 1):
-                # Include relevance score and community context
-                relevance = f" (Relevance: {post.get('similarity', 0):.2%})" if 'similarity' in post else ""
-                subreddit = f" from r/{post['subreddit']}" if post.get('subreddit') else ""
-                context.append(f"{i}. Title: {post['title']}{relevance}{subreddit}\nContent: {post['content']}\n")
+            for i, (post, digest) in enumerate(zip(posts, digests), 1):
+                if isinstance(digest, Exception):
+                    print(f"Error summarizing comments for post {post.id}: {str(digest)}")
+                    digest = ""
+                context.append(self._format_post_context(i, post, digest))
             
-            prompt = """You are a helpful assistant specializing in summarizing Reddit discussions. Given the following extracted key points and top comments, produce a clear and concise summary that highlights common themes, divergent opinions, and any consensus reached. Maintain the informal tone of Reddit while ensuring clarity and brevity.
+            prompt = self._build_synthesis_prompt(context)
+            return await self._generate(prompt, model)
+            
+        except Exception as e:
+            print(f"Error synthesizing answer with comments: {str(e)}")
+            # Fall back to the post-only summary
+            return await self.synthesize_answer(query, posts, model)
+    
+    async def _get_comment_digest(
+        self,
+        post: Post,
+        fetch_comments: Callable[..., Awaitable[List[Dict[str, Any]]]],
+        model: str = None
+    ) -> str:
+        """Return the cached comment digest for a post, computing it at most once."""
+        key = f"{model or self.default_model}:{post.id}"
+        
+        digest = self._comment_digests.get(key)
+        if digest is not None:
+            return digest
+        
+        # Share an in-flight computation between concurrent requests
+        task = self._digest_tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._compute_comment_digest(post, fetch_comments, model))
+            self._digest_tasks[key] = task
+            task.add_done_callback(lambda _: self._digest_tasks.pop(key, None))
+        
+        digest = await asyncio.shield(task)
+        # Generation errors and timeouts raise; an empty digest (no comments could be
+        # fetched) is not cached either, so the next summary tries again
+        if digest:
+            self._comment_digests.set(key, digest)
+        return digest
+    
+    async def _compute_comment_digest(
+        self,
+        post: Post,
+        fetch_comments: Callable[..., Awaitable[List[Dict[str, Any]]]],
+        model: str = None
+    ) -> str:
+        comments = await fetch_comments(post.id, limit=SUMMARY_COMMENTS_PER_POST)
+        chunks = self._chunk_comments(comments, SUMMARY_CHUNK_CHARS)
+        if not chunks:
+            return ""
+        
+        # Map: summarize every chunk in parallel, bounded by the shared semaphore
+        partials = await asyncio.gather(
+            *(self._summarize_comment_chunk(post.title, chunk, model) for chunk in chunks)
+        )
+        partials = [p for p in partials if p]
+        if len(partials) <= 1:
+            return partials[0] if partials else ""
+        
+        # Reduce the chunk summaries into a single digest for this post
+        prompt = f"""Merge these partial summaries of the comments on the Reddit post "{post.title}" into one short digest.
+Keep the main opinions, disagreements and any consensus. Use 3-6 bullet points.
+
+PARTIAL SUMMARIES:
+{chr(10).join(partials)}"""
+        return await self._generate_bounded(prompt, model)
+    
+    async def _summarize_comment_chunk(self, title: str, chunk: str, model: str = None) -> str:
+        prompt = f"""Summarize the key points, opinions and any consensus in these Reddit comments on the post "{title}".
+Be brief: 3-5 bullet points.
+
+COMMENTS:
+{chunk}"""
+        return await self._generate_bounded(prompt, model)
+    
+    async def _generate_bounded(self, prompt: str, model: str = None) -> str:
+        """Generate a short map-step response while respecting the concurrency limit."""
+        if self._map_semaphore is None:
+            self._map_semaphore = asyncio.Semaphore(SUMMARY_MAP_CONCURRENCY)
+        async with self._map_semaphore:
+            return await self._generate(prompt, model, profile="comment_digest")
+    
+    async def generate_summary(
+        self,
+        post_id: str,
+        load_post: Callable[[], Awaitable[Post]],
+        model: str = None
+    ) -> str:
+        """Summarize a post, starting the conversation that questions about it continue."""
+        session = self._get_post_session(post_id, model)
+        async with session.lock:
+            if session.summary is not None:
+                return session.summary
+            prompt = "Summarize this post and what it asks or claims in 3-5 sentences."
+            session.summary = await self._session_turn(session, prompt, load_post, model)
+            return session.summary
+    
+    async def answer_question(
+        self,
+        post_id: str,
+        question: str,
+        load_post: Callable[[], Awaitable[Post]],
+        model: str = None
+    ) -> str:
+        """Answer a question about a post.
+        
+        The first question (or summary) of a session sends the post itself; follow-up
+        questions only send the new question along with the context Ollama returned,
+        so the post isn't re-evaluated and isn't even fetched again. ``load_post`` is
+        only called when a session has to be started.
+        """
+        session = self._get_post_session(post_id, model)
+        async with session.lock:
+            prompt = f"""Answer this question about the post, using only what the post says. If the post doesn't answer it, say so.
+
+QUESTION: {question}"""
+            return await self._session_turn(session, prompt, load_post, model)
+    
+    def _get_post_session(self, post_id: str, model: str = None) -> PostSession:
+        key = f"{model or self.default_model}:{post_id}"
+        session = self._post_sessions.get(key)
+        if session is None:
+            session = PostSession()
+        # Setting it again also renews the TTL, so active conversations stay cached
+        self._post_sessions.set(key, session)
+        return session
+    
+    async def _session_turn(
+        self,
+        session: PostSession,
+        prompt: str,
+        load_post: Callable[[], Awaitable[Post]],
+        model: str = None
+    ) -> str:
+        """Run one turn of a post conversation (call with the session lock held)."""
+        if session.context is not None and len(session.context) > POST_SESSION_MAX_TOKENS:
+            # The conversation no longer fits the model's window: start over from the post
+            session.context = None
+        
+        if session.context is None:
+            post = await load_post()
+            prompt = f"""You are helping a user understand a Reddit post. Keep answers short and specific.
+
+POST (r/{post.subreddit}): {post.title}
+
+{post.content}
+
+{prompt}"""
+        
+        try:
+            response, session.context = await self._generate_with_context(prompt, session.context, model)
+        except Exception:
+            # The returned context is the only way to continue; without it start over next time
+            session.context = None
+            raise
+        return response
+    
+    def _chunk_comments(self, comments: List[Dict[str, Any]], max_chars: int) -> List[str]:
+        """Group formatted comments into chunks of at most ``max_chars`` characters."""
+        chunks = []
+        current = []
+        current_len = 0
+        for comment in comments:
+            body = (comment.get('content') or '').strip()
+            if not body or body in ('[deleted]', '[removed]'):
+                continue
+            line = f"- ({comment.get('score', 0)} points) {body[:max_chars]}"
+            if current and current_len + len(line) > max_chars:
+                chunks.append("\n".join(current))
+                current = []
+                current_len = 0
+            current.append(line)
+            current_len += len(line) + 1
+        if current:
+            chunks.append("\n".join(current))
+        return chunks
+    
+    def _format_post_context(self, index: int, post: Post, comment_digest: str = "") -> str:
+        # Include relevance score and community context
+        relevance = f" (Relevance: {post.similarity:.2%})" if post.similarity is not None else ""
+        subreddit = f" from r/{post.subreddit}" if post.subreddit else ""
+        # Long self posts are cut so one post can't take over the prompt
+        content = post.content[:SUMMARY_POST_TOKENS * CHARS_PER_TOKEN]
+        entry = f"{index}. Title: {post.title}{relevance}{subreddit}\nContent: {content}\n"
+        if comment_digest:
+            entry += f"Top comments:\n{comment_digest}\n"
+        return entry
+    
+    def _build_synthesis_prompt(self, context: List[str]) -> str:
+        return """You are a helpful assistant specializing in summarizing Reddit discussions. Given the following extracted key points and top comments, produce a clear and concise summary that highlights common themes, divergent opinions, and any consensus reached. Maintain the informal tone of Reddit while ensuring clarity and brevity.
 
 CONTEXT:
 {}
@@ -159,45 +485,81 @@ REQUIREMENTS:
 8. Keep it concise but informative
 9. Add credibility markers (e.g., "Multiple users reported...")
 10. Note if certain views are from specific subreddits""".format(chr(10).join(context))
-            
-            return await self._generate(prompt, model)
-            
-        except Exception as e:
-            print(f"Error synthesizing answer: {str(e)}")
-            return "Sorry, I encountered an error while trying to generate a summary."
     
-    async def _generate(self, prompt: str, model: str = None) -> str:
+    def generation_stats(self) -> Dict[str, Any]:
+        """Query rewrite fallback rate and average token cost per generation profile."""
+        rewrites = sum(self.rewrite_outcomes.values())
+        fallbacks = rewrites - self.rewrite_outcomes["parsed"]
+        profiles = {}
+        for profile, stats in self._profile_stats.items():
+            calls = stats["calls"]
+            profiles[profile] = {
+                "calls": calls,
+                "avg_prompt_tokens": round(stats["prompt_tokens"] / calls, 1) if calls else None,
+                "avg_generated_tokens": round(stats["generated_tokens"] / calls, 1) if calls else None,
+                "avg_seconds": round(stats["seconds"] / calls, 3) if calls else None
+            }
+        return {
+            "rewrites": {
+                **self.rewrite_outcomes,
+                "fallback_rate": round(fallbacks / rewrites, 3) if rewrites else None
+            },
+            "profiles": profiles
+        }
+    
+    async def _generate_with_context(
+        self,
+        prompt: str,
+        context: Optional[List[int]],
+        model: str = None
+    ) -> Tuple[str, List[int]]:
+        """Generate a response continuing ``context``; returns the response and the new context."""
+        payload = self._generate_payload(prompt, model, "conversation")
+        if context:
+            payload["context"] = context
+        data = await self._post_generate(payload, "conversation")
+        return data["response"].strip(), data.get("context")
+    
+    def _generate_payload(self, prompt: str, model: str = None, profile: str = "synthesis") -> Dict[str, Any]:
+        settings = GENERATION_PROFILES[profile]
+        payload = {
+            "model": model or self.default_model,
+            "prompt": prompt,
+            "stream": False,
+            "keep_alive": OLLAMA_KEEP_ALIVE,  # Keep the model loaded between requests
+            "options": dict(settings["options"])
+        }
+        if "format" in settings:
+            payload["format"] = settings["format"]
+        return payload
+    
+    async def _post_generate(self, payload: Dict[str, Any], profile: str) -> Dict[str, Any]:
+        """Send a generate request and record its token counts under its profile."""
+        with profiling.stage(f"ollama.{profile}"):
+            response = await self._get_client().post(f"{self.base_url}/api/generate", json=payload)
+        if response.status_code != 200:
+            print(f"Ollama API error: {response.status_code} - {response.text}")
+            raise Exception(f"Ollama API returned status code {response.status_code}")
+        
+        data = response.json()
+        stats = self._profile_stats[profile]
+        stats["calls"] += 1
+        stats["prompt_tokens"] += data.get("prompt_eval_count", 0)
+        stats["generated_tokens"] += data.get("eval_count", 0)
+        stats["seconds"] += data.get("total_duration", 0) / 1e9  # reported in nanoseconds
+        return data
+    
+    async def _generate(self, prompt: str, model: str = None, profile: str = "synthesis") -> str:
         """Make an API call to Ollama for text generation."""
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.post(
-                    f"{self.base_url}/api/generate",
-                    json={
-                        "model": model or self.default_model,
-                        "prompt": prompt,
-                        "stream": False,
-                        "options": {
-                            "temperature": 0.7,  # Balance between creativity and consistency
-                            "top_p": 0.9,        # Maintain natural language flow
-                            "top_k": 40,         # Diverse but relevant token selection
-                            "num_predict": 1000,  # Allow for comprehensive responses
-                            "stop": ["[END]"]    # Clear end marker
-                        }
-                    }
-                )
-                
-                if response.status_code == 200:
-                    return response.json()["response"].strip()
-                else:
-                    print(f"Ollama API error: {response.status_code} - {response.text}")
-                    raise Exception(f"Ollama API returned status code {response.status_code}")
+            data = await self._post_generate(self._generate_payload(prompt, model, profile), profile)
+            return data["response"].strip()
                     
         except httpx.TimeoutException:
+            # Raised rather than answered with a placeholder, which would be cached as a result
             print("Ollama request timed out")
-            if "rewrite" in prompt.lower():
-                return prompt.split('"')[1]  # Return original query
-            return "I'm still processing your request. This might take a moment due to the complexity of your query. Please wait or try again with a simpler query."
+            raise
                 
         except Exception as e:
             print(f"Error in Ollama request: {str(e)}")
-            raise 
\ No newline at end of file
+            raise
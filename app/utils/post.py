@@ -0,0 +1,172 @@
+from typing import Any, Dict, Optional
+
+from app.config.settings import POST_CONTENT_MAX_CHARS
+
+
+def _parent_id(fullname: Optional[str]) -> Optional[str]:
+    """Post id of a crosspost parent fullname ("t3_abc123" -> "abc123")."""
+    if not fullname:
+        return None
+    return fullname[3:] if fullname.startswith('t3_') else fullname
+
+
+class Post:
+    """A Reddit post as it flows through search, indexing and ranking.
+
+    One compact ``__slots__`` record is created per post when it is fetched (or read
+    back from the vector store) and the scoring fields are filled in place, instead of
+    copying the post into a new dict at every stage. ``to_dict`` is only called at the
+    response boundary.
+
+    ``created_at`` is always a Unix timestamp in seconds (0 when unknown).
+    """
+
+    __slots__ = (
+        'id', 'title', 'content', 'author', 'subreddit', 'score', 'url',
+        'created_at', 'num_comments', 'upvote_ratio', 'is_self',
+        'is_original_content', 'has_awards', 'link_flair_text', 'domain',
+        'crosspost_parent_id',
+        # Scores attached during ranking
+        'similarity', 'engagement_score', 'time_relevance'
+    )
+
+    def __init__(
+        self,
+        id: str,
+        title: str = '',
+        content: str = '',
+        author: str = '',
+        subreddit: str = '',
+        score: float = 0,
+        url: str = '',
+        created_at: float = 0.0,
+        num_comments: int = 0,
+        upvote_ratio: Optional[float] = 0.0,  # None when unknown (e.g. indexed before it was stored)
+        is_self: Optional[bool] = False,
+        is_original_content: bool = False,
+        has_awards: bool = False,
+        link_flair_text: Optional[str] = None,
+        domain: Optional[str] = None,
+        crosspost_parent_id: Optional[str] = None,
+        similarity: Optional[float] = None,
+        engagement_score: float = 0.0,
+        time_relevance: float = 1.0
+    ):
+        self.id = str(id)
+        self.title = title or ''
+        self.content = content or ''
+        self.author = author or ''
+        self.subreddit = subreddit or ''
+        self.score = score or 0
+        self.url = url or ''
+        self.created_at = float(created_at or 0)
+        self.num_comments = int(num_comments or 0)
+        self.upvote_ratio = float(upvote_ratio) if upvote_ratio is not None else None
+        self.is_self = bool(is_self) if is_self is not None else None
+        self.is_original_content = bool(is_original_content)
+        self.has_awards = bool(has_awards)
+        self.link_flair_text = link_flair_text
+        self.domain = domain
+        self.crosspost_parent_id = crosspost_parent_id
+        self.similarity = similarity
+        self.engagement_score = engagement_score
+        self.time_relevance = time_relevance
+
+    @classmethod
+    def from_submission(cls, submission, max_content_chars: int = POST_CONTENT_MAX_CHARS) -> "Post":
+        """Build a post from an asyncpraw ``Submission``."""
+        selftext = submission.selftext or ""
+        return cls(
+            id=submission.id,
+            title=submission.title,
+            content=selftext[:max_content_chars],
+            author=str(submission.author),
+            subreddit=submission.subreddit.display_name,
+            score=submission.score,
+            url=f"https://reddit.com{submission.permalink}",
+            created_at=submission.created_utc,
+            num_comments=getattr(submission, 'num_comments', 0),
+            upvote_ratio=getattr(submission, 'upvote_ratio', 0.0),
+            is_self=getattr(submission, 'is_self', False),
+            is_original_content=getattr(submission, 'is_original_content', False),
+            has_awards=bool(getattr(submission, 'total_awards_received', 0)),
+            link_flair_text=getattr(submission, 'link_flair_text', None),
+            domain=getattr(submission, 'domain', None),
+            crosspost_parent_id=_parent_id(getattr(submission, 'crosspost_parent', None))
+        )
+
+    @classmethod
+    def from_listing(cls, post_data: Dict[str, Any], max_content_chars: int = POST_CONTENT_MAX_CHARS) -> "Post":
+        """Build a post from the ``data`` of a Reddit JSON listing child (a ``t3`` thing)."""
+        return cls(
+            id=post_data.get('id'),
+            title=post_data.get('title'),
+            content=(post_data.get('selftext') or '')[:max_content_chars],
+            author=post_data.get('author'),
+            subreddit=post_data.get('subreddit'),
+            score=post_data.get('score', 0),
+            url=f"https://www.reddit.com{post_data.get('permalink')}",
+            created_at=post_data.get('created_utc', 0),
+            num_comments=post_data.get('num_comments', 0),
+            upvote_ratio=post_data.get('upvote_ratio', 0),
+            is_self=post_data.get('is_self', False),
+            is_original_content=post_data.get('is_original_content', False),
+            has_awards=bool(post_data.get('total_awards_received', 0)),
+            link_flair_text=post_data.get('link_flair_text'),
+            domain=post_data.get('domain'),
+            crosspost_parent_id=_parent_id(post_data.get('crosspost_parent'))
+        )
+
+    @classmethod
+    def from_metadata(cls, post_id: str, metadata: Dict[str, Any]) -> "Post":
+        """Build a post from the metadata stored alongside its embedding."""
+        created_at = metadata.get('created_at') or 0
+        return cls(
+            id=post_id,
+            title=metadata.get('title', ''),
+            content=metadata.get('content', ''),
+            author=metadata.get('author', ''),
+            subreddit=metadata.get('subreddit', ''),
+            score=metadata.get('score', 0),
+            url=metadata.get('url', ''),
+            # Entries indexed before timestamps were normalized may hold an empty string
+            created_at=created_at if isinstance(created_at, (int, float)) else 0,
+            num_comments=metadata.get('num_comments', 0),
+            # Not stored for posts indexed before these fields were, so unknown rather than made up
+            upvote_ratio=metadata.get('upvote_ratio'),
+            is_self=metadata.get('is_self'),
+            is_original_content=metadata.get('is_original_content', False),
+            has_awards=metadata.get('has_awards', False),
+            link_flair_text=metadata.get('link_flair_text'),
+            domain=metadata.get('domain'),
+            engagement_score=metadata.get('engagement_score', 0)
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Plain dict for JSON responses."""
+        data = {
+            'id': self.id,
+            'title': self.title,
+            'content': self.content,
+            'author': self.author,
+            'subreddit': self.subreddit,
+            'score': self.score,
+            'url': self.url,
+            'created_at': self.created_at,
+            'num_comments': self.num_comments,
+            'upvote_ratio': self.upvote_ratio,
+            'is_self': self.is_self,
+            'is_original_content': self.is_original_content,
+            'has_awards': self.has_awards,
+            'link_flair_text': self.link_flair_text,
+            'domain': self.domain,
+            'relevance_score': self.similarity or 0,
+            'engagement_score': self.engagement_score,
+            'time_relevance': self.time_relevance
+        }
+        if self.similarity is not None:
+            data['similarity'] = self.similarity
+        return data
+
+    def __repr__(self) -> str:
+        return f"Post(id={self.id!r}, subreddit={self.subreddit!r}, title={self.title[:40]!r})"
@@ -0,0 +1,358 @@
+import asyncio
+import contextvars
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+import weakref
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from app.config.settings import PROFILE_SAMPLE_INTERVAL_MS, TRACE_BUFFER_SIZE
+from app.utils.memory import current_rss_bytes, peak_rss_bytes
+
+# Trace of the request the current task (or worker thread) is working for
+_current_trace: contextvars.ContextVar[Optional["RequestTrace"]] = contextvars.ContextVar("request_trace", default=None)
+
+# Frames deeper than this are cut from sampled stacks
+_MAX_STACK_DEPTH = 64
+
+
+class RequestTrace:
+    """Stage timeline, and optionally a sampled profile, of one request."""
+
+    def __init__(self, method: str, path: str, sampling: bool = False):
+        self.id = uuid.uuid4().hex[:12]
+        self.method = method
+        self.path = path
+        self.sampling = sampling
+        self.started_at = time.time()
+        self._started = time.perf_counter()
+        self.total_ms: Optional[float] = None
+        self.status: Optional[int] = None
+        self.stages: List[Dict[str, Any]] = []
+        # Collapsed stacks ("outer;inner;leaf") and how often each was sampled; the
+        # sampler thread writes them while the request runs, so use ``add_sample``
+        self.samples: Counter = Counter()
+        self._samples_lock = threading.Lock()
+        # Tasks created for this request and worker threads currently running for it
+        self.tasks: "weakref.WeakSet[asyncio.Task]" = weakref.WeakSet()
+        self.threads: Dict[int, str] = {}
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self._started) * 1000
+
+    def add_sample(self, stack: str) -> None:
+        with self._samples_lock:
+            self.samples[stack] += 1
+
+    def finish(self, status: int) -> None:
+        self.status = status
+        self.total_ms = round(self.elapsed_ms(), 1)
+
+    def server_timing(self) -> str:
+        """Stage durations as a ``Server-Timing`` header value."""
+        return ", ".join(f"{stage['name']};dur={stage['duration_ms']}" for stage in self.stages)
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._samples_lock:
+            samples = dict(self.samples.most_common())
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "status": self.status,
+            "started_at": self.started_at,
+            "total_ms": self.total_ms,
+            "stages": list(self.stages),
+            "sample_interval_ms": PROFILE_SAMPLE_INTERVAL_MS if self.sampling else None,
+            "samples": samples
+        }
+
+
+def current_trace() -> Optional[RequestTrace]:
+    return _current_trace.get()
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Record a stage of the current request's timeline (a no-op outside a traced request).
+
+    Works around ``await`` as well as around blocking code in a worker thread.
+    Besides its duration, a stage records how much it moved the process RSS and
+    its high-water mark, and (with tracemalloc running) the Python allocations
+    it left behind. These are process-wide numbers: concurrent requests show up
+    in each other's stages, so they are meaningful in aggregate (see
+    ``stage_memory``) or on a quiet instance.
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+    start = trace.elapsed_ms()
+    memory = _MemoryProbe()
+    try:
+        yield
+    finally:
+        entry = {
+            "name": name,
+            "start_ms": round(start, 1),
+            "duration_ms": round(trace.elapsed_ms() - start, 1),
+            **memory.delta()
+        }
+        trace.stages.append(entry)
+        stage_memory.record(entry)
+
+
+class _MemoryProbe:
+    """Process memory at the start of a stage."""
+
+    __slots__ = ("rss", "peak", "allocated")
+
+    def __init__(self):
+        self.rss = current_rss_bytes()
+        self.peak = peak_rss_bytes()
+        self.allocated = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else None
+
+    def delta(self) -> Dict[str, int]:
+        delta = {
+            "rss_delta_kb": (current_rss_bytes() - self.rss) // 1024,
+            "peak_rss_growth_kb": (peak_rss_bytes() - self.peak) // 1024
+        }
+        if self.allocated is not None and tracemalloc.is_tracing():
+            delta["alloc_delta_kb"] = (tracemalloc.get_traced_memory()[0] - self.allocated) // 1024
+        return delta
+
+
+class StageMemory:
+    """Memory accounting of every stage name over all traced requests."""
+
+    def __init__(self):
+        self._stats: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, entry: Dict[str, Any]) -> None:
+        with self._lock:
+            stats = self._stats.setdefault(entry["name"], {
+                "count": 0, "rss_delta_kb_total": 0, "rss_delta_kb_max": 0, "peak_rss_growth_kb_total": 0
+            })
+            stats["count"] += 1
+            stats["rss_delta_kb_total"] += entry["rss_delta_kb"]
+            stats["rss_delta_kb_max"] = max(stats["rss_delta_kb_max"], entry["rss_delta_kb"])
+            stats["peak_rss_growth_kb_total"] += entry["peak_rss_growth_kb"]
+            if "alloc_delta_kb" in entry:
+                stats["alloc_delta_kb_max"] = max(stats.get("alloc_delta_kb_max", 0), entry["alloc_delta_kb"])
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {
+                name: {
+                    "count": stats["count"],
+                    "rss_delta_kb_avg": round(stats["rss_delta_kb_total"] / stats["count"], 1),
+                    "rss_delta_kb_max": stats["rss_delta_kb_max"],
+                    # Stages that keep pushing the peak up are the ones to put on a budget
+                    "peak_rss_growth_kb_total": stats["peak_rss_growth_kb_total"],
+                    **({"alloc_delta_kb_max": stats["alloc_delta_kb_max"]} if "alloc_delta_kb_max" in stats else {})
+                }
+                for name, stats in self._stats.items()
+            }
+
+
+stage_memory = StageMemory()
+
+
+@contextmanager
+def trace_request(method: str, path: str, sampling: bool = False) -> Iterator[RequestTrace]:
+    """Trace everything the current task does (and the tasks it creates) until the block exits."""
+    trace = RequestTrace(method, path, sampling)
+    token = _current_trace.set(trace)
+    if sampling:
+        sampler.add(trace)
+    try:
+        yield trace
+    finally:
+        if sampling:
+            sampler.remove(trace)
+        _current_trace.reset(token)
+
+
+async def to_thread(func: Callable, *args, **kwargs) -> Any:
+    """``asyncio.to_thread`` that attributes the worker thread to the current request while it runs."""
+    trace = _current_trace.get()
+    if trace is None or not trace.sampling:
+        return await asyncio.to_thread(func, *args, **kwargs)
+
+    def run():
+        thread_id = threading.get_ident()
+        trace.threads[thread_id] = getattr(func, "__qualname__", repr(func))
+        try:
+            return func(*args, **kwargs)
+        finally:
+            trace.threads.pop(thread_id, None)
+
+    return await asyncio.to_thread(run)
+
+
+def install(loop: asyncio.AbstractEventLoop) -> None:
+    """Register every task created during a sampled request with its trace, so its await chain is sampled."""
+    previous = loop.get_task_factory()
+
+    def factory(loop, coro, **kwargs):
+        task = previous(loop, coro, **kwargs) if previous else asyncio.Task(coro, loop=loop, **kwargs)
+        trace = _current_trace.get()
+        if trace is not None and trace.sampling:
+            trace.tasks.add(task)
+        return task
+
+    loop.set_task_factory(factory)
+
+
+class Sampler:
+    """Samples the stacks of traced requests from a background thread.
+
+    Sampling is async-aware: for every task of a request it walks the chain of
+    awaited coroutines, so time spent waiting on Reddit or Ollama shows up under
+    the coroutine that awaits it rather than as an idle event loop. Worker
+    threads running for the request (see ``to_thread``) are sampled from their
+    real stacks. The thread only runs while a sampled request is in flight.
+    """
+
+    def __init__(self, interval_ms: float = PROFILE_SAMPLE_INTERVAL_MS):
+        self.interval = interval_ms / 1000
+        self._traces: List[RequestTrace] = []
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def add(self, trace: RequestTrace) -> None:
+        with self._lock:
+            self._traces.append(trace)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="request-sampler", daemon=True)
+                self._thread.start()
+
+    def remove(self, trace: RequestTrace) -> None:
+        with self._lock:
+            if trace in self._traces:
+                self._traces.remove(trace)
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                traces = list(self._traces)
+                if not traces:
+                    self._thread = None
+                    return
+            frames = sys._current_frames()
+            for trace in traces:
+                self._sample(trace, frames)
+
+    def _sample(self, trace: RequestTrace, frames: Dict[int, Any]) -> None:
+        try:
+            tasks = list(trace.tasks)
+        except RuntimeError:  # the set changed while it was copied; skip this tick
+            return
+        for task in tasks:
+            if not task.done():
+                trace.add_sample(_task_stack(task))
+        for thread_id, name in list(trace.threads.items()):
+            frame = frames.get(thread_id)
+            if frame is not None:
+                trace.add_sample(f"thread:{name};{_frame_stack(frame)}")
+
+
+def _describe(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+
+def _task_stack(task: asyncio.Task) -> str:
+    """Collapsed stack of the coroutines a task is (a)waiting in, outermost first."""
+    parts = []
+    awaitable = task.get_coro()
+    while awaitable is not None and len(parts) < _MAX_STACK_DEPTH:
+        frame = getattr(awaitable, "cr_frame", None) or getattr(awaitable, "gi_frame", None)
+        if frame is None:
+            # A future or other awaitable at the end of the chain
+            if not hasattr(awaitable, "cr_await") and not hasattr(awaitable, "gi_yieldfrom"):
+                parts.append(f"<{type(awaitable).__name__}>")
+            break
+        parts.append(_describe(frame))
+        awaitable = getattr(awaitable, "cr_await", None) or getattr(awaitable, "gi_yieldfrom", None)
+    return ";".join(parts) or "<idle>"
+
+
+def _frame_stack(frame) -> str:
+    parts = []
+    while frame is not None and len(parts) < _MAX_STACK_DEPTH:
+        parts.append(_describe(frame))
+        frame = frame.f_back
+    return ";".join(reversed(parts))
+
+
+sampler = Sampler()
+
+
+class TraceStore:
+    """Bounded on-disk ring buffer of request traces, one JSON file per trace."""
+
+    def __init__(self, directory: str, max_traces: int = TRACE_BUFFER_SIZE):
+        self.directory = directory
+        self.max_traces = max_traces
+        self._lock = threading.Lock()
+
+    def save(self, trace: RequestTrace) -> None:
+        """Write a trace and drop the oldest ones beyond ``max_traces`` (blocking)."""
+        os.makedirs(self.directory, exist_ok=True)
+        # Millisecond timestamp first, so names sort oldest first
+        name = f"{int(trace.started_at * 1000):013d}-{trace.id}.json"
+        tmp_path = os.path.join(self.directory, f".{name}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(trace.to_dict(), f)
+        os.replace(tmp_path, os.path.join(self.directory, name))
+
+        with self._lock:
+            names = self._names()
+            for old in names[:max(0, len(names) - self.max_traces)]:
+                try:
+                    os.remove(os.path.join(self.directory, old))
+                except OSError:
+                    pass
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Summaries of the stored traces, newest first."""
+        summaries = []
+        for name in reversed(self._names()):
+            try:
+                with open(os.path.join(self.directory, name)) as f:
+                    trace = json.load(f)
+            except (OSError, ValueError):
+                continue
+            slowest = max(trace["stages"], key=lambda stage: stage["duration_ms"], default=None)
+            summaries.append({
+                "id": trace["id"],
+                "method": trace["method"],
+                "path": trace["path"],
+                "status": trace["status"],
+                "started_at": trace["started_at"],
+                "total_ms": trace["total_ms"],
+                "slowest_stage": slowest["name"] if slowest else None,
+                "sampled": bool(trace["samples"])
+            })
+        return summaries
+
+    def path_of(self, trace_id: str) -> Optional[str]:
+        for name in self._names():
+            if name.endswith(f"-{trace_id}.json"):
+                return os.path.join(self.directory, name)
+        return None
+
+    def _names(self) -> List[str]:
+        try:
+            return sorted(name for name in os.listdir(self.directory) if name.endswith(".json") and not name.startswith("."))
+        except FileNotFoundError:
+            return []
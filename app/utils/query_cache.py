@@ -0,0 +1,123 @@
+import time
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+from app.config.settings import (
+    SEMANTIC_CACHE_THRESHOLD, SEMANTIC_CACHE_TTL, SEMANTIC_CACHE_REFRESH_AFTER, SEMANTIC_CACHE_SIZE
+)
+
+
+class CachedResult:
+    """A cached search result and the query it was computed for."""
+
+    __slots__ = ('query', 'embedding', 'payload', 'created_at', 'refreshing')
+
+    def __init__(self, query: str, embedding: np.ndarray, payload: Any):
+        self.query = query
+        self.embedding = embedding
+        self.payload = payload
+        self.created_at = time.monotonic()
+        self.refreshing = False
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.created_at
+
+
+class SemanticQueryCache:
+    """Search results keyed on the meaning of the query rather than its exact text.
+
+    Queries are embedded with the vector store's model and a lookup returns the
+    cached result of the most similar earlier query, if it is at least
+    ``threshold`` similar (cosine) and was made in the same scope (subreddit and
+    time filter). Results older than ``refresh_after`` are still served, but
+    flagged so the caller can recompute them in the background.
+    """
+
+    def __init__(
+        self,
+        embed: Callable[[List[str]], List[List[float]]],
+        threshold: float = SEMANTIC_CACHE_THRESHOLD,
+        ttl: float = SEMANTIC_CACHE_TTL,
+        refresh_after: float = SEMANTIC_CACHE_REFRESH_AFTER,
+        max_size: int = SEMANTIC_CACHE_SIZE
+    ):
+        self._embed = embed
+        self.threshold = threshold
+        self.ttl = ttl
+        self.refresh_after = refresh_after
+        self.max_size = max_size
+        self._entries: Dict[Hashable, List[CachedResult]] = {}
+        # Stacked embeddings of each scope, rebuilt when the scope changes
+        self._matrices: Dict[Hashable, np.ndarray] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def embed_query(self, query: str) -> np.ndarray:
+        """Unit-length embedding of a query (blocking; run it in a worker thread)."""
+        embedding = np.asarray(self._embed([query])[0], dtype=np.float32)
+        norm = np.linalg.norm(embedding)
+        return embedding / norm if norm > 0 else embedding
+
+    def lookup(self, embedding: np.ndarray, scope: Hashable) -> Optional[Tuple[CachedResult, float]]:
+        """Most similar cached result in the scope, with its similarity, if it is close enough."""
+        self._expire(scope)
+        matrix = self._matrices.get(scope)
+        if matrix is None:
+            self.misses += 1
+            return None
+
+        similarities = matrix @ embedding
+        best = int(np.argmax(similarities))
+        if similarities[best] < self.threshold:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return self._entries[scope][best], float(similarities[best])
+
+    def needs_refresh(self, entry: CachedResult) -> bool:
+        return entry.age > self.refresh_after and not entry.refreshing
+
+    def store(self, query: str, embedding: np.ndarray, scope: Hashable, payload: Any,
+              replaces: Optional[CachedResult] = None) -> None:
+        """Cache a result, optionally in place of the entry it refreshes."""
+        if self.ttl <= 0:
+            return
+        entries = self._entries.setdefault(scope, [])
+        if replaces is not None and replaces in entries:
+            entries.remove(replaces)
+        entries.append(CachedResult(query, embedding, payload))
+        self._rebuild(scope)
+        self._evict()
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._matrices.clear()
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self._entries.values())
+
+    def _expire(self, scope: Hashable) -> None:
+        entries = self._entries.get(scope)
+        if entries and any(entry.age > self.ttl for entry in entries):
+            self._entries[scope] = [entry for entry in entries if entry.age <= self.ttl]
+            self._rebuild(scope)
+
+    def _evict(self) -> None:
+        """Drop the oldest entries once the cache holds more than ``max_size`` results."""
+        while len(self) > self.max_size:
+            scope, oldest = min(
+                ((scope, entry) for scope, entries in self._entries.items() for entry in entries),
+                key=lambda item: item[1].created_at
+            )
+            self._entries[scope].remove(oldest)
+            self._rebuild(scope)
+
+    def _rebuild(self, scope: Hashable) -> None:
+        entries = self._entries.get(scope)
+        if entries:
+            self._matrices[scope] = np.stack([entry.embedding for entry in entries])
+        else:
+            self._entries.pop(scope, None)
+            self._matrices.pop(scope, None)
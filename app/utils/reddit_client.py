@@ -1,18 +1,130 @@
-import asyncpraw
 import aiohttp
+import heapq
 import json
+import math
 import random
 import time
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Optional, Tuple
 import traceback
-from app.config.settings import REDDIT_CLIENT_ID, REDDIT_CLIENT_SECRET, REDDIT_USER_AGENT
-from bs4 import BeautifulSoup
+from app.config.settings import (
+    REDDIT_CLIENT_ID, REDDIT_CLIENT_SECRET, REDDIT_USER_AGENT,
+    REDDIT_SEARCH_SORT, REDDIT_SEARCH_OVERFETCH, REDDIT_SEARCH_TIMEOUT,
+    REDDIT_HEDGE_REQUESTS, REDDIT_HEDGE_MIN_DELAY, DEDUPLICATE_POSTS, POST_MAX_CHARS,
+    INDEX_POST_MAX_CHARS
+)
+from app.utils.post import Post
+from app.utils import profiling
+from app.utils.deadline import Deadline
+from app.utils.resilience import CircuitBreaker, hedged
+from app.utils.simhash import drop_near_duplicates
 import asyncio
 import re
 
+def validate_subreddit(subreddit: str) -> bool:
+    """Validate subreddit name and filter out NSFW/meme subreddits."""
+    # Basic validation
+    if not re.match(r'^[A-Za-z0-9_]+$', subreddit):
+        return False
+    
+    # Filter out common NSFW subreddits and meme-focused ones
+    nsfw_or_meme_patterns = [
+        r'nsfw', r'porn', r'gonewild', r'memes', r'dankmemes', 
+        r'circlejerk', r'shitpost', r'funny', r'onlyfans'
+    ]
+    
+    subreddit_lower = subreddit.lower()
+    return not any(re.search(pattern, subreddit_lower) for pattern in nsfw_or_meme_patterns)
+
+def to_reddit_time_filter(time_period: str = None) -> str:
+    """Map a time period from the query ("this week", "recent", ...) to a Reddit time filter."""
+    if not time_period:
+        return None
+    
+    time_mapping = {
+        'today': 'day',
+        'yesterday': 'day',  # Reddit API doesn't have 'yesterday'
+        'this week': 'week',
+        'this month': 'month',
+        'recent': 'month',
+        'latest': 'month', 
+        'new': 'week'
+    }
+    return time_mapping.get(time_period.lower())
+
+def has_meaningful_content(post: Post) -> bool:
+    """Self posts need a body; link posts are useful on their own."""
+    return bool(post.content) or not post.is_self
+
+class SearchPage(list):
+    """Posts of one search page, plus the position of the raw listing they came from.
+    
+    The posts may be filtered (e.g. empty self posts dropped), so paging has to
+    continue from ``after`` and judge the end of the results by ``raw_count``.
+    """
+    
+    def __init__(self, posts: List[Post] = (), after: str = None, raw_count: int = 0):
+        super().__init__(posts)
+        self.after = after  # Fullname of the listing's last item, None at its end
+        self.raw_count = raw_count  # Items in the listing before filtering
+
+class SubredditStream:
+    """Pages through the search results of one subreddit on demand.
+    
+    ``search_posts`` merges several streams and only asks a stream for its next
+    page while that page could still change the top results, so most searches
+    stop after a single small page per subreddit.
+    """
+    
+    def __init__(self, client: "RedditClient", query: str, subreddit: str, limit: int,
+                 share: int, time_filter: str = None, sort: str = REDDIT_SEARCH_SORT):
+        self.client = client
+        self.query = query
+        self.subreddit = subreddit
+        self.time_filter = time_filter
+        self.sort = sort
+        self.share = share  # Posts this stream is expected to contribute
+        self.max_items = limit  # A single subreddit never needs to supply more than the limit
+        self.page_size = min(share, 100)  # Reddit returns at most 100 items per page
+        self.after = None
+        self.fetched = 0
+        self.last_score = math.inf
+        self.exhausted = False
+    
+    async def next_page(self) -> List[Post]:
+        """Fetch the next page from whichever search backend is healthy."""
+        page_size = min(self.page_size, self.max_items - self.fetched)
+        posts = await self.client._search_backends(
+            self.query, self.subreddit, page_size, self.time_filter, sort=self.sort, after=self.after
+        )
+        
+        if posts:
+            self.last_score = posts[-1].score
+        self.after = posts.after
+        self.fetched += posts.raw_count
+        if posts.raw_count < page_size or not posts.after or self.fetched >= self.max_items:
+            self.exhausted = True
+        return posts
+    
+    def can_improve(self, threshold: Optional[float]) -> bool:
+        """Whether another page could still change the current top results.
+        
+        ``threshold`` is the lowest score in the current top results, or None while
+        there are fewer results than the limit.
+        """
+        if self.exhausted:
+            return False
+        if threshold is None:
+            return True
+        if self.sort == "top":
+            # Pages come in descending score order, so later posts score at most last_score
+            return self.last_score > threshold
+        # Relevance order gives no score bound: stop once the stream delivered its share
+        return self.fetched < self.share
+
 class RedditClient:
     def __init__(self):
         print(f"Initializing Reddit client with ID: {REDDIT_CLIENT_ID}")
+        import asyncpraw
         self.reddit = asyncpraw.Reddit(
             client_id=REDDIT_CLIENT_ID,
             client_secret=REDDIT_CLIENT_SECRET,
@@ -35,6 +147,17 @@ class RedditClient:
         
         # Initialize session to None - will be created when needed
         self.session = None
+        
+        # Health of the two search backends, used to route around an outage
+        self.api_breaker = CircuitBreaker("reddit_api")
+        self.scraping_breaker = CircuitBreaker("reddit_scraping")
+    
+    async def prime(self):
+        """Authenticate and open asyncpraw's connection pool ahead of the first search."""
+        if not REDDIT_CLIENT_ID:
+            return
+        subreddit = await self.reddit.subreddit("announcements", fetch=True)
+        print(f"Reddit API connection ready (r/{subreddit.display_name})")
     
     async def close(self):
         """Close all client resources properly."""
@@ -46,72 +169,213 @@ class RedditClient:
         if hasattr(self.reddit, 'close') and callable(self.reddit.close):
             await self.reddit.close()
     
-    async def search_posts(self, query: str, subreddit: str = None, limit: int = 10, time_filter: str = None) -> List[Dict[str, Any]]:
+    async def search_posts(
+        self,
+        query: str,
+        subreddit: str = None,
+        limit: int = 10,
+        time_filter: str = None,
+        deadline: Deadline = None
+    ) -> List[Post]:
+        """Search the most relevant subreddits, within the request's deadline if one is given."""
+        deadline = deadline or Deadline()
         try:
-            # If subreddit specified, prioritize it
-            if subreddit:
-                print(f"Searching specifically in subreddit: r/{subreddit}")
-                discovered_subreddits = [subreddit]
-            else:
-                # Otherwise, try to find relevant subreddits 
-                discovered_subreddits = await self._discover_subreddits(query)
-                print(f"Discovered subreddits: {discovered_subreddits}")
-                
-                # If still no subreddits found, try some popular ones as fallback
-                if not discovered_subreddits:
-                    print("No relevant subreddits found, using fallbacks")
-                    # Extract potential topic keywords from query
-                    keywords = re.findall(r'\b\w{4,}\b', query.lower())
-                    if any(kw in ['productivity', 'producti'] for kw in keywords):
-                        discovered_subreddits = ['productivity']
-                    elif any(kw in ['programming', 'code', 'software', 'developer'] for kw in keywords):
-                        discovered_subreddits = ['programming']
-                    else:
-                        discovered_subreddits = ['AskReddit'] 
+            discovered_subreddits = await self.resolve_subreddits(query, subreddit, deadline)
+            reddit_time_filter = self._map_time_filter(time_filter)
             
-            # Map time filter to Reddit API parameter
-            reddit_time_filter = None
-            if time_filter:
-                time_mapping = {
-                    'today': 'day',
-                    'yesterday': 'day',  # Reddit API doesn't have 'yesterday'
-                    'this week': 'week',
-                    'this month': 'month',
-                    'recent': 'month',
-                    'latest': 'month', 
-                    'new': 'week'
-                }
-                reddit_time_filter = time_mapping.get(time_filter.lower())
-                if reddit_time_filter:
-                    print(f"Using time filter: {reddit_time_filter}")
+            # Search in each discovered subreddit, streaming pages only as long as they matter
+            subreddits = discovered_subreddits[:5]  # Increased to top 5 subreddits for better coverage
+            share = max(1, math.ceil(limit * REDDIT_SEARCH_OVERFETCH / len(subreddits)))
+            streams = [
+                SubredditStream(self, query, sub, limit, share, reddit_time_filter)
+                for sub in subreddits
+            ]
+            timeout = deadline.timeout("reddit_fetch", REDDIT_SEARCH_TIMEOUT)
+            with profiling.stage("reddit_fetch"):
+                return await self._merge_streams(streams, limit, timeout, deadline)
             
-            all_posts = []
-            tasks = []
+        except Exception as e:
+            print(f"Error in search_posts: {str(e)}")
+            print(traceback.format_exc())
+            return []
+    
+    async def _merge_streams(
+        self,
+        streams: List[SubredditStream],
+        limit: int,
+        timeout: float = REDDIT_SEARCH_TIMEOUT,
+        deadline: Deadline = None
+    ) -> List[Post]:
+        """Merge subreddit streams into the top ``limit`` posts by score.
+        
+        Pages are requested concurrently; after each page arrives the current top
+        results are recomputed and only streams that could still change them are
+        asked for another page. Whatever has been merged when ``timeout`` runs out
+        is returned.
+        """
+        loop = asyncio.get_running_loop()
+        expires_at = loop.time() + timeout
+        candidates: Dict[str, Post] = {}
+        pending = {asyncio.ensure_future(stream.next_page()): stream for stream in streams}
+        pages = len(pending)
+        
+        try:
+            while pending:
+                remaining = expires_at - loop.time()
+                if remaining <= 0:
+                    print(f"Reddit search timed out with {len(pending)} pages outstanding, returning partial results")
+                    if deadline is not None:
+                        deadline.truncate("reddit_fetch")
+                    break
+                
+                done, _ = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    stream = pending.pop(task)
+                    try:
+                        page = task.result()
+                    except Exception as e:
+                        print(f"Error searching subreddit {stream.subreddit}: {str(e)}")
+                        stream.exhausted = True
+                        continue
+                    for post in page:
+                        candidates.setdefault(post.id, post)
+                
+                top = heapq.nlargest(limit, candidates.values(), key=lambda x: x.score)
+                threshold = top[-1].score if len(top) >= limit else None
+                for stream in streams:
+                    if stream not in pending.values() and stream.can_improve(threshold):
+                        pending[asyncio.ensure_future(stream.next_page())] = stream
+                        pages += 1
+        finally:
+            for task in pending:
+                task.cancel()
+        
+        print(f"Merged {len(candidates)} posts from {pages} pages across {len(streams)} subreddits")
+        return self._select_top(list(candidates.values()), limit)
+    
+    async def search_posts_batch(self, searches: List[Dict[str, Any]]) -> List[List[Post]]:
+        """Run several searches as one shared pipeline.
+        
+        Each search is a dict with ``query``, ``subreddit``, ``limit`` and ``time_filter``.
+        Subreddit discovery runs once per distinct query and every distinct
+        (query, subreddit, time filter) fetch is issued only once, with the
+        largest requested limit, and shared by all searches that need it.
+        
+        Returns one list of posts per search, in the same order.
+        """
+        try:
+            # 1. Resolve subreddits, once per distinct (query, subreddit) pair
+            resolve_tasks = {}
+            for search in searches:
+                key = (search['query'].strip().lower(), (search.get('subreddit') or '').lower())
+                if key not in resolve_tasks:
+                    resolve_tasks[key] = asyncio.ensure_future(
+                        self.resolve_subreddits(search['query'], search.get('subreddit'))
+                    )
+            await asyncio.gather(*resolve_tasks.values(), return_exceptions=True)
             
-            # Search in each discovered subreddit
-            for sub in discovered_subreddits[:5]:  # Increased to top 5 subreddits for better coverage
-                tasks.append(self._search_subreddit(query, sub, limit, reddit_time_filter))
+            # 2. Plan the fetches, merging overlapping ones
+            fetch_plan = {}
+            search_fetch_keys = []
+            for search in searches:
+                key = (search['query'].strip().lower(), (search.get('subreddit') or '').lower())
+                task = resolve_tasks[key]
+                subreddits = task.result() if not task.exception() else ['AskReddit']
+                reddit_time_filter = self._map_time_filter(search.get('time_filter'))
+                limit = search.get('limit') or 10
+                
+                keys = []
+                for sub in subreddits[:5]:
+                    fetch_key = (search['query'].strip().lower(), sub.lower(), reddit_time_filter)
+                    if fetch_key in fetch_plan:
+                        planned = fetch_plan[fetch_key]
+                        planned['limit'] = max(planned['limit'], limit)
+                    else:
+                        fetch_plan[fetch_key] = {
+                            'query': search['query'],
+                            'subreddit': sub,
+                            'limit': limit,
+                            'time_filter': reddit_time_filter
+                        }
+                    keys.append(fetch_key)
+                search_fetch_keys.append(keys)
             
-            # Run searches in parallel
-            results = await asyncio.gather(*tasks, return_exceptions=True)
+            print(f"Batch search: {len(searches)} searches share {len(fetch_plan)} subreddit fetches")
             
-            # Combine and deduplicate results
-            seen_ids = set()
-            for posts in results:
-                if isinstance(posts, list):
-                    for post in posts:
-                        if post['id'] not in seen_ids:
-                            all_posts.append(post)
-                            seen_ids.add(post['id'])
+            # 3. Fetch everything in parallel
+            fetch_keys = list(fetch_plan.keys())
+            fetched = await asyncio.gather(
+                *(self._search_subreddit(**fetch_plan[key]) for key in fetch_keys),
+                return_exceptions=True
+            )
+            results_by_key = dict(zip(fetch_keys, fetched))
             
-            # Sort by score and limit
-            all_posts.sort(key=lambda x: x.get('score', 0), reverse=True)
-            return all_posts[:limit]
+            # 4. Merge per search
+            return [
+                self._merge_results([results_by_key[key] for key in keys], search.get('limit') or 10)
+                for search, keys in zip(searches, search_fetch_keys)
+            ]
             
         except Exception as e:
-            print(f"Error in search_posts: {str(e)}")
+            print(f"Error in search_posts_batch: {str(e)}")
             print(traceback.format_exc())
-            return []
+            return [[] for _ in searches]
+    
+    async def resolve_subreddits(self, query: str, subreddit: str = None, deadline: Deadline = None) -> List[str]:
+        """Return the subreddits to search for a query."""
+        # If subreddit specified, prioritize it
+        if subreddit:
+            print(f"Searching specifically in subreddit: r/{subreddit}")
+            return [subreddit]
+        
+        # Otherwise, try to find relevant subreddits 
+        # Out of time, discovery falls through to the keyword fallbacks below
+        discovered_subreddits = await (deadline or Deadline()).run(
+            "discovery", self._discover_subreddits(query), fallback=[]
+        )
+        print(f"Discovered subreddits: {discovered_subreddits}")
+        
+        # If still no subreddits found, try some popular ones as fallback
+        if not discovered_subreddits:
+            print("No relevant subreddits found, using fallbacks")
+            # Extract potential topic keywords from query
+            keywords = re.findall(r'\b\w{4,}\b', query.lower())
+            if any(kw in ['productivity', 'producti'] for kw in keywords):
+                discovered_subreddits = ['productivity']
+            elif any(kw in ['programming', 'code', 'software', 'developer'] for kw in keywords):
+                discovered_subreddits = ['programming']
+            else:
+                discovered_subreddits = ['AskReddit'] 
+        
+        return discovered_subreddits
+    
+    def _map_time_filter(self, time_filter: str = None) -> str:
+        """Map a time period from the query to the Reddit API time filter."""
+        reddit_time_filter = to_reddit_time_filter(time_filter)
+        if reddit_time_filter:
+            print(f"Using time filter: {reddit_time_filter}")
+        return reddit_time_filter
+    
+    def _merge_results(self, results: List[Any], limit: int) -> List[Post]:
+        """Combine per-subreddit results, dropping duplicates and failed fetches."""
+        all_posts = []
+        seen_ids = set()
+        for posts in results:
+            if isinstance(posts, list):
+                for post in posts:
+                    if post.id not in seen_ids:
+                        all_posts.append(post)
+                        seen_ids.add(post.id)
+        
+        return self._select_top(all_posts, limit)
+    
+    def _select_top(self, posts: List[Post], limit: int) -> List[Post]:
+        """Highest scoring posts, keeping only the best of each crosspost/repost group."""
+        # Sort by score and limit
+        posts = sorted(posts, key=lambda x: x.score, reverse=True)
+        if DEDUPLICATE_POSTS:
+            return drop_near_duplicates(posts, limit)
+        return posts[:limit]
     
     async def _discover_subreddits(self, query: str) -> List[str]:
         """
@@ -194,35 +458,101 @@ class RedditClient:
     
     def _validate_subreddit(self, subreddit: str) -> bool:
         """Validate subreddit name and filter out NSFW/meme subreddits."""
-        # Basic validation
-        if not re.match(r'^[A-Za-z0-9_]+$', subreddit):
-            return False
-        
-        # Filter out common NSFW subreddits and meme-focused ones
-        nsfw_or_meme_patterns = [
-            r'nsfw', r'porn', r'gonewild', r'memes', r'dankmemes', 
-            r'circlejerk', r'shitpost', r'funny', r'onlyfans'
-        ]
-        
-        subreddit_lower = subreddit.lower()
-        return not any(re.search(pattern, subreddit_lower) for pattern in nsfw_or_meme_patterns)
+        return validate_subreddit(subreddit)
     
-    async def _search_subreddit(self, query: str, subreddit: str, limit: int, time_filter: str = None) -> List[Dict[str, Any]]:
+    async def _search_subreddit(self, query: str, subreddit: str, limit: int, time_filter: str = None) -> List[Post]:
         """Search within a specific subreddit with retries and error handling."""
         try:
-            # First try Reddit API
-            posts = await self._search_with_api(query, subreddit, limit, time_filter)
-            if posts:
-                return posts
-            
-            # If API fails, try web scraping
-            print(f"No results from API for r/{subreddit}, trying web scraping...")
-            return await self._search_with_scraping(query, subreddit, limit, time_filter)
-            
+            return await self._search_backends(query, subreddit, limit, time_filter)
         except Exception as e:
             print(f"Error searching subreddit {subreddit}: {str(e)}")
             return []
     
+    async def _search_backends(
+        self,
+        query: str,
+        subreddit: str,
+        limit: int,
+        time_filter: str = None,
+        sort: str = "relevance",
+        after: str = None
+    ) -> SearchPage:
+        """Search through the Reddit API, with JSON scraping as the second backend.
+        
+        While a backend's circuit breaker is open, requests go straight to the other
+        one. With both healthy the API is tried first, and scraping is hedged in if
+        the API hasn't answered within its recent p95 latency (or starts right away
+        when the API fails or finds nothing).
+        """
+        def api():
+            return self.api_breaker.call(
+                self._search_with_api(query, subreddit, limit, time_filter, sort=sort, after=after)
+            )
+        
+        def scraping():
+            print(f"Using web scraping for r/{subreddit}...")
+            return self.scraping_breaker.call(
+                self._search_with_scraping(query, subreddit, limit, time_filter, sort=sort, after=after)
+            )
+        
+        api_allowed = self.api_breaker.available()
+        scraping_allowed = self.scraping_breaker.available()
+        if not api_allowed and scraping_allowed:
+            return await scraping()
+        if not scraping_allowed:
+            # Both tripped: keep using the API, that's where results are expected
+            if not api_allowed:
+                print("Both Reddit search backends are failing, trying the API anyway")
+            return await api()
+        
+        if REDDIT_HEDGE_REQUESTS:
+            delay = max(REDDIT_HEDGE_MIN_DELAY, self.api_breaker.latency_percentile(0.95) or self.api_breaker.slow_call_seconds)
+        else:
+            delay = None  # Only fall back once the API call has finished
+        # An empty first page may mean the API is degraded; an empty later page is just the end
+        accept = bool if after is None else (lambda posts: True)
+        return await hedged(api, scraping, delay, accept)
+    
+    async def get_new_posts(self, subreddit: str, limit: int = 100, after: str = None) -> List[Post]:
+        """Newest posts of a subreddit, newest first (``after`` continues with older ones).
+        
+        These posts are fetched for indexing, so they keep up to ``INDEX_POST_MAX_CHARS``
+        of their body. Uses the API unless its circuit breaker is open or it fails, then the JSON listing.
+        """
+        if REDDIT_CLIENT_ID and self.api_breaker.available():
+            try:
+                return await self.api_breaker.call(self._new_with_api(subreddit, limit, after))
+            except Exception as e:
+                print(f"Error listing new posts of r/{subreddit} via the API: {str(e)}")
+        return await self.scraping_breaker.call(self._new_with_scraping(subreddit, limit, after))
+    
+    async def _new_with_api(self, subreddit: str, limit: int, after: str = None) -> List[Post]:
+        subreddit_obj = await self.reddit.subreddit(subreddit)
+        kwargs = {"limit": limit}
+        if after:
+            kwargs["params"] = {"after": after}
+        return [Post.from_submission(post, max_content_chars=INDEX_POST_MAX_CHARS) async for post in subreddit_obj.new(**kwargs)]
+    
+    async def _new_with_scraping(self, subreddit: str, limit: int, after: str = None) -> List[Post]:
+        url = f"https://www.reddit.com/r/{subreddit}/new.json?limit={limit}"
+        if after:
+            url += f"&after={after}"
+        await self._delay_request()
+        async with self._get_session().get(url) as response:
+            response.raise_for_status()
+            data = await response.json()
+        return [
+            Post.from_listing(child.get('data', {}), max_content_chars=INDEX_POST_MAX_CHARS)
+            for child in data.get('data', {}).get('children', [])
+        ]
+    
+    def backend_health(self) -> Dict[str, Any]:
+        """Circuit breaker state of each search backend."""
+        return {
+            "reddit_api": self.api_breaker.snapshot(),
+            "reddit_scraping": self.scraping_breaker.snapshot()
+        }
+    
     def _get_session(self) -> aiohttp.ClientSession:
         """Get or create a session with a random user agent."""
         if self.session is None or self.session.closed:
@@ -241,14 +571,22 @@ class RedditClient:
         
         self.last_request_time = time.time()
     
-    async def _search_with_api(self, query: str, subreddit: str = None, limit: int = 10, time_filter: str = None) -> List[Dict[str, Any]]:
+    async def _search_with_api(
+        self,
+        query: str,
+        subreddit: str = None,
+        limit: int = 10,
+        time_filter: str = None,
+        sort: str = "relevance",
+        after: str = None
+    ) -> SearchPage:
         try:
             print(f"Starting Reddit API search with query: {query}, subreddit: {subreddit}")
             
             # Use the existing Reddit instance instead of creating a new one
             reddit = self.reddit
             
-            results = []
+            results = SearchPage()
             
             # Different search approach based on whether a subreddit is specified
             if subreddit:
@@ -259,26 +597,25 @@ class RedditClient:
                     subreddit = "Cooking"
                 
                 subreddit_obj = await reddit.subreddit(subreddit)
-                
-                # Add time filter if specified
-                if time_filter:
-                    search_generator = subreddit_obj.search(query, limit=limit, sort="relevance", time_filter=time_filter)
-                else:
-                    search_generator = subreddit_obj.search(query, limit=limit, sort="relevance")
             else:
                 print("Searching across Reddit")
                 subreddit_obj = await reddit.subreddit("all")
-                
-                # Add time filter if specified
-                if time_filter:
-                    search_generator = subreddit_obj.search(query, limit=limit, sort="relevance", time_filter=time_filter)
-                else:
-                    search_generator = subreddit_obj.search(query, limit=limit, sort="relevance")
+            
+            search_kwargs = {"limit": limit, "sort": sort}
+            # Add time filter if specified
+            if time_filter:
+                search_kwargs["time_filter"] = time_filter
+            # Continue after the last post of the previous page when paging
+            if after:
+                search_kwargs["params"] = {"after": after}
+            search_generator = subreddit_obj.search(query, **search_kwargs)
             
             async for post in search_generator:
                 try:
-                    if len(results) >= limit:
+                    if results.raw_count >= limit:
                         break
+                    results.raw_count += 1
+                    results.after = post.fullname
                     formatted_post = await self._format_post(post)
                     results.append(formatted_post)
                     print(f"Found post via API: {post.title}")
@@ -286,20 +623,31 @@ class RedditClient:
                     print(f"Error formatting post: {str(post_error)}")
                     continue
             
+            if results.raw_count < limit:
+                results.after = None  # The listing ran out before filling the page
             print(f"API search completed. Found {len(results)} posts")
             return results
             
         except Exception as e:
+            # Re-raised so the failure counts against the API circuit breaker
             print(f"API search error: {str(e)}")
-            return []
+            raise
             
-    async def _search_with_scraping(self, query: str, subreddit: str = None, limit: int = 10, time_filter: str = None) -> List[Dict[str, Any]]:
+    async def _search_with_scraping(
+        self,
+        query: str,
+        subreddit: str = None,
+        limit: int = 10,
+        time_filter: str = None,
+        sort: str = "relevance",
+        after: str = None
+    ) -> SearchPage:
         """Fallback search using scraping when the API fails."""
         try:
             print(f"Using scraping fallback for search with query: {query}, subreddit: {subreddit}")
             
             # Build the search URL with time filter if specified
-            time_param = ""
+            url_params = ""
             if time_filter:
                 # Map our time filter to Reddit's t parameter
                 time_mapping = {
@@ -310,7 +658,12 @@ class RedditClient:
                     'year': 'year',
                     'all': 'all'
                 }
-                time_param = f"&t={time_mapping.get(time_filter, 'all')}"
+                url_params = f"&t={time_mapping.get(time_filter, 'all')}"
+            
+            # Sort order and the position to continue from when paging
+            url_params += f"&sort={sort}"
+            if after:
+                url_params += f"&after={after}"
             
             # Construct the search URL
             if subreddit:
@@ -318,9 +671,9 @@ class RedditClient:
                 if subreddit.lower() == "cooking":
                     subreddit = "Cooking"
                 
-                url = f"https://www.reddit.com/r/{subreddit}/search.json?q={query}&limit={limit}&restrict_sr=1{time_param}"
+                url = f"https://www.reddit.com/r/{subreddit}/search.json?q={query}&limit={limit}&restrict_sr=1{url_params}"
             else:
-                url = f"https://www.reddit.com/search.json?q={query}&limit={limit}{time_param}"
+                url = f"https://www.reddit.com/search.json?q={query}&limit={limit}{url_params}"
             
             # Create a dedicated session for this specific scraping operation
             # This prevents issues with concurrent operations affecting each other
@@ -329,39 +682,26 @@ class RedditClient:
                 await self._delay_request()
                 
                 async with local_session.get(url) as response:
+                    # Errors (e.g. 429 rate limiting) count against the scraping circuit breaker
+                    response.raise_for_status()
                     if response.status == 200:
                         data = await response.json()
                         
                         # Process the search results
-                        posts = []
-                        for child in data.get('data', {}).get('children', []):
+                        listing = data.get('data', {})
+                        children = listing.get('children', [])
+                        posts = SearchPage(after=listing.get('after'), raw_count=len(children))
+                        for child in children:
                             try:
                                 post_data = child.get('data', {})
                                 
                                 # Format the post data
-                                post = {
-                                    'id': post_data.get('id'),
-                                    'title': post_data.get('title'),
-                                    'author': post_data.get('author'),
-                                    'subreddit': post_data.get('subreddit'),
-                                    'score': post_data.get('score', 0),
-                                    'upvote_ratio': post_data.get('upvote_ratio', 0),
-                                    'url': f"https://www.reddit.com{post_data.get('permalink')}",
-                                    'created_utc': post_data.get('created_utc', 0),
-                                    'num_comments': post_data.get('num_comments', 0),
-                                    'content': post_data.get('selftext', ''),
-                                    'is_self': post_data.get('is_self', False),
-                                    'link_flair_text': post_data.get('link_flair_text'),
-                                    'domain': post_data.get('domain')
-                                }
+                                post = Post.from_listing(post_data)
                                 
                                 # Only add the post if it has meaningful content
-                                if post['content'] or not post['is_self']:
+                                if has_meaningful_content(post):
                                     posts.append(post)
                                     
-                                if len(posts) >= limit:
-                                    break
-                                    
                             except Exception as post_error:
                                 print(f"Error processing scraped post: {str(post_error)}")
                                 continue
@@ -369,31 +709,31 @@ class RedditClient:
                         print(f"Scraping search completed. Found {len(posts)} posts")
                         return posts
             
-            return []
+            return SearchPage()
             
         except Exception as e:
+            # Re-raised so the failure counts against the scraping circuit breaker
             print(f"Error in scraping search: {str(e)}")
-            return []
+            raise
     
-    async def _format_post(self, post) -> Dict[str, Any]:
+    async def _format_post(self, post) -> Post:
         try:
-            return {
-                'id': post.id,
-                'title': post.title,
-                'content': post.selftext[:1000] if post.selftext else "",
-                'subreddit': post.subreddit.display_name,
-                'author': str(post.author),
-                'score': post.score,
-                'url': f"https://reddit.com{post.permalink}",
-                'created_at': post.created_utc
-            }
+            return Post.from_submission(post)
         except Exception as e:
             print(f"Error formatting post {post.id if hasattr(post, 'id') else 'unknown'}: {str(e)}")
             raise
     
+    async def get_post(self, post_id: str) -> Post:
+        """Fetch a single post, with up to ``POST_MAX_CHARS`` of its body."""
+        submission = await self.reddit.submission(id=post_id)
+        return Post.from_submission(submission, max_content_chars=POST_MAX_CHARS)
+    
     async def get_post_comments(self, post_id: str, limit: int = 10) -> List[Dict[str, Any]]:
         try:
-            submission = await self.reddit.submission(id=post_id)
+            # Ask for the top-sorted comment tree so the first comments are the best ones
+            submission = await self.reddit.submission(id=post_id, fetch=False)
+            submission.comment_sort = "top"
+            await submission.load()
             await submission.comments.replace_more(limit=0)
             return [await self._format_comment(comment) for comment in submission.comments[:limit]]
         except Exception as e:
@@ -0,0 +1,176 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from app.config.settings import (
+    CIRCUIT_FAILURE_RATE, CIRCUIT_WINDOW, CIRCUIT_MIN_CALLS,
+    CIRCUIT_RESET_SECONDS, CIRCUIT_SLOW_CALL_SECONDS
+)
+
+
+class CircuitBreaker:
+    """Tracks the recent error and latency rate of one backend.
+
+    The breaker opens once enough of the last ``window`` calls failed (or were
+    slower than ``slow_call_seconds``), so callers can route straight to another
+    backend. After ``reset_timeout`` seconds a single trial call is let through:
+    if it succeeds the breaker closes again, otherwise it stays open.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_rate: float = CIRCUIT_FAILURE_RATE,
+        window: int = CIRCUIT_WINDOW,
+        min_calls: int = CIRCUIT_MIN_CALLS,
+        reset_timeout: float = CIRCUIT_RESET_SECONDS,
+        slow_call_seconds: float = CIRCUIT_SLOW_CALL_SECONDS
+    ):
+        self.name = name
+        self.failure_rate_threshold = failure_rate
+        self.min_calls = min_calls
+        self.reset_timeout = reset_timeout
+        self.slow_call_seconds = slow_call_seconds
+        self._outcomes = deque(maxlen=window)  # (succeeded, latency in seconds)
+        self._latencies = deque(maxlen=window)  # seconds, of calls that answered or ran slow
+        self._opened_at: Optional[float] = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def available(self) -> bool:
+        """Whether calls may go to this backend now (half open: one trial call at a time)."""
+        state = self.state
+        return state == "closed" or (state == "half_open" and not self._probing)
+
+    def record(self, succeeded: bool, latency: float) -> None:
+        """Record the outcome of a call."""
+        if succeeded or latency > self.slow_call_seconds:
+            self._latencies.append(latency)
+        if latency > self.slow_call_seconds:
+            succeeded = False
+
+        if self._probing:
+            self._probing = False
+            if succeeded:
+                print(f"Circuit '{self.name}' closed again")
+                self._opened_at = None
+                self._outcomes.clear()
+                self._latencies.clear()
+            else:
+                self._opened_at = time.monotonic()
+
+        self._outcomes.append((succeeded, latency))
+        if self._opened_at is None and len(self._outcomes) >= self.min_calls:
+            if self.failure_rate() >= self.failure_rate_threshold:
+                print(f"Circuit '{self.name}' opened ({self.failure_rate():.0%} of recent calls failed or were slow)")
+                self._opened_at = time.monotonic()
+
+    def cancelled(self, latency: float) -> None:
+        """A call was cancelled (e.g. it lost a hedge) before it had an outcome.
+
+        A call that already ran longer than ``slow_call_seconds`` counts as a slow
+        call; otherwise a backend that is always slow would never be recorded,
+        since every one of its calls loses the hedge.
+        """
+        if latency > self.slow_call_seconds:
+            self.record(False, latency)
+        else:
+            self._probing = False
+
+    def failure_rate(self) -> float:
+        if not self._outcomes:
+            return 0.0
+        return sum(1 for succeeded, _ in self._outcomes if not succeeded) / len(self._outcomes)
+
+    def latency_percentile(self, percentile: float = 0.95) -> Optional[float]:
+        """Latency percentile of recent successful and slow calls, in seconds."""
+        latencies = sorted(self._latencies)
+        if not latencies:
+            return None
+        return latencies[min(len(latencies) - 1, int(percentile * len(latencies)))]
+
+    async def call(self, awaitable: Awaitable) -> Any:
+        """Await a call to this backend, recording its outcome."""
+        if self.state == "half_open":
+            # This is the trial call that decides whether the breaker closes
+            self._probing = True
+        started = time.monotonic()
+        try:
+            result = await awaitable
+        except asyncio.CancelledError:
+            self.cancelled(time.monotonic() - started)
+            raise
+        except Exception:
+            self.record(False, time.monotonic() - started)
+            raise
+        self.record(True, time.monotonic() - started)
+        return result
+
+    def snapshot(self) -> Dict[str, Any]:
+        p95 = self.latency_percentile()
+        return {
+            "state": self.state,
+            "recent_calls": len(self._outcomes),
+            "failure_rate": round(self.failure_rate(), 3),
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else None
+        }
+
+
+async def hedged(
+    primary: Callable[[], Awaitable],
+    secondary: Callable[[], Awaitable],
+    delay: float,
+    accept: Callable[[Any], bool] = bool
+) -> Any:
+    """Run ``primary``, and ``secondary`` as well if it hasn't answered within ``delay`` seconds.
+
+    The secondary also starts right away when the primary fails or returns a result
+    that isn't accepted. The first accepted result wins and the other call is
+    cancelled; if neither is accepted the last result is returned, or the last error
+    raised.
+    """
+    pending = {asyncio.ensure_future(primary())}
+    hedge = None
+    result, error = None, None
+    try:
+        while pending or hedge is None:
+            if not pending:
+                # Primary finished without a usable result: don't wait for the delay
+                hedge = asyncio.ensure_future(secondary())
+                pending.add(hedge)
+                continue
+
+            done, pending = await asyncio.wait(
+                pending,
+                timeout=None if hedge else delay,
+                return_when=asyncio.FIRST_COMPLETED
+            )
+            if not done:
+                hedge = asyncio.ensure_future(secondary())
+                pending.add(hedge)
+                continue
+
+            for task in done:
+                try:
+                    value = task.result()
+                except Exception as e:
+                    error = e
+                    continue
+                if accept(value):
+                    return value
+                result = value
+
+        if result is None and error is not None:
+            raise error
+        return result
+    finally:
+        for task in pending:
+            task.cancel()
@@ -0,0 +1,64 @@
+from typing import List, Sequence
+
+import numpy as np
+
+from app.config.settings import SUMMARY_POST_TOKENS
+
+# Rough characters per token of English text, for budgeting prompts without a tokenizer
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text or "") // CHARS_PER_TOKEN + 1
+
+
+def post_token_cost(title: str, content: str) -> int:
+    """Prompt tokens a post takes in the summary context (its content is cut at ``SUMMARY_POST_TOKENS``)."""
+    return estimate_tokens(title) + min(estimate_tokens(content), SUMMARY_POST_TOKENS)
+
+
+def select_diverse(
+    embeddings: np.ndarray,
+    relevance: np.ndarray,
+    costs: Sequence[int],
+    limit: int,
+    token_budget: int,
+    diversity: float
+) -> List[int]:
+    """Maximal marginal relevance selection under a token budget.
+
+    Picks candidates one at a time, each maximizing
+    ``(1 - diversity) * relevance - diversity * (max cosine similarity to the picked ones)``,
+    skipping candidates whose cost no longer fits in the budget. The best
+    candidate is always picked, even if it alone exceeds the budget.
+
+    Returns:
+        Indexes of the picked candidates, in pick order
+    """
+    count = len(relevance)
+    if count == 0 or limit <= 0:
+        return []
+
+    vectors = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors = vectors / np.where(norms > 0, norms, 1)
+    pairwise = vectors @ vectors.T
+
+    relevance = np.asarray(relevance, dtype=np.float64)
+    costs = np.asarray(costs, dtype=np.int64)
+    redundancy = np.zeros(count)
+    available = np.ones(count, dtype=bool)
+    remaining = token_budget
+
+    picked = []
+    while len(picked) < limit:
+        fits = available & (costs <= remaining) if picked else available
+        if not fits.any():
+            break
+        scores = np.where(fits, (1 - diversity) * relevance - diversity * redundancy, -np.inf)
+        best = int(np.argmax(scores))
+        picked.append(best)
+        available[best] = False
+        remaining -= costs[best]
+        redundancy = np.maximum(redundancy, pairwise[best])
+    return picked
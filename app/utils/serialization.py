@@ -0,0 +1,83 @@
+import gzip
+import json
+from typing import Any, Dict, Iterable, List, Optional
+
+from fastapi import Response
+from app.config.settings import RESPONSE_COMPRESSION_MIN_BYTES, RESPONSE_COMPRESSION_LEVEL
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional at runtime
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is optional
+    brotli = None
+
+
+def dumps(payload: Any) -> bytes:
+    """Serialize a payload to JSON bytes, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(payload, separators=(",", ":"), ensure_ascii=False, default=str).encode("utf-8")
+
+
+def project_posts(posts: List[Dict[str, Any]], fields: Optional[Iterable[str]]) -> List[Dict[str, Any]]:
+    """Keep only the requested fields of every post."""
+    if not fields:
+        return posts
+    fields = list(fields)
+    return [{field: post[field] for field in fields if field in post} for post in posts]
+
+
+def parse_fields(fields: Optional[str]) -> List[str]:
+    """Parse a ``?fields=id,title,url`` query parameter."""
+    if not fields:
+        return []
+    return [field.strip() for field in fields.split(",") if field.strip()]
+
+
+def choose_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Pick the best supported content encoding the client accepts."""
+    if not accept_encoding:
+        return None
+
+    accepted = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+
+    candidates = ["br", "gzip"] if brotli is not None else ["gzip"]
+    for encoding in candidates:
+        if accepted.get(encoding, accepted.get("*", 0)) > 0:
+            return encoding
+    return None
+
+
+def json_response(
+    payload: Any,
+    accept_encoding: Optional[str] = None,
+    status_code: int = 200,
+    headers: Optional[Dict[str, str]] = None
+) -> Response:
+    """Build a JSON response, compressed when the client supports it and it pays off."""
+    body = dumps(payload)
+    headers = dict(headers or {})
+    headers["Vary"] = "Accept-Encoding"
+
+    encoding = choose_encoding(accept_encoding) if len(body) >= RESPONSE_COMPRESSION_MIN_BYTES else None
+    if encoding == "br":
+        body = brotli.compress(body, quality=min(RESPONSE_COMPRESSION_LEVEL, 11))
+        headers["Content-Encoding"] = "br"
+    elif encoding == "gzip":
+        body = gzip.compress(body, compresslevel=min(RESPONSE_COMPRESSION_LEVEL, 9))
+        headers["Content-Encoding"] = "gzip"
+
+    return Response(content=body, status_code=status_code, headers=headers, media_type="application/json")
@@ -0,0 +1,169 @@
+import hashlib
+import os
+import re
+import threading
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from app.config.settings import SIMHASH_MAX_DISTANCE
+from app.utils.post import Post
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_URL_RE = re.compile(r"https?://\S+")
+_BITS = 64
+_SHIFTS = np.arange(_BITS, dtype=np.uint64)
+
+# Texts with fewer words than this (e.g. a bare "Help?" title) are never treated as duplicates
+MIN_TOKENS = 8
+
+
+def simhash(text: str, shingle: int = 2, max_chars: int = 2000) -> Optional[int]:
+    """64-bit SimHash over word shingles of a text, or None when it is too short to compare."""
+    tokens = _TOKEN_RE.findall(_URL_RE.sub(" ", text[:max_chars].lower()))
+    if len(tokens) < MIN_TOKENS:
+        return None
+
+    features = {" ".join(tokens[i:i + shingle]) for i in range(len(tokens) - shingle + 1)}
+    digests = b"".join(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest() for feature in features)
+    hashes = np.frombuffer(digests, dtype=">u8").astype(np.uint64)
+
+    # Every bit of the signature is the majority vote of that bit over all feature hashes
+    votes = ((hashes[:, None] >> _SHIFTS) & np.uint64(1)).sum(axis=0)
+    signature = 0
+    for bit in np.flatnonzero(votes * 2 > len(features)):
+        signature |= 1 << int(bit)
+    return signature
+
+
+def post_simhash(post: Post) -> Optional[int]:
+    """Signature of a post's title and body, so crossposts and reposts match."""
+    return simhash(f"{post.title} {post.content}")
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+class SimHashIndex:
+    """Finds near-duplicate signatures (at most ``max_distance`` differing bits).
+
+    Signatures are split into ``max_distance + 1`` bands; by the pigeonhole principle
+    two signatures that close agree exactly on at least one band, so only the
+    signatures sharing a band are compared.
+
+    With a ``path`` the index is persistent: additions are appended to a log file
+    that is read back on startup, and ``rewrite`` replaces it (e.g. after compaction).
+    """
+
+    def __init__(self, path: Optional[str] = None, max_distance: int = SIMHASH_MAX_DISTANCE):
+        self.path = path
+        self.max_distance = max_distance
+        bands = max_distance + 1
+        bounds = [round(i * _BITS / bands) for i in range(bands + 1)]
+        self._bands = [(start, (1 << (end - start)) - 1) for start, end in zip(bounds, bounds[1:])]
+        self._signatures: Dict[str, int] = {}
+        self._buckets: Dict[Tuple[int, int], Set[str]] = {}
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            self._load()
+
+    def find(self, signature: Optional[int], exclude: Optional[str] = None) -> Optional[str]:
+        """Id of an indexed near-duplicate of ``signature`` other than ``exclude``, if any."""
+        if signature is None:
+            return None
+        with self._lock:
+            for key in self._band_keys(signature):
+                for doc_id in self._buckets.get(key, ()):
+                    if doc_id != exclude and hamming_distance(signature, self._signatures[doc_id]) <= self.max_distance:
+                        return doc_id
+        return None
+
+    def add(self, doc_id: str, signature: Optional[int]) -> None:
+        """Index a signature in memory only."""
+        if signature is None:
+            return
+        with self._lock:
+            self._add(doc_id, signature)
+
+    def add_many(self, items: Iterable[Tuple[str, Optional[int]]]) -> None:
+        """Index signatures and append them to the log file."""
+        items = [(doc_id, signature) for doc_id, signature in items if signature is not None]
+        if not items:
+            return
+        with self._lock:
+            for doc_id, signature in items:
+                self._add(doc_id, signature)
+            if self.path:
+                with open(self.path, "a") as f:
+                    f.writelines(f"{doc_id} {signature:016x}\n" for doc_id, signature in items)
+
+    def rewrite(self, items: Iterable[Tuple[str, Optional[int]]]) -> None:
+        """Replace the whole index (and its log file) with the given signatures."""
+        with self._lock:
+            self._signatures.clear()
+            self._buckets.clear()
+            for doc_id, signature in items:
+                if signature is not None:
+                    self._add(doc_id, signature)
+            if self.path:
+                # Write atomically so a crash never leaves a truncated index behind
+                tmp_path = f"{self.path}.tmp"
+                with open(tmp_path, "w") as f:
+                    f.writelines(f"{doc_id} {signature:016x}\n" for doc_id, signature in self._signatures.items())
+                os.replace(tmp_path, self.path)
+
+    def signatures(self) -> Dict[str, int]:
+        """Copy of all indexed signatures by id."""
+        with self._lock:
+            return dict(self._signatures)
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def _band_keys(self, signature: int) -> List[Tuple[int, int]]:
+        return [(index, (signature >> start) & mask) for index, (start, mask) in enumerate(self._bands)]
+
+    def _add(self, doc_id: str, signature: int) -> None:
+        previous = self._signatures.get(doc_id)
+        if previous is not None:
+            for key in self._band_keys(previous):
+                self._buckets.get(key, set()).discard(doc_id)
+        self._signatures[doc_id] = signature
+        for key in self._band_keys(signature):
+            self._buckets.setdefault(key, set()).add(doc_id)
+
+    def _load(self) -> None:
+        with open(self.path) as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) == 2:
+                    try:
+                        self._add(parts[0], int(parts[1], 16))
+                    except ValueError:
+                        continue
+
+
+def drop_near_duplicates(posts: List[Post], limit: Optional[int] = None,
+                         max_distance: int = SIMHASH_MAX_DISTANCE) -> List[Post]:
+    """Keep only the first post of every group of near-duplicates (pass them best first).
+
+    With a ``limit`` it stops as soon as that many posts are kept.
+    """
+    index = SimHashIndex(max_distance=max_distance)
+    seen_ids = set()
+    kept = []
+    for post in posts:
+        if limit is not None and len(kept) >= limit:
+            break
+        # A crosspost and its original are the same discussion, whatever their text
+        ids = {post.id, post.crosspost_parent_id} - {None}
+        if ids & seen_ids:
+            continue
+        signature = post_simhash(post)
+        if index.find(signature) is not None:
+            continue
+        index.add(post.id, signature)
+        seen_ids.update(ids)
+        kept.append(post)
+    return kept
@@ -0,0 +1,272 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+SNAPSHOT_VERSION = 1
+
+EMBEDDINGS_FILE = "embeddings.f32"
+IDS_FILE = "ids.txt"
+COLUMNS_FILE = "metadata.npz"
+MANIFEST_FILE = "manifest.json"
+
+# Column holding the Chroma document text next to the metadata columns
+DOCUMENT_COLUMN = "__document__"
+
+
+class SnapshotWriter:
+    """Writes a vector index snapshot to a directory.
+
+    A snapshot holds:
+
+    - ``embeddings.f32``: all embeddings as one row-major float32 matrix, so it
+      can be memory-mapped on import
+    - ``ids.txt``: document ids, one per line, in matrix row order
+    - ``metadata.npz``: the metadata and documents column by column (numbers as
+      numeric arrays, strings as one UTF-8 buffer with offsets)
+    - ``manifest.json``: row count, dimension, embedding backend, checksums
+
+    Everything is written into a temporary directory that replaces ``path``
+    only once it is complete, so a reader never sees a half-written snapshot.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._tmp_path = f"{path.rstrip(os.sep)}.tmp"
+        shutil.rmtree(self._tmp_path, ignore_errors=True)
+        os.makedirs(self._tmp_path)
+        self._embeddings = open(os.path.join(self._tmp_path, EMBEDDINGS_FILE), "wb")
+        self._ids: List[str] = []
+        self._columns: Dict[str, List[Any]] = {}
+        self.dim: Optional[int] = None
+
+    def append(self, ids: List[str], embeddings: Any, documents: List[str], metadatas: List[Dict[str, Any]]) -> None:
+        """Add a page of documents."""
+        if not ids:
+            return
+        matrix = np.asarray(embeddings, dtype=np.float32)
+        if self.dim is None:
+            self.dim = matrix.shape[1]
+        elif matrix.shape[1] != self.dim:
+            raise ValueError(f"Embedding dimension changed from {self.dim} to {matrix.shape[1]}")
+        self._embeddings.write(np.ascontiguousarray(matrix).tobytes())
+
+        offset = len(self._ids)
+        self._ids.extend(ids)
+        rows = [{**(metadata or {}), DOCUMENT_COLUMN: document} for metadata, document in zip(metadatas, documents)]
+        for row_index, row in enumerate(rows, offset):
+            for key, value in row.items():
+                # Rows without this key get None
+                column = self._columns.setdefault(key, [])
+                column.extend([None] * (row_index - len(column)))
+                column.append(value)
+        for column in self._columns.values():
+            column.extend([None] * (len(self._ids) - len(column)))
+
+    def close(self, manifest: Dict[str, Any]) -> Dict[str, Any]:
+        """Finish the snapshot and move it into place; returns the full manifest."""
+        self._embeddings.close()
+        with open(os.path.join(self._tmp_path, IDS_FILE), "w", encoding="utf-8") as f:
+            f.writelines(f"{post_id}\n" for post_id in self._ids)
+
+        arrays = {}
+        for key, values in self._columns.items():
+            arrays.update(_encode_column(key, values))
+        np.savez_compressed(os.path.join(self._tmp_path, COLUMNS_FILE), **arrays)
+
+        manifest = {
+            **manifest,
+            "version": SNAPSHOT_VERSION,
+            "count": len(self._ids),
+            "dim": self.dim or 0,
+            "dtype": "float32",
+            "created_at": time.time(),
+            "files": {
+                name: _file_info(os.path.join(self._tmp_path, name))
+                for name in (EMBEDDINGS_FILE, IDS_FILE, COLUMNS_FILE)
+            }
+        }
+        with open(os.path.join(self._tmp_path, MANIFEST_FILE), "w") as f:
+            json.dump(manifest, f, indent=2)
+
+        # Move the previous snapshot aside rather than deleting it first, so there
+        # is always a complete snapshot at ``path`` but for the two renames
+        old_path = f"{self.path.rstrip(os.sep)}.old"
+        shutil.rmtree(old_path, ignore_errors=True)
+        if os.path.exists(self.path):
+            os.replace(self.path, old_path)
+        os.replace(self._tmp_path, self.path)
+        shutil.rmtree(old_path, ignore_errors=True)
+        return manifest
+
+    def abort(self) -> None:
+        self._embeddings.close()
+        shutil.rmtree(self._tmp_path, ignore_errors=True)
+
+
+class Snapshot:
+    """Reads a snapshot written by ``SnapshotWriter``; embeddings are memory-mapped."""
+
+    def __init__(self, path: str, verify: bool = False):
+        self.path = path
+        with open(os.path.join(path, MANIFEST_FILE)) as f:
+            self.manifest: Dict[str, Any] = json.load(f)
+        if self.manifest.get("version") != SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported snapshot version {self.manifest.get('version')}")
+        if verify:
+            self.verify()
+
+        self.count = self.manifest["count"]
+        self.dim = self.manifest["dim"]
+        with open(os.path.join(path, IDS_FILE), encoding="utf-8") as f:
+            self.ids = f.read().splitlines()
+        if len(self.ids) != self.count:
+            raise ValueError(f"Snapshot has {len(self.ids)} ids but {self.count} rows")
+
+        if self.count:
+            self.embeddings = np.memmap(
+                os.path.join(path, EMBEDDINGS_FILE), dtype=np.float32, mode="r", shape=(self.count, self.dim)
+            )
+        else:
+            self.embeddings = np.zeros((0, self.dim), dtype=np.float32)
+
+        with np.load(os.path.join(path, COLUMNS_FILE)) as arrays:
+            self._columns = _decode_columns(dict(arrays))
+
+    def verify(self) -> None:
+        """Check file sizes and checksums against the manifest."""
+        for name, expected in self.manifest["files"].items():
+            actual = _file_info(os.path.join(self.path, name))
+            if actual != expected:
+                raise ValueError(f"Snapshot file {name} is corrupt (expected {expected}, found {actual})")
+
+    def batches(self, size: int) -> Iterator[Tuple[List[str], np.ndarray, List[str], List[Dict[str, Any]]]]:
+        """Yield (ids, embeddings, documents, metadatas) in batches of ``size`` rows."""
+        documents = self._columns.get(DOCUMENT_COLUMN, [None] * self.count)
+        keys = [key for key in self._columns if key != DOCUMENT_COLUMN]
+        for start in range(0, self.count, size):
+            end = min(start + size, self.count)
+            metadatas = []
+            for row in range(start, end):
+                metadata = {}
+                for key in keys:
+                    value = self._columns[key][row]
+                    if value is not None:
+                        metadata[key] = value
+                metadatas.append(metadata)
+            yield self.ids[start:end], self.embeddings[start:end], documents[start:end], metadatas
+
+
+def _encode_column(key: str, values: List[Any]) -> Dict[str, np.ndarray]:
+    """Arrays for one metadata column: ``<key>:<kind>`` values plus ``<key>:present`` if any are missing.
+
+    A column whose values have different types (e.g. legacy rows that stored a
+    timestamp as ``""``) gets a ``<key>:kind`` type code per row instead, and
+    the values of each type separately, so every value keeps its type.
+    """
+    present = np.fromiter((value is not None for value in values), dtype=bool, count=len(values))
+    kinds = {_kind(value) for value in values if value is not None}
+    if len(kinds) > 1 and kinds != {"int", "float"}:
+        return _encode_mixed_column(key, values)
+    arrays = {}
+    if kinds <= {"bool"}:
+        arrays[f"{key}:bool"] = np.fromiter((bool(value) for value in values), dtype=bool, count=len(values))
+    elif kinds <= {"int"}:
+        arrays[f"{key}:int"] = np.fromiter((value or 0 for value in values), dtype=np.int64, count=len(values))
+    elif kinds <= {"int", "float"}:
+        arrays[f"{key}:float"] = np.fromiter((value or 0.0 for value in values), dtype=np.float64, count=len(values))
+    else:
+        arrays[f"{key}:str"], arrays[f"{key}:offsets"] = _encode_strings(values)
+    if not present.all():
+        arrays[f"{key}:present"] = present
+    return arrays
+
+
+def _encode_mixed_column(key: str, values: List[Any]) -> Dict[str, np.ndarray]:
+    codes = np.fromiter(
+        (0 if value is None else _KIND_CODES[_kind(value)] for value in values), dtype=np.uint8, count=len(values)
+    )
+    arrays = {f"{key}:kind": codes}
+    for kind, code in _KIND_CODES.items():
+        of_kind = [value for value, value_code in zip(values, codes.tolist()) if value_code == code]
+        if not of_kind:
+            continue
+        if kind == "str":
+            arrays[f"{key}:mixed_str"], arrays[f"{key}:mixed_offsets"] = _encode_strings(of_kind)
+        else:
+            arrays[f"{key}:mixed_{kind}"] = np.array(of_kind, dtype=_KIND_DTYPES[kind])
+    return arrays
+
+
+def _encode_strings(values: List[Any]) -> Tuple[np.ndarray, np.ndarray]:
+    """One UTF-8 buffer and the offsets of each value in it."""
+    encoded = [("" if value is None else str(value)).encode("utf-8") for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(item) for item in encoded], out=offsets[1:])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+
+def _decode_strings(buffer: np.ndarray, offsets: np.ndarray) -> List[str]:
+    data = buffer.tobytes()
+    offsets = offsets.tolist()
+    return [data[start:end].decode("utf-8") for start, end in zip(offsets, offsets[1:])]
+
+
+def _decode_columns(arrays: Dict[str, np.ndarray]) -> Dict[str, List[Any]]:
+    columns = {}
+    for name, array in arrays.items():
+        key, kind = name.rsplit(":", 1)
+        if kind == "bool":
+            columns[key] = [bool(value) for value in array]
+        elif kind == "int":
+            columns[key] = array.tolist()
+        elif kind == "float":
+            columns[key] = array.tolist()
+        elif kind == "str":
+            columns[key] = _decode_strings(array, arrays[f"{key}:offsets"])
+        elif kind == "kind":
+            columns[key] = _decode_mixed_column(key, array, arrays)
+    for key in columns:
+        present = arrays.get(f"{key}:present")
+        if present is not None:
+            columns[key] = [value if keep else None for value, keep in zip(columns[key], present.tolist())]
+    return columns
+
+
+def _decode_mixed_column(key: str, codes: np.ndarray, arrays: Dict[str, np.ndarray]) -> List[Any]:
+    values_by_code = {}
+    for kind, code in _KIND_CODES.items():
+        if kind == "str":
+            if f"{key}:mixed_str" in arrays:
+                values_by_code[code] = iter(_decode_strings(arrays[f"{key}:mixed_str"], arrays[f"{key}:mixed_offsets"]))
+        elif f"{key}:mixed_{kind}" in arrays:
+            values_by_code[code] = iter(arrays[f"{key}:mixed_{kind}"].tolist())
+    return [None if code == 0 else next(values_by_code[code]) for code in codes.tolist()]
+
+
+def _kind(value: Any) -> str:
+    # bool first: True is an int as well
+    if isinstance(value, bool):
+        return "bool"
+    if isinstance(value, int):
+        return "int"
+    if isinstance(value, float):
+        return "float"
+    return "str"
+
+
+# Type codes of mixed columns (0 = missing)
+_KIND_CODES = {"bool": 1, "int": 2, "float": 3, "str": 4}
+_KIND_DTYPES = {"bool": bool, "int": np.int64, "float": np.float64}
+
+
+def _file_info(path: str) -> Dict[str, Any]:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return {"bytes": os.path.getsize(path), "sha256": digest.hexdigest()}
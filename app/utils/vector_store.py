@@ -1,43 +1,137 @@
-import chromadb
+import math
 import os
-from typing import List, Dict, Any
-from app.config.settings import BASE_DIR
+import threading
+import time
+from typing import List, Dict, Any, Set, Tuple
 import numpy as np
+from app.config.settings import (
+    BASE_DIR, HNSW_M, HNSW_CONSTRUCTION_EF, HNSW_SEARCH_EF,
+    VECTOR_MAX_DOCUMENTS, VECTOR_MAX_AGE_DAYS, DEDUPLICATE_POSTS,
+    SUMMARY_MAX_POSTS, SUMMARY_TOKEN_BUDGET, SUMMARY_DIVERSITY
+)
+from app.utils.post import Post
+from app.utils.embeddings import EmbeddingProvider, get_embedding_provider
+from app.utils.memory import current_rss_bytes, directory_size_bytes
+from app.utils.selection import post_token_cost, select_diverse
+from app.utils.simhash import SimHashIndex, post_simhash, simhash
+from app.utils.snapshot import Snapshot, SnapshotWriter
 from datetime import datetime
 
+# Page size for reading the whole collection during compaction
+_COPY_PAGE_SIZE = 1000
+
+# Length of the Reddit time filters in seconds, for time-window filtering
+TIME_FILTER_SECONDS = {
+    'hour': 3600,
+    'day': 86400,
+    'week': 7 * 86400,
+    'month': 30 * 86400,
+    'year': 365 * 86400
+}
+
 class VectorStore:
-    def __init__(self):
-        """Initialize the vector store with ChromaDB for semantic search capabilities."""
+    def __init__(self, embedding_provider: EmbeddingProvider = None):
+        """Initialize the vector store with ChromaDB for semantic search capabilities.
+        
+        Args:
+            embedding_provider: Embedding backend; defaults to the one configured
+                by ``EMBEDDING_BACKEND``. Each backend gets its own collection,
+                since vectors from different models can't be compared.
+        """
         # Create data directory if it doesn't exist
         data_dir = os.path.join(BASE_DIR, "data", "chroma")
         os.makedirs(data_dir, exist_ok=True)
+        self.data_dir = data_dir
+        
+        self.embedding_provider = embedding_provider or get_embedding_provider()
+        
+        # Imported here so importing the app doesn't pay for chromadb until the store is created
+        import chromadb
         
         # Initialize ChromaDB client with persistence
         self.client = chromadb.PersistentClient(path=data_dir)
         
-        # Configure collection with enhanced cosine similarity settings
+        collection_name = "reddit_posts"
+        if self.embedding_provider.name != "default":
+            collection_name = f"reddit_posts_{self.embedding_provider.collection_suffix}"[:55]
+        self.collection_name = collection_name
+        self._compact_name = f"{collection_name}_compact"
+        
+        # Writes hold this lock so compaction can swap collections without losing posts
+        self._write_lock = threading.RLock()
+        self._compaction_lock = threading.Lock()
+        
+        # Last time each document was returned by a search (for LRU retention)
+        self._last_hits: Dict[str, float] = {}
+        self.last_compaction: Dict[str, Any] = None
+        
+        # SimHash signatures of the indexed posts, to keep reposts and crossposts out
+        self.simhash_index = None
+        if DEDUPLICATE_POSTS:
+            self.simhash_index = SimHashIndex(os.path.join(data_dir, f"{collection_name}.simhash"))
+        
+        self.collection = self._open_collection()
+    
+    def _index_metadata(self) -> Dict[str, Any]:
+        """HNSW settings for new collections, with cosine similarity."""
+        return {
+            "hnsw:space": "cosine",
+            "hnsw:construction_ef": HNSW_CONSTRUCTION_EF,  # Index quality vs insert cost
+            "hnsw:search_ef": HNSW_SEARCH_EF,  # Search quality vs latency
+            "hnsw:M": HNSW_M  # Number of connections per element (memory per vector)
+        }
+    
+    def _open_collection(self):
         try:
-            self.collection = self.client.get_collection("reddit_posts")
-        except:
-            self.collection = self.client.create_collection(
-                name="reddit_posts",
-                metadata={
-                    "hnsw:space": "cosine",
-                    "hnsw:construction_ef": 400,  # Increased for better index quality
-                    "hnsw:search_ef": 200,  # Increased for better search quality
-                    "hnsw:m": 64,  # Number of connections per element
-                    "hnsw:ef_runtime": 100  # Runtime accuracy vs speed trade-off
-                }
+            return self.client.get_collection(
+                self.collection_name,
+                embedding_function=self.embedding_provider
             )
+        except:
+            pass
+        
+        # A compaction interrupted after dropping the old collection leaves only the rebuilt one
+        try:
+            collection = self.client.get_collection(self._compact_name, embedding_function=self.embedding_provider)
+            collection.modify(name=self.collection_name)
+            print(f"Recovered collection {self.collection_name} from an interrupted compaction")
+            return collection
+        except:
+            pass
+        
+        return self.client.create_collection(
+            name=self.collection_name,
+            embedding_function=self.embedding_provider,
+            metadata=self._index_metadata()
+        )
     
-    def add_posts(self, posts: List[Dict[str, Any]]) -> None:
+    def add_posts(self, posts: List[Post], embeddings: List[List[float]] = None) -> None:
         """Add posts to the vector store for semantic search.
         
         Args:
-            posts: List of post dictionaries containing title, content, etc.
+            posts: List of posts to index
+            embeddings: Optional precomputed embeddings, one per post, as produced
+                by ``embed_documents``. When omitted Chroma embeds the documents.
         """
         if not posts:
             return
+        
+        # Only embed posts that are not indexed yet (and each post only once)
+        if embeddings is None:
+            posts = self.filter_new_posts(posts)
+        else:
+            new_ids = {post.id for post in self.filter_new_posts(posts)}
+            kept_posts = []
+            kept_embeddings = []
+            for post, embedding in zip(posts, embeddings):
+                post_id = post.id
+                if post_id in new_ids:
+                    new_ids.discard(post_id)  # keep the first occurrence only
+                    kept_posts.append(post)
+                    kept_embeddings.append(embedding)
+            posts, embeddings = kept_posts, kept_embeddings
+        if not posts:
+            return
             
         # Prepare documents, ids, and metadata
         documents = []
@@ -50,132 +144,583 @@ class VectorStore:
             documents.append(doc)
             
             # Use post ID as document ID
-            ids.append(str(post['id']))
-            
-            # Calculate engagement metrics
-            comment_count = float(post.get('num_comments', 0))
-            score = float(post.get('score', 0))
-            engagement_score = self._calculate_engagement_score(score, comment_count)
-            
-            # Parse and process timestamp
-            created_at = post.get('created_at', '')
-            time_relevance = self._calculate_time_relevance(created_at)
-            
-            # Store full post data in metadata with enhanced fields
-            metadatas.append({
-                'title': post['title'],
-                'content': post['content'],
-                'author': post['author'],
-                'subreddit': post['subreddit'],
-                'score': score,
-                'url': post['url'],
-                'created_at': created_at,
-                'doc_length': len(doc.split()),
-                'title_length': len(post['title'].split()),
-                'engagement_score': engagement_score,
-                'time_relevance': time_relevance,
-                'num_comments': comment_count,
-                'has_awards': bool(post.get('awards', False)),
-                'is_original_content': bool(post.get('is_original_content', False))
-            })
-        
-        # Add to collection with optimized settings
-        self.collection.add(
-            documents=documents,
-            ids=ids,
-            metadatas=metadatas
-        )
+            ids.append(post.id)
+            metadatas.append(self._build_metadata(post, doc))
+        
+        signatures = [post_simhash(post) for post in posts] if self.simhash_index is not None else []
+        
+        # Add to collection in chunks the Chroma client accepts
+        batch_size = self._max_batch_size()
+        with self._write_lock:
+            for start in range(0, len(ids), batch_size):
+                end = start + batch_size
+                self.collection.add(
+                    documents=documents[start:end],
+                    ids=ids[start:end],
+                    metadatas=metadatas[start:end],
+                    embeddings=embeddings[start:end] if embeddings is not None else None
+                )
+            if signatures:
+                self.simhash_index.add_many(zip(ids, signatures))
+    
+    def _max_batch_size(self) -> int:
+        return getattr(self.client, 'max_batch_size', 5000) or 5000
+    
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts with the same model the collection uses."""
+        return self.embedding_provider.embed(texts)
     
-    def search_similar(self, query: str, limit: int = 5, min_similarity: float = 0.3) -> List[Dict[str, Any]]:
+    def warmup(self) -> None:
+        """Load the embedding model and run a dummy inference."""
+        self.embedding_provider.warmup()
+    
+    def warmup_index(self) -> int:
+        """Load the HNSW index into memory with a dummy query; returns the document count."""
+        count = self.collection.count()
+        if count:
+            self.collection.query(query_embeddings=self.embed_documents(["warmup"]), n_results=1, include=[])
+        return count
+    
+    def backfill_filter_keys(self) -> int:
+        """Add ``subreddit_key`` to documents indexed before it existed; returns how many were updated.
+        
+        Subreddit-scoped searches filter on it, so without it those documents
+        would only be found again after the next compaction.
+        """
+        updated = 0
+        offset = 0
+        while True:
+            page = self.collection.get(include=['metadatas'], limit=_COPY_PAGE_SIZE, offset=offset)
+            if not page['ids']:
+                break
+            offset += len(page['ids'])
+            missing = [
+                (post_id, {**metadata, 'subreddit_key': str(metadata.get('subreddit', '')).lower()})
+                for post_id, metadata in zip(page['ids'], page['metadatas'])
+                if metadata is not None and 'subreddit_key' not in metadata
+            ]
+            if missing:
+                with self._write_lock:
+                    self.collection.update(
+                        ids=[post_id for post_id, _ in missing],
+                        metadatas=[metadata for _, metadata in missing]
+                    )
+                updated += len(missing)
+        if updated:
+            print(f"Backfilled subreddit_key on {updated} documents")
+        return updated
+    
+    def prepare_documents(self, posts: List[Post]) -> List[str]:
+        """Return the text that gets embedded for each post."""
+        return [self._create_document_representation(post) for post in posts]
+    
+    def _build_metadata(self, post: Post, doc: str) -> Dict[str, Any]:
+        # Calculate engagement metrics
+        comment_count = float(post.num_comments)
+        score = float(post.score)
+        engagement_score = self._calculate_engagement_score(score, comment_count)
+        
+        # Store full post data in metadata with enhanced fields
+        metadata = {
+            'title': post.title,
+            'content': post.content,
+            'author': post.author,
+            'subreddit': post.subreddit,
+            'subreddit_key': post.subreddit.lower(),  # Case-insensitive subreddit filtering
+            'score': score,
+            'url': post.url,
+            'created_at': post.created_at,
+            'doc_length': len(doc.split()),
+            'title_length': len(post.title.split()),
+            'engagement_score': engagement_score,
+            'num_comments': comment_count,
+            'has_awards': post.has_awards,
+            'is_original_content': post.is_original_content,
+            'indexed_at': time.time()
+        }
+        # Chroma can't store None, so unknown values are left out
+        optional = {
+            'upvote_ratio': post.upvote_ratio,
+            'is_self': post.is_self,
+            'link_flair_text': post.link_flair_text,
+            'domain': post.domain
+        }
+        metadata.update((key, value) for key, value in optional.items() if value is not None)
+        return metadata
+    
+    def search_similar(
+        self,
+        query: str,
+        limit: int = SUMMARY_MAX_POSTS,
+        min_similarity: float = 0.3,
+        subreddit: str = None,
+        time_filter: str = None
+    ) -> List[Post]:
         """Search for posts semantically similar to the query.
         
         Args:
             query: The search query
             limit: Maximum number of results to return
             min_similarity: Minimum similarity threshold (0-1)
+            subreddit: Only consider posts from this subreddit
+            time_filter: Reddit time filter (hour, day, week, month, year);
+                only consider posts created within that window
             
         Returns:
-            List of post dictionaries with similarity scores
+            List of relevant but mutually diverse posts with similarity
+            scores, whose estimated prompt size fits ``SUMMARY_TOKEN_BUDGET``
+        """
+        return self.search_similar_batch(
+            [query], limit=limit, min_similarity=min_similarity, filters=[(subreddit, time_filter)]
+        )[0]
+    
+    def search_similar_batch(
+        self,
+        queries: List[str],
+        limit: int = SUMMARY_MAX_POSTS,
+        min_similarity: float = 0.3,
+        filters: List[Tuple[str, str]] = None
+    ) -> List[List[Post]]:
+        """Search for several queries with a single embedding and index pass.
+        
+        Args:
+            filters: Optional (subreddit, time filter) pair per query. Queries
+                sharing the same filter are sent to Chroma together.
+        
+        Returns:
+            One list of posts with similarity scores per query
+        """
+        if not queries:
+            return []
+        
+        filters = filters or [(None, None)] * len(queries)
+        
+        # Get more results initially for better filtering
+        initial_limit = min(limit * 3, 20)
+        
+        # Group queries by filter, since a Chroma query takes a single `where`
+        groups: Dict[Tuple[str, str], List[int]] = {}
+        for i, (subreddit, time_filter) in enumerate(filters):
+            key = ((subreddit or '').lower() or None, time_filter)
+            groups.setdefault(key, []).append(i)
+        
+        formatted: List[List[Post]] = [[] for _ in queries]
+        for (subreddit, time_filter), indexes in groups.items():
+            try:
+                # Enhance queries for better semantic matching
+                enhanced_queries = [self._enhance_query(queries[i]) for i in indexes]
+                
+                # Perform semantic search, restricted to the requested subreddit and time window
+                results = self.collection.query(
+                    query_texts=enhanced_queries,
+                    n_results=initial_limit,
+                    where=self._build_where(subreddit, time_filter),
+                    # Results are built from the metadata; the documents would only be copied around
+                    include=['metadatas', 'distances', 'embeddings']
+                )
+                
+                for result_index, i in enumerate(indexes):
+                    formatted[i] = self._format_results(results, result_index, queries[i], limit, min_similarity)
+                    
+            except Exception as e:
+                print(f"Error searching vector store: {str(e)}")
+        
+        # Remember which documents are still useful for LRU retention
+        now = time.time()
+        for posts in formatted:
+            for post in posts:
+                self._last_hits[post.id] = now
+        
+        return formatted
+    
+    def _build_where(self, subreddit: str = None, time_filter: str = None) -> Dict[str, Any]:
+        """Build the Chroma metadata filter for a subreddit and time window."""
+        clauses = []
+        if subreddit:
+            clauses.append({"subreddit_key": subreddit.lower()})
+        if time_filter in TIME_FILTER_SECONDS:
+            since = time.time() - TIME_FILTER_SECONDS[time_filter]
+            clauses.append({"created_at": {"$gte": since}})
+        
+        if not clauses:
+            return None
+        if len(clauses) == 1:
+            return clauses[0]
+        return {"$and": clauses}
+    
+    def _format_results(
+        self,
+        results: Dict[str, Any],
+        query_index: int,
+        query: str,
+        limit: int,
+        min_similarity: float
+    ) -> List[Post]:
+        """Format and filter the Chroma results of one query with enhanced scoring."""
+        ids = results['ids'][query_index]
+        if not ids:  # No results found
+            return []
+        
+        metadatas = results['metadatas'][query_index]
+        base_similarity = 1 - np.asarray(results['distances'][query_index], dtype=np.float64)  # Convert distance to similarity
+        
+        # Recency is computed now from the stored timestamp, so it never goes stale
+        time_relevance = self._calculate_time_relevance(self._metadata_column(metadatas, 'created_at'))
+        final_similarity = self._calculate_final_similarity(base_similarity, metadatas, query, time_relevance)
+        
+        # Skip results below minimum similarity threshold, then pick a relevant but
+        # diverse set (near-identical posts add prompt tokens but no information)
+        candidates = np.flatnonzero(base_similarity >= min_similarity)
+        embeddings = results.get('embeddings')
+        if embeddings is not None and embeddings[query_index] is not None and len(candidates):
+            costs = [
+                post_token_cost(metadatas[i].get('title', ''), metadatas[i].get('content', ''))
+                for i in candidates
+            ]
+            picked = select_diverse(
+                np.asarray(embeddings[query_index])[candidates],
+                final_similarity[candidates],
+                costs,
+                limit,
+                SUMMARY_TOKEN_BUDGET,
+                SUMMARY_DIVERSITY
+            )
+            ranked = candidates[picked]
+        else:
+            ranked = candidates[np.argsort(-final_similarity[candidates], kind='stable')][:limit]
+        
+        formatted_results = []
+        for i in ranked:
+            post = Post.from_metadata(ids[i], metadatas[i])
+            post.similarity = float(final_similarity[i])
+            post.time_relevance = float(time_relevance[i])
+            formatted_results.append(post)
+        return formatted_results
+    
+    def filter_new_posts(self, posts: List[Post]) -> List[Post]:
+        """Drop duplicate posts and posts that are already in the collection.
+        
+        Near-duplicates (crossposts and reposts of an indexed post, or of an
+        earlier post in the same batch) are dropped too, before anything is embedded.
         """
+        unique_posts = {}
+        for post in posts:
+            unique_posts.setdefault(post.id, post)
+        
+        # Crossposts of an indexed post are skipped as well
+        parent_ids = {post.crosspost_parent_id for post in unique_posts.values() if post.crosspost_parent_id}
         try:
-            # Enhance query for better semantic matching
-            enhanced_query = self._enhance_query(query)
+            existing = set(self.collection.get(ids=list(unique_posts.keys() | parent_ids), include=[])['ids'])
+            for post_id in existing:
+                unique_posts.pop(post_id, None)
+            for post_id, post in list(unique_posts.items()):
+                if post.crosspost_parent_id in existing:
+                    del unique_posts[post_id]
+        except Exception as e:
+            print(f"Error checking existing posts: {str(e)}")
+        
+        if self.simhash_index is None:
+            return list(unique_posts.values())
+        
+        batch_index = SimHashIndex(max_distance=self.simhash_index.max_distance)
+        new_posts = []
+        for post in unique_posts.values():
+            signature = post_simhash(post)
+            if self.simhash_index.find(signature, exclude=post.id) or batch_index.find(signature):
+                continue
+            batch_index.add(post.id, signature)
+            new_posts.append(post)
+        
+        if len(new_posts) < len(unique_posts):
+            print(f"Skipping {len(unique_posts) - len(new_posts)} near-duplicate posts")
+        return new_posts
+    
+    def index_stats(self) -> Dict[str, Any]:
+        """Report the size of the index on disk and an estimate of its memory use."""
+        count = self.collection.count()
+        metadata = self.collection.metadata or {}
+        m = int(metadata.get("hnsw:M", 16))
+        
+        dim = 0
+        if count:
+            sample = self.collection.get(limit=1, include=['embeddings'])
+            if sample['embeddings']:
+                dim = len(sample['embeddings'][0])
+        
+        return {
+            "collection": self.collection_name,
+            "documents": count,
+            "embedding_backend": self.embedding_provider.name,
+            "embedding_dim": dim,
+            "hnsw": {key: value for key, value in metadata.items() if key.startswith("hnsw:")},
+            # float32 vectors plus roughly 2*M neighbour links per element in layer 0
+            "estimated_index_bytes": count * (dim * 4 + m * 2 * 4 + 16),
+            "disk_bytes": directory_size_bytes(self.data_dir),
+            "process_rss_bytes": current_rss_bytes(),
+            "tracked_hits": len(self._last_hits),
+            "last_compaction": self.last_compaction
+        }
+    
+    def compact(self, force: bool = False) -> Dict[str, Any]:
+        """Apply retention policies and rebuild the HNSW index.
+        
+        Expired and least recently used documents are dropped, the remaining ones
+        are copied (with their stored embeddings, so nothing is re-embedded) into
+        a fresh collection built with the current HNSW settings, and the new
+        collection is swapped in. Chroma never shrinks an HNSW index on delete,
+        so the rebuild is what actually reclaims memory and disk.
+        
+        This is slow for large collections; run it off the request path.
+        """
+        if not self._compaction_lock.acquire(blocking=False):
+            return {"status": "already_running"}
+        
+        try:
+            started = time.time()
+            old_collection = self.collection
+            ids, metadatas = self._read_collection(old_collection, include=['metadatas'])
+            evicted = self._plan_retention(ids, metadatas, started)
+            
+            if not (force or evicted or self._index_settings_changed(old_collection)):
+                self.last_compaction = {
+                    "status": "skipped",
+                    "documents": len(ids),
+                    "finished_at": datetime.now().isoformat()
+                }
+                return self.last_compaction
             
-            # Get more results initially for better filtering
-            initial_limit = min(limit * 3, 20)
+            print(f"Compacting {self.collection_name}: {len(ids)} documents, evicting {len(evicted)}")
             
-            # Perform semantic search with enhanced parameters
-            results = self.collection.query(
-                query_texts=[enhanced_query],
-                n_results=initial_limit,
-                include=['metadatas', 'distances', 'documents']
+            # Start from a clean temporary collection
+            try:
+                self.client.delete_collection(self._compact_name)
+            except Exception:
+                pass
+            new_collection = self.client.create_collection(
+                name=self._compact_name,
+                embedding_function=self.embedding_provider,
+                metadata=self._index_metadata()
             )
             
-            if not results['ids'][0]:  # No results found
-                return []
+            keep_ids = [post_id for post_id in ids if post_id not in evicted]
+            self._copy_documents(old_collection, new_collection, keep_ids)
             
-            # Format and filter results with enhanced scoring
-            formatted_results = []
-            for i in range(len(results['ids'][0])):
-                base_similarity = 1 - results['distances'][0][i]  # Convert distance to similarity
+            with self._write_lock:
+                # Copy posts that were added while the bulk copy was running
+                current_ids, _ = self._read_collection(old_collection, include=[])
+                copied = set(keep_ids)
+                late_ids = [post_id for post_id in current_ids if post_id not in copied and post_id not in evicted]
+                self._copy_documents(old_collection, new_collection, late_ids)
                 
-                # Skip results below minimum similarity threshold
-                if base_similarity < min_similarity:
-                    continue
+                # Swap the rebuilt collection in
+                self.collection = new_collection
+                self.client.delete_collection(self.collection_name)
+                new_collection.modify(name=self.collection_name)
                 
-                metadata = results['metadatas'][0][i]
-                doc = results['documents'][0][i]
+                for post_id in evicted:
+                    self._last_hits.pop(post_id, None)
                 
-                # Apply score boosting based on various factors
-                final_similarity = self._calculate_final_similarity(
-                    base_similarity=base_similarity,
-                    metadata=metadata,
-                    query=query,
-                    document=doc
-                )
-                
-                formatted_results.append({
-                    'id': results['ids'][0][i],
-                    'title': metadata.get('title', ''),
-                    'content': metadata.get('content', ''),
-                    'author': metadata.get('author', ''),
-                    'subreddit': metadata.get('subreddit', ''),
-                    'score': metadata.get('score', 0),
-                    'url': metadata.get('url', ''),
-                    'created_at': metadata.get('created_at', ''),
-                    'similarity': final_similarity,
-                    'engagement_score': metadata.get('engagement_score', 0),
-                    'num_comments': metadata.get('num_comments', 0),
-                    'has_awards': metadata.get('has_awards', False),
-                    'is_original_content': metadata.get('is_original_content', False)
-                })
+                if self.simhash_index is not None:
+                    self._rebuild_simhash_index(ids, metadatas, evicted, late_ids)
             
-            # Sort by final similarity score and limit results
-            formatted_results.sort(key=lambda x: x['similarity'], reverse=True)
-            return formatted_results[:limit]
+            self.last_compaction = {
+                "status": "compacted",
+                "documents_before": len(ids),
+                "documents_after": len(keep_ids) + len(late_ids),
+                "evicted": len(evicted),
+                "duration_s": round(time.time() - started, 2),
+                "finished_at": datetime.now().isoformat()
+            }
+            print(f"Compaction finished: {self.last_compaction}")
+            return self.last_compaction
             
-        except Exception as e:
-            print(f"Error searching vector store: {str(e)}")
-            return []
+        finally:
+            self._compaction_lock.release()
+    
+    def export_snapshot(self, path: str) -> Dict[str, Any]:
+        """Write a consistent snapshot of the collection to ``path`` (see ``SnapshotWriter``).
+        
+        The snapshot holds the documents indexed when the export starts: writes
+        are only held off while their ids are listed, and compaction (the only
+        thing that deletes documents or swaps the collection) waits for the export.
+        """
+        writer = SnapshotWriter(path)
+        try:
+            with self._compaction_lock:
+                with self._write_lock:
+                    collection = self.collection
+                    ids, _ = self._read_collection(collection, include=[])
+                for start in range(0, len(ids), _COPY_PAGE_SIZE):
+                    page = collection.get(
+                        ids=ids[start:start + _COPY_PAGE_SIZE],
+                        include=['embeddings', 'documents', 'metadatas']
+                    )
+                    metadatas = []
+                    for post_id, metadata in zip(page['ids'], page['metadatas']):
+                        metadata = dict(metadata or {})
+                        metadata['last_hit'] = self._last_used(post_id, metadata)
+                        metadatas.append(metadata)
+                    writer.append(page['ids'], page['embeddings'], page['documents'], metadatas)
+        except BaseException:
+            writer.abort()
+            raise
+        
+        return writer.close({
+            "collection": self.collection_name,
+            "embedding_backend": self.embedding_provider.name,
+            "embedding_collection_suffix": self.embedding_provider.collection_suffix,
+            "hnsw": {key: value for key, value in (self.collection.metadata or {}).items() if key.startswith("hnsw:")}
+        })
+    
+    def import_snapshot(self, path: str, verify: bool = True) -> Dict[str, Any]:
+        """Bulk-load a snapshot into the collection with its stored embeddings (nothing is re-embedded).
+        
+        Documents already in the collection are overwritten with the snapshot's version.
+        
+        Raises:
+            ValueError: if the snapshot was made with a different embedding model, or is corrupt
+        """
+        started = time.time()
+        snapshot = Snapshot(path, verify=verify)
+        manifest = snapshot.manifest
+        if (manifest.get("embedding_backend"), manifest.get("embedding_collection_suffix")) != (
+            self.embedding_provider.name, self.embedding_provider.collection_suffix
+        ):
+            raise ValueError(
+                f"Snapshot embeddings come from {manifest.get('embedding_backend')} "
+                f"({manifest.get('embedding_collection_suffix')}), not {self.embedding_provider.name} "
+                f"({self.embedding_provider.collection_suffix})"
+            )
+        
+        batch_size = self._max_batch_size()
+        with self._write_lock:
+            for ids, embeddings, documents, metadatas in snapshot.batches(batch_size):
+                self.collection.upsert(
+                    ids=ids,
+                    embeddings=np.asarray(embeddings).tolist(),
+                    documents=documents,
+                    metadatas=metadatas
+                )
+                if self.simhash_index is not None:
+                    self.simhash_index.add_many(
+                        (post_id, simhash(f"{metadata.get('title', '')} {metadata.get('content', '')}"))
+                        for post_id, metadata in zip(ids, metadatas)
+                    )
+        
+        result = {
+            "documents": snapshot.count,
+            "snapshot_created_at": manifest.get("created_at"),
+            "duration_s": round(time.time() - started, 2)
+        }
+        print(f"Imported vector index snapshot from {path}: {result}")
+        return result
     
-    def _create_document_representation(self, post: Dict[str, Any]) -> str:
+    def _rebuild_simhash_index(self, ids: List[str], metadatas: List[Dict[str, Any]],
+                               evicted: Set[str], late_ids: List[str]) -> None:
+        """Drop evicted posts from the signature index and backfill posts indexed before it existed."""
+        known = self.simhash_index.signatures()
+        items = []
+        for post_id, metadata in zip(ids, metadatas):
+            if post_id in evicted:
+                continue
+            signature = known.get(post_id)
+            if signature is None:
+                signature = simhash(f"{metadata.get('title', '')} {metadata.get('content', '')}")
+            items.append((post_id, signature))
+        items.extend((post_id, known.get(post_id)) for post_id in late_ids)
+        self.simhash_index.rewrite(items)
+    
+    def _plan_retention(self, ids: List[str], metadatas: List[Dict[str, Any]], now: float) -> Set[str]:
+        """Pick the documents to drop: expired ones first, then least recently used."""
+        evicted = set()
+        
+        if VECTOR_MAX_AGE_DAYS > 0:
+            cutoff = now - VECTOR_MAX_AGE_DAYS * 86400
+            for post_id, metadata in zip(ids, metadatas):
+                created_at = metadata.get('created_at')
+                # Documents without a known creation time are never expired
+                if isinstance(created_at, (int, float)) and 0 < created_at < cutoff:
+                    evicted.add(post_id)
+        
+        remaining = len(ids) - len(evicted)
+        if VECTOR_MAX_DOCUMENTS > 0 and remaining > VECTOR_MAX_DOCUMENTS:
+            candidates = [
+                (self._last_used(post_id, metadata), post_id)
+                for post_id, metadata in zip(ids, metadatas)
+                if post_id not in evicted
+            ]
+            candidates.sort()
+            evicted.update(post_id for _, post_id in candidates[:remaining - VECTOR_MAX_DOCUMENTS])
+        
+        return evicted
+    
+    def _last_used(self, post_id: str, metadata: Dict[str, Any]) -> float:
+        """Last search hit, falling back to when the document was indexed."""
+        return self._last_hits.get(post_id) or metadata.get('last_hit') or metadata.get('indexed_at') or 0
+    
+    def _index_settings_changed(self, collection) -> bool:
+        metadata = collection.metadata or {}
+        wanted = self._index_metadata()
+        return any(metadata.get(key) != value for key, value in wanted.items())
+    
+    def _read_collection(self, collection, include: List[str]) -> Tuple[List[str], List[Dict[str, Any]]]:
+        """Read ids (and metadatas if included) of the whole collection page by page."""
+        ids = []
+        metadatas = []
+        offset = 0
+        while True:
+            page = collection.get(include=include, limit=_COPY_PAGE_SIZE, offset=offset)
+            if not page['ids']:
+                break
+            ids.extend(page['ids'])
+            if 'metadatas' in include:
+                metadatas.extend(page['metadatas'])
+            offset += len(page['ids'])
+        return ids, metadatas
+    
+    def _copy_documents(self, source, target, ids: List[str]) -> None:
+        """Copy documents with their stored embeddings, recording their last hit time."""
+        for start in range(0, len(ids), _COPY_PAGE_SIZE):
+            page = source.get(
+                ids=ids[start:start + _COPY_PAGE_SIZE],
+                include=['embeddings', 'documents', 'metadatas']
+            )
+            if not page['ids']:
+                continue
+            metadatas = []
+            for post_id, metadata in zip(page['ids'], page['metadatas']):
+                metadata = dict(metadata)
+                metadata['last_hit'] = self._last_used(post_id, metadata)
+                # Recency is computed at query time now; drop the value frozen at ingest
+                metadata.pop('time_relevance', None)
+                # Backfill the filter key for documents indexed before it existed
+                metadata.setdefault('subreddit_key', str(metadata.get('subreddit', '')).lower())
+                metadatas.append(metadata)
+            target.add(
+                ids=page['ids'],
+                embeddings=page['embeddings'],
+                documents=page['documents'],
+                metadatas=metadatas
+            )
+    
+    def _create_document_representation(self, post: Post) -> str:
         """Create a rich document representation for better semantic embeddings."""
         # Combine fields with special tokens and weights
         doc_parts = [
-            f"[TITLE] {post['title']} [/TITLE]",  # Title gets special emphasis
-            f"[CONTENT] {post['content']} [/CONTENT]",
-            f"[SUBREDDIT] r/{post['subreddit']} [/SUBREDDIT]",
-            f"[AUTHOR] u/{post['author']} [/AUTHOR]"
+            f"[TITLE] {post.title} [/TITLE]",  # Title gets special emphasis
+            f"[CONTENT] {post.content} [/CONTENT]",
+            f"[SUBREDDIT] r/{post.subreddit} [/SUBREDDIT]",
+            f"[AUTHOR] u/{post.author} [/AUTHOR]"
         ]
         
         # Add engagement signals
-        if post.get('score'):
-            doc_parts.append(f"[SCORE] {post['score']} [/SCORE]")
-        if post.get('num_comments'):
-            doc_parts.append(f"[COMMENTS] {post['num_comments']} [/COMMENTS]")
-        if post.get('awards'):
+        if post.score:
+            doc_parts.append(f"[SCORE] {post.score} [/SCORE]")
+        if post.num_comments:
+            doc_parts.append(f"[COMMENTS] {post.num_comments} [/COMMENTS]")
+        if post.has_awards:
             doc_parts.append("[AWARDED] true [/AWARDED]")
-        if post.get('is_original_content'):
+        if post.is_original_content:
             doc_parts.append("[OC] true [/OC]")
         
         return "\n".join(doc_parts)
@@ -194,81 +739,70 @@ class VectorStore:
     
     def _calculate_final_similarity(
         self,
-        base_similarity: float,
-        metadata: Dict[str, Any],
+        base_similarity: np.ndarray,
+        metadatas: List[Dict[str, Any]],
         query: str,
-        document: str
-    ) -> float:
-        """Calculate final similarity score with various boosting factors."""
-        score = base_similarity
+        time_relevance: np.ndarray
+    ) -> np.ndarray:
+        """Calculate final similarity scores for a batch of results with various boosting factors."""
+        score = base_similarity.copy()
         
         # Length normalization factor (penalize extremely short or long documents)
-        doc_length = metadata.get('doc_length', 0)
-        if doc_length > 0:
-            length_factor = 1.0
-            if doc_length < 20:  # Very short
-                length_factor = 0.8
-            elif doc_length > 1000:  # Very long
-                length_factor = 0.9
-            score *= length_factor
+        doc_length = self._metadata_column(metadatas, 'doc_length')
+        length_factor = np.where(doc_length < 20, 0.8, np.where(doc_length > 1000, 0.9, 1.0))  # Very short / very long
+        score *= np.where(doc_length > 0, length_factor, 1.0)
         
         # Engagement boost (combines Reddit score, comments, and awards)
-        engagement_score = metadata.get('engagement_score', 0)
-        if engagement_score > 0:
-            engagement_boost = min(0.2, np.log1p(engagement_score) / 100)
-            score = min(1.0, score * (1 + engagement_boost))
+        engagement_score = np.maximum(self._metadata_column(metadatas, 'engagement_score'), 0)
+        engagement_boost = np.minimum(0.2, np.log1p(engagement_score) / 100)
+        score = np.minimum(1.0, score * (1 + engagement_boost))
         
         # Time relevance boost
-        time_relevance = metadata.get('time_relevance', 1.0)
         score *= time_relevance
         
         # Title match boost
-        title = metadata.get('title', '').lower()
         query_terms = set(query.lower().split())
-        title_terms = set(title.split())
-        title_match_ratio = len(query_terms.intersection(title_terms)) / len(query_terms)
-        if title_match_ratio > 0:
-            title_boost = title_match_ratio * 0.1
-            score = min(1.0, score * (1 + title_boost))
+        if query_terms:
+            title_match_ratio = np.array([
+                len(query_terms.intersection(str(metadata.get('title', '')).lower().split())) / len(query_terms)
+                for metadata in metadatas
+            ])
+            score = np.minimum(1.0, score * (1 + title_match_ratio * 0.1))
         
         # Original content boost
-        if metadata.get('is_original_content', False):
-            score = min(1.0, score * 1.1)  # 10% boost for OC
+        is_oc = self._metadata_column(metadatas, 'is_original_content') > 0
+        score = np.where(is_oc, np.minimum(1.0, score * 1.1), score)  # 10% boost for OC
         
         return score
     
+    @staticmethod
+    def _metadata_column(metadatas: List[Dict[str, Any]], key: str) -> np.ndarray:
+        """Collect one numeric metadata field of a result batch into an array (0 when missing)."""
+        values = (metadata.get(key) for metadata in metadatas)
+        return np.fromiter(
+            (float(value) if isinstance(value, (int, float)) else 0.0 for value in values),
+            dtype=np.float64,
+            count=len(metadatas)
+        )
+    
     def _calculate_engagement_score(self, score: float, num_comments: float) -> float:
         """Calculate a normalized engagement score combining votes and comments."""
         # Log scale to prevent extreme scores from dominating
-        log_score = np.log1p(max(0, score))
-        log_comments = np.log1p(max(0, num_comments))
+        log_score = math.log1p(max(0, score))
+        log_comments = math.log1p(max(0, num_comments))
         
         # Weighted combination (comments weighted slightly higher than score)
         return (log_score + 1.2 * log_comments) / 2.2
     
-    def _calculate_time_relevance(self, created_at: str | float) -> float:
-        """Calculate time relevance factor (1.0 = most recent, decreasing with age)."""
-        try:
-            if not created_at:
-                return 1.0
-            
-            # Handle both string and float timestamp formats
-            if isinstance(created_at, str):
-                created_time = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
-            else:
-                # If it's a float/int timestamp, convert from Unix timestamp
-                created_time = datetime.fromtimestamp(float(created_at))
-                
-            now = datetime.now()
-            age_hours = (now - created_time).total_seconds() / 3600
-            
-            # Decay function: starts at 1.0, decays to 0.7 over time
-            decay_rate = 0.3  # Maximum decay of 30%
-            decay_period = 168  # One week in hours
-            
-            time_factor = 1.0 - (decay_rate * min(1.0, age_hours / decay_period))
-            return max(0.7, time_factor)  # Never decay below 0.7
-            
-        except Exception as e:
-            print(f"Error calculating time relevance: {str(e)}")
-            return 1.0 
\ No newline at end of file
+    def _calculate_time_relevance(self, created_at: np.ndarray, now: float = None) -> np.ndarray:
+        """Calculate time relevance factors (1.0 = most recent, decreasing with age) from Unix timestamps."""
+        now = time.time() if now is None else now
+        age_hours = np.maximum(0.0, now - created_at) / 3600
+        
+        # Decay function: starts at 1.0, decays to 0.7 over time
+        decay_rate = 0.3  # Maximum decay of 30%
+        decay_period = 168  # One week in hours
+        
+        time_factor = 1.0 - decay_rate * np.minimum(1.0, age_hours / decay_period)
+        # Posts without a known timestamp (stored as 0) are not penalized
+        return np.where(created_at > 0, time_factor, 1.0)
@@ -0,0 +1,283 @@
+import asyncio
+import heapq
+import json
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from app.config.settings import (
+    WATCH_MIN_INTERVAL, WATCH_MAX_INTERVAL, WATCH_TARGET_NEW_POSTS, WATCH_REQUESTS_PER_MINUTE,
+    WATCH_BACKFILL_PAGES, WATCH_BATCH_SIZE, WATCH_FLUSH_SECONDS
+)
+from app.utils.post import Post
+from app.utils.reddit_client import RedditClient, has_meaningful_content
+
+# Posts per /new page (Reddit's maximum)
+PAGE_SIZE = 100
+
+# How much a single poll moves the post rate estimate
+RATE_SMOOTHING = 0.3
+
+
+class WatchState:
+    """Polling state of one watched subreddit."""
+
+    __slots__ = (
+        'subreddit', 'cursor', 'cursor_ids', 'committed', 'rate', 'pages_per_poll', 'interval', 'last_polled',
+        'ingested', 'errors'
+    )
+
+    def __init__(self, subreddit: str):
+        self.subreddit = subreddit
+        # Creation time of the newest post seen, and the ids seen at exactly that time
+        self.cursor: float = 0.0
+        self.cursor_ids: List[str] = []
+        # The cursor up to which every post has been ingested (the one that is saved)
+        self.committed: Tuple[float, List[str]] = (0.0, [])
+        self.rate: Optional[float] = None  # new posts per second
+        self.pages_per_poll = 1.0  # listing requests a poll makes, smoothed like the rate
+        self.interval = float(WATCH_MIN_INTERVAL)
+        self.last_polled: Optional[float] = None
+        self.ingested = 0
+        self.errors = 0
+
+    def is_new(self, post: Post) -> bool:
+        created_at = post.created_at or 0
+        return created_at > self.cursor or (created_at == self.cursor and post.id not in self.cursor_ids)
+
+    def advance(self, posts: List[Post]) -> None:
+        """Move the cursor past the given (new) posts."""
+        newest = max(post.created_at or 0 for post in posts)
+        if newest > self.cursor:
+            self.cursor = newest
+            self.cursor_ids = []
+        self.cursor_ids.extend(post.id for post in posts if (post.created_at or 0) == self.cursor)
+
+    def commit(self) -> None:
+        """Everything up to the cursor has been ingested."""
+        self.committed = (self.cursor, list(self.cursor_ids))
+
+    def rewind(self) -> None:
+        """Go back to the committed cursor, so the next poll fetches the uncommitted posts again."""
+        self.cursor, self.cursor_ids = self.committed[0], list(self.committed[1])
+
+    def count_pages(self, pages: int) -> None:
+        """Fold the number of requests one poll made into ``pages_per_poll``."""
+        self.pages_per_poll = (1 - RATE_SMOOTHING) * self.pages_per_poll + RATE_SMOOTHING * pages
+
+
+class SubredditWatcher:
+    """Keeps the local index of a few subreddits fresh by polling their new posts.
+
+    Every subreddit has a since-cursor (the creation time of the newest post
+    seen), so a poll only keeps posts newer than it and only pages further back
+    while whole pages are new. Its poll interval follows its post rate, aiming
+    for about ``WATCH_TARGET_NEW_POSTS`` new posts per poll, and intervals are
+    stretched together when the polls would exceed ``WATCH_REQUESTS_PER_MINUTE``.
+
+    New posts are handed to ``ingest`` in micro-batches of up to
+    ``WATCH_BATCH_SIZE`` posts, at least every ``WATCH_FLUSH_SECONDS``. Cursors
+    are saved to ``cursor_path`` after every flush, so a restart continues where
+    it stopped instead of re-reading the subreddits. A cursor is only committed
+    (and saved) once the posts before it were ingested: when a batch fails, its
+    subreddits are polled again from their committed cursors.
+    """
+
+    def __init__(
+        self,
+        reddit_client: RedditClient,
+        subreddits: List[str],
+        ingest: Callable[[List[Post]], Awaitable[Any]],
+        cursor_path: str = None
+    ):
+        self.reddit_client = reddit_client
+        self.ingest = ingest
+        self.cursor_path = cursor_path
+        self.states: Dict[str, WatchState] = {
+            subreddit.lower(): WatchState(subreddit) for subreddit in subreddits if subreddit
+        }
+        self._pending: List[Tuple[str, Post]] = []  # (subreddit key, post)
+        self._last_flush = time.monotonic()
+        self._task: Optional[asyncio.Task] = None
+        self._load_cursors()
+
+    def covers(self, subreddit: Optional[str]) -> bool:
+        """Whether searches in this subreddit can be answered from the local index."""
+        state = self.states.get((subreddit or '').lower())
+        return state is not None and state.last_polled is not None
+
+    def start(self) -> None:
+        if self.states and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop polling and ingest whatever is still pending."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self._flush()
+
+    def snapshot(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            state.subreddit: {
+                "interval_seconds": round(state.interval, 1),
+                "posts_per_hour": round(state.rate * 3600, 1) if state.rate is not None else None,
+                "pages_per_poll": round(state.pages_per_poll, 2),
+                "seconds_since_poll": round(now - state.last_polled, 1) if state.last_polled is not None else None,
+                "cursor": state.cursor or None,
+                "ingested": state.ingested,
+                "errors": state.errors
+            }
+            for state in self.states.values()
+        }
+
+    async def _run(self) -> None:
+        # Poll everything once right away, then each subreddit on its own schedule
+        schedule = [(time.monotonic(), key) for key in self.states]
+        heapq.heapify(schedule)
+        while True:
+            due, key = schedule[0]
+            wait = due - time.monotonic()
+            if self._pending:
+                wait = min(wait, self._last_flush + WATCH_FLUSH_SECONDS - time.monotonic())
+            if wait > 0:
+                await asyncio.sleep(wait)
+            if self._pending and time.monotonic() - self._last_flush >= WATCH_FLUSH_SECONDS:
+                await self._flush()
+            if schedule[0][0] > time.monotonic():
+                continue
+
+            heapq.heappop(schedule)
+            state = self.states[key]
+            await self._poll(state)
+            self._apply_budget()
+            heapq.heappush(schedule, (time.monotonic() + state.interval, key))
+
+    async def _poll(self, state: WatchState) -> None:
+        """Fetch the posts of a subreddit newer than its cursor and queue them for ingestion."""
+        polled_at = time.monotonic()
+        new_posts: List[Post] = []
+        after = None
+        pages = 0
+        try:
+            # Page back only while whole pages are new (and not past the backfill limit)
+            for _ in range(max(1, WATCH_BACKFILL_PAGES)):
+                pages += 1
+                page = await self.reddit_client.get_new_posts(state.subreddit, limit=PAGE_SIZE, after=after)
+                fresh = [post for post in page if state.is_new(post)]
+                new_posts.extend(fresh)
+                if len(page) < PAGE_SIZE or len(fresh) < len(page):
+                    break
+                after = f"t3_{page[-1].id}"
+        except Exception as e:
+            print(f"Polling r/{state.subreddit} failed: {str(e)}")
+            state.errors += 1
+            # Back off, but keep the cursor so nothing is skipped
+            state.interval = min(state.interval * 2, WATCH_MAX_INTERVAL)
+            if not new_posts:
+                state.count_pages(pages)
+                return
+        state.count_pages(pages)
+
+        first_poll = state.last_polled is None
+        if not first_poll:
+            self._update_rate(state, len(new_posts), polled_at - state.last_polled)
+        state.last_polled = polled_at
+
+        if new_posts:
+            key = state.subreddit.lower()
+            state.advance(new_posts)
+            kept = [post for post in new_posts if has_meaningful_content(post)]
+            self._pending.extend((key, post) for post in kept)
+            print(f"r/{state.subreddit}: {len(new_posts)} new posts")
+            if not any(pending_key == key for pending_key, _ in self._pending):
+                # Nothing of this subreddit is waiting to be ingested
+                state.commit()
+            if len(self._pending) >= WATCH_BATCH_SIZE:
+                await self._flush()
+
+    def _update_rate(self, state: WatchState, new_count: int, elapsed: float) -> None:
+        """Fold a poll into the post rate estimate and derive the next interval."""
+        if elapsed <= 0:
+            return
+        rate = new_count / elapsed
+        state.rate = rate if state.rate is None else (1 - RATE_SMOOTHING) * state.rate + RATE_SMOOTHING * rate
+        interval = WATCH_TARGET_NEW_POSTS / state.rate if state.rate > 0 else WATCH_MAX_INTERVAL
+        if new_count >= PAGE_SIZE * WATCH_BACKFILL_PAGES:
+            # Posts arrive faster than a poll can page back: catch up as soon as allowed
+            interval = WATCH_MIN_INTERVAL
+        state.interval = min(max(interval, WATCH_MIN_INTERVAL), WATCH_MAX_INTERVAL)
+
+    def _apply_budget(self) -> None:
+        """Stretch all intervals by the same factor if the polls would exceed the request budget.
+
+        A poll that pages back makes several requests, so each subreddit counts
+        with its recent average number of pages per poll.
+        """
+        if WATCH_REQUESTS_PER_MINUTE <= 0:
+            return
+        per_minute = sum(state.pages_per_poll * 60 / state.interval for state in self.states.values())
+        if per_minute > WATCH_REQUESTS_PER_MINUTE:
+            factor = per_minute / WATCH_REQUESTS_PER_MINUTE
+            for state in self.states.values():
+                state.interval *= factor
+
+    async def _flush(self) -> None:
+        """Ingest the pending posts, then commit and save the cursors of the subreddits that were fully ingested."""
+        entries, self._pending = self._pending, []
+        self._last_flush = time.monotonic()
+        failed = set()
+        for start in range(0, len(entries), WATCH_BATCH_SIZE):
+            batch = entries[start:start + WATCH_BATCH_SIZE]
+            try:
+                await self.ingest([post for _, post in batch])
+            except Exception as e:
+                print(f"Ingesting {len(batch)} watched posts failed: {str(e)}")
+                failed.update(key for key, _ in batch)
+                continue
+            for key, _ in batch:
+                self.states[key].ingested += 1
+        for key, state in self.states.items():
+            if key in failed:
+                # Fetch the posts again on the next poll rather than skip them
+                state.rewind()
+            else:
+                state.commit()
+        self._save_cursors()
+
+    def _load_cursors(self) -> None:
+        if not self.cursor_path or not os.path.exists(self.cursor_path):
+            return
+        try:
+            with open(self.cursor_path) as f:
+                saved = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Could not read watch cursors: {str(e)}")
+            return
+        for key, cursor in saved.items():
+            state = self.states.get(key)
+            if state is not None:
+                state.cursor = cursor.get("cursor", 0.0)
+                state.cursor_ids = cursor.get("ids", [])
+                state.commit()
+
+    def _save_cursors(self) -> None:
+        if not self.cursor_path:
+            return
+        cursors = {
+            key: {"cursor": state.committed[0], "ids": state.committed[1]} for key, state in self.states.items()
+        }
+        try:
+            os.makedirs(os.path.dirname(self.cursor_path), exist_ok=True)
+            # Write atomically so a crash never leaves a truncated file behind
+            tmp_path = f"{self.cursor_path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(cursors, f)
+            os.replace(tmp_path, self.cursor_path)
+        except OSError as e:
+            print(f"Could not save watch cursors: {str(e)}")
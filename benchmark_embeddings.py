@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Benchmark the embedding backends available to the vector store.
+
+For every backend this measures model load time, the latency of a single short
+query (what a /search pays) and batch throughput on post-sized documents.
+
+Usage:
+    python benchmark_embeddings.py
+    python benchmark_embeddings.py --backends default sentence-transformers --docs 2000 --threads 4
+"""
+
+import argparse
+import random
+import sys
+import time
+
+from app.utils.embeddings import EMBEDDING_BACKENDS, OnnxMiniLMProvider, SentenceTransformerProvider, get_embedding_provider
+
+WORDS = (
+    "reddit python productivity app recommend best tool workflow focus habit team notes "
+    "calendar task manager review experience month switched finally works great cheap "
+    "question advice help anyone know why how setup problem issue solution"
+).split()
+
+def make_documents(count: int, words_per_doc: int, seed: int = 42):
+    rng = random.Random(seed)
+    return [
+        f"[TITLE] {' '.join(rng.choices(WORDS, k=10))} [/TITLE]\n"
+        f"[CONTENT] {' '.join(rng.choices(WORDS, k=words_per_doc))} [/CONTENT]"
+        for _ in range(count)
+    ]
+
+def build_providers(backends, threads, batch_size):
+    providers = []
+    for backend in backends:
+        if backend == "sentence-transformers":
+            # Compare the quantized and full-precision variants side by side
+            for quantize in ("none", "int8"):
+                providers.append(SentenceTransformerProvider(threads=threads, batch_size=batch_size, quantize=quantize))
+        elif backend in ("default", "onnx"):
+            providers.append(OnnxMiniLMProvider(threads=threads, batch_size=batch_size))
+        else:
+            providers.append(get_embedding_provider(backend))
+    return providers
+
+def benchmark(provider, documents, repeats):
+    started = time.perf_counter()
+    provider.load()
+    load_s = time.perf_counter() - started
+
+    # Warm up kernels and caches before timing
+    provider.embed(documents[:8])
+
+    started = time.perf_counter()
+    for _ in range(repeats):
+        provider.embed(["[QUERY] best productivity apps [/QUERY]"])
+    query_ms = (time.perf_counter() - started) / repeats * 1000
+
+    started = time.perf_counter()
+    provider.embed(documents)
+    batch_s = time.perf_counter() - started
+
+    return load_s, query_ms, len(documents) / batch_s
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark embedding backends")
+    parser.add_argument("--backends", nargs="+", default=["default", "sentence-transformers"],
+                        choices=sorted(set(EMBEDDING_BACKENDS)), help="Backends to compare")
+    parser.add_argument("--docs", type=int, default=1000, help="Documents in the throughput test")
+    parser.add_argument("--words", type=int, default=150, help="Words per document")
+    parser.add_argument("--batch-size", type=int, default=64, help="Embedding batch size")
+    parser.add_argument("--threads", type=int, default=0, help="Inference threads (0 = runtime default)")
+    parser.add_argument("--repeats", type=int, default=20, help="Single-query repetitions")
+    args = parser.parse_args(argv)
+
+    documents = make_documents(args.docs, args.words)
+
+    print(f"{'backend':<32} {'load (s)':>10} {'query (ms)':>12} {'docs/s':>10}")
+    print("-" * 68)
+    for provider in build_providers(args.backends, args.threads, args.batch_size):
+        try:
+            load_s, query_ms, docs_per_s = benchmark(provider, documents, args.repeats)
+            print(f"{provider.name:<32} {load_s:>10.2f} {query_ms:>12.1f} {docs_per_s:>10.1f}")
+        except ImportError as e:
+            print(f"{provider.name:<32} skipped: {e}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Bulk-ingest Reddit dumps into the local vector store and database.
+
+Reads newline-delimited JSON (optionally zstd-compressed) where every line is a
+submission, either a bare post object or a listing child ({"kind": "t3", "data": {...}})
+as returned by Reddit's search.json. Posts stream through a generator pipeline:
+
+    read lines -> parse -> filter -> batch -> embed (process pool) -> write
+
+Progress is checkpointed after every written batch, so an interrupted run can be
+restarted with the same command and continues where it stopped.
+
+Usage:
+    python ingest.py dumps/RS_2024-01.zst
+    python ingest.py dumps/productivity.ndjson --subreddit productivity --min-score 5
+"""
+
+import argparse
+import io
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from app.config.settings import INDEX_POST_MAX_CHARS
+from app.utils.post import Post
+from app.utils.reddit_client import has_meaningful_content, validate_subreddit
+
+# Embedding function of the current worker process (set by _init_worker)
+_worker_embedder = None
+
+def _init_worker(backend: str, threads: int):
+    """Load the embedding model once per worker process."""
+    global _worker_embedder
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    from app.utils.embeddings import get_embedding_provider
+    _worker_embedder = get_embedding_provider(backend)
+    if hasattr(_worker_embedder, "threads"):
+        _worker_embedder.threads = threads
+    _worker_embedder.warmup()
+
+def _embed(documents: List[str]) -> List[List[float]]:
+    return _worker_embedder.embed(documents)
+
+def iter_lines(path: str, skip: int = 0) -> Iterator[Tuple[int, str]]:
+    """Yield (line number, line) pairs, transparently decompressing .zst files."""
+    if path.endswith(".zst"):
+        try:
+            import zstandard
+        except ImportError:
+            raise SystemExit("Reading .zst dumps requires the zstandard package: pip install zstandard")
+        raw = open(path, "rb")
+        # Reddit dumps are compressed with a long window
+        reader = zstandard.ZstdDecompressor(max_window_size=2 ** 31).stream_reader(raw)
+        stream = io.TextIOWrapper(reader, encoding="utf-8", errors="replace")
+    else:
+        stream = open(path, "r", encoding="utf-8", errors="replace")
+
+    with stream:
+        for line_no, line in enumerate(stream, 1):
+            if line_no <= skip:
+                continue
+            yield line_no, line
+
+def parse_posts(lines: Iterable[Tuple[int, str]]) -> Iterator[Tuple[int, Post]]:
+    """Parse dump lines into posts, skipping malformed lines."""
+    for line_no, line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            item = json.loads(line)
+        except ValueError:
+            print(f"Skipping malformed line {line_no}")
+            continue
+
+        # Accept both listing children and bare submission objects
+        if isinstance(item, dict) and item.get("kind") == "t3":
+            item = item.get("data", item)
+        if not isinstance(item, dict):
+            print(f"Skipping malformed line {line_no}")
+            continue
+        post_data = item
+        if not post_data.get("id") or not post_data.get("title"):
+            continue
+
+        post = Post.from_listing(post_data, max_content_chars=INDEX_POST_MAX_CHARS)
+        if post.content in ('[removed]', '[deleted]'):
+            post.content = ''
+        post.author = post.author or '[deleted]'
+        yield line_no, post
+
+def filter_posts(
+    posts: Iterable[Tuple[int, Post]],
+    subreddits: Optional[Set[str]] = None,
+    min_score: int = 0
+) -> Iterator[Tuple[int, Post]]:
+    """Keep posts from valid (allowed) subreddits with enough score and content."""
+    for line_no, post in posts:
+        subreddit = post.subreddit
+        if not validate_subreddit(subreddit):
+            continue
+        if subreddits and subreddit.lower() not in subreddits:
+            continue
+        if post.score < min_score or not has_meaningful_content(post):
+            continue
+        yield line_no, post
+
+def batched(items: Iterable[Tuple[int, Post]], size: int) -> Iterator[Tuple[int, List[Post]]]:
+    """Group posts into batches, yielding (last line number, posts)."""
+    batch = []
+    last_line = 0
+    for line_no, post in items:
+        batch.append(post)
+        last_line = line_no
+        if len(batch) >= size:
+            yield last_line, batch
+            batch = []
+    if batch:
+        yield last_line, batch
+
+def load_checkpoint(path: str) -> Dict[str, Any]:
+    if os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return {"line": 0, "ingested": 0}
+
+def save_checkpoint(path: str, checkpoint: Dict[str, Any]):
+    # Write atomically so a crash never leaves a truncated checkpoint behind
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_path, path)
+
+def write_posts_to_db(engine, posts: List[Post]):
+    """Insert posts into the posts table, ignoring ones that are already stored."""
+    from sqlalchemy import insert, select
+    from app.database.models import RedditPost, post_to_row
+
+    rows = [post_to_row(post) for post in posts]
+    table = RedditPost.__table__
+    with engine.begin() as conn:
+        if engine.dialect.name == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+            # Stay well below SQLite's bound parameter limit
+            for start in range(0, len(rows), 500):
+                stmt = sqlite_insert(table).values(rows[start:start + 500]).on_conflict_do_nothing(index_elements=["id"])
+                conn.execute(stmt)
+        else:
+            existing = set(conn.execute(select(table.c.id).where(table.c.id.in_([row['id'] for row in rows]))).scalars())
+            new_rows = [row for row in rows if row['id'] not in existing]
+            if new_rows:
+                conn.execute(insert(table), new_rows)
+
+def ingest(args) -> int:
+    from app.database.models import get_engine
+    from app.utils.vector_store import VectorStore
+
+    checkpoint_path = args.checkpoint or f"{args.path}.checkpoint.json"
+    checkpoint = load_checkpoint(checkpoint_path) if not args.restart else {"line": 0, "ingested": 0}
+    if checkpoint["line"]:
+        print(f"Resuming after line {checkpoint['line']} ({checkpoint['ingested']} posts already ingested)")
+
+    from app.utils.embeddings import get_embedding_provider
+    vector_store = VectorStore(get_embedding_provider(args.embedding_backend))
+    engine = None if args.skip_db else get_engine()
+    subreddits = {s.lower() for s in args.subreddit} if args.subreddit else None
+
+    pipeline = batched(
+        filter_posts(parse_posts(iter_lines(args.path, skip=checkpoint["line"])), subreddits, args.min_score),
+        args.batch_size
+    )
+
+    started = time.time()
+    ingested = 0
+    ctx = get_context("spawn")
+    with ProcessPoolExecutor(
+        max_workers=args.workers,
+        mp_context=ctx,
+        initializer=_init_worker,
+        initargs=(args.embedding_backend, args.threads_per_worker)
+    ) as pool:
+        # Keep a bounded number of batches in flight and write them back in order,
+        # so the checkpoint always points at a fully written prefix of the dump
+        in_flight = deque()
+        # Posts sent to the embedding pool but not indexed yet, which filter_new_posts can't see
+        in_flight_ids: Set[str] = set()
+
+        def write_next():
+            nonlocal ingested
+            last_line, posts, future = in_flight.popleft()
+            embeddings = future.result() if future is not None else []
+            vector_store.add_posts(posts, embeddings=embeddings)
+            in_flight_ids.difference_update(post.id for post in posts)
+            if engine is not None:
+                write_posts_to_db(engine, posts)
+            ingested += len(posts)
+            checkpoint["line"] = last_line
+            checkpoint["ingested"] += len(posts)
+            save_checkpoint(checkpoint_path, checkpoint)
+            rate = ingested / max(time.time() - started, 1e-6)
+            print(f"Ingested {checkpoint['ingested']} posts (line {last_line}, {rate:.0f} posts/s)")
+
+        for last_line, posts in pipeline:
+            # Skip posts that are already indexed, or on their way, before paying for their embeddings
+            new_posts = [
+                post for post in vector_store.filter_new_posts(posts)
+                if post.id not in in_flight_ids and post.crosspost_parent_id not in in_flight_ids
+            ]
+            in_flight_ids.update(post.id for post in new_posts)
+            documents = vector_store.prepare_documents(new_posts)
+            future = pool.submit(_embed, documents) if documents else None
+            in_flight.append((last_line, new_posts, future))
+            if len(in_flight) >= args.workers * 2:
+                write_next()
+
+        while in_flight:
+            write_next()
+
+    print(f"Done: {ingested} new posts in {time.time() - started:.1f}s")
+    return 0
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Backfill the vector store and database from Reddit dumps")
+    parser.add_argument("path", help="Newline-delimited JSON dump, optionally .zst compressed")
+    parser.add_argument("--batch-size", type=int, default=512, help="Posts per embedding batch")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) // 2), help="Embedding worker processes")
+    parser.add_argument("--threads-per-worker", type=int, default=2, help="Inference threads per worker")
+    parser.add_argument("--subreddit", action="append", help="Only ingest these subreddits (repeatable)")
+    parser.add_argument("--min-score", type=int, default=0, help="Skip posts below this score")
+    parser.add_argument("--checkpoint", help="Checkpoint file (default: <path>.checkpoint.json)")
+    parser.add_argument("--restart", action="store_true", help="Ignore an existing checkpoint")
+    parser.add_argument("--embedding-backend", help="Embedding backend (default: EMBEDDING_BACKEND)")
+    parser.add_argument("--skip-db", action="store_true", help="Only write to the vector store")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.path):
+        print(f"❌ File not found: {args.path}")
+        return 1
+
+    try:
+        return ingest(args)
+    except KeyboardInterrupt:
+        print("\n🛑 Interrupted - run the same command again to resume from the last checkpoint")
+        return 130
+
+if __name__ == "__main__":
+    sys.exit(main())
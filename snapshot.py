@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Export the vector index to a snapshot, or bootstrap an index from one.
+
+A snapshot is a directory with the embeddings as a memory-mappable float32
+matrix, the metadata and documents in a columnar file, the id map and a
+manifest with checksums. Importing loads the stored embeddings directly, so
+nothing is re-embedded; a new instance can also import one automatically at
+startup by pointing VECTOR_SNAPSHOT_PATH at it.
+
+Usage:
+    python snapshot.py export data/snapshots/latest
+    python snapshot.py import data/snapshots/latest
+    python snapshot.py info data/snapshots/latest
+"""
+
+import argparse
+import json
+import sys
+import time
+from typing import List
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Export or import a vector index snapshot")
+    parser.add_argument("command", choices=["export", "import", "info"])
+    parser.add_argument("path", help="Snapshot directory")
+    parser.add_argument("--embedding-backend", help="Embedding backend (default: EMBEDDING_BACKEND)")
+    parser.add_argument("--skip-verify", action="store_true", help="Don't check file checksums before importing")
+    args = parser.parse_args(argv)
+
+    if args.command == "info":
+        from app.utils.snapshot import Snapshot
+        try:
+            snapshot = Snapshot(args.path, verify=not args.skip_verify)
+        except (OSError, ValueError) as e:
+            print(f"❌ {str(e)}")
+            return 1
+        print(json.dumps(snapshot.manifest, indent=2))
+        return 0
+
+    from app.utils.embeddings import get_embedding_provider
+    from app.utils.vector_store import VectorStore
+    vector_store = VectorStore(get_embedding_provider(args.embedding_backend))
+
+    started = time.time()
+    if args.command == "export":
+        manifest = vector_store.export_snapshot(args.path)
+        print(f"Exported {manifest['count']} documents ({manifest['dim']} dimensions) to {args.path} "
+              f"in {time.time() - started:.1f}s")
+        return 0
+
+    try:
+        result = vector_store.import_snapshot(args.path, verify=not args.skip_verify)
+    except (OSError, ValueError) as e:
+        print(f"❌ {str(e)}")
+        return 1
+    print(f"Imported {result['documents']} documents in {time.time() - started:.1f}s")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,120 @@
+import numpy as np
+
+from app.utils import query_cache
+from app.utils.query_cache import SemanticQueryCache
+
+# Fixed embeddings standing in for the vector store's model
+VECTORS = {
+    "best python ide": [1.0, 0.0, 0.0],
+    "which python ide is best": [0.95, 0.31, 0.0],
+    "python ide for beginners": [0.8, 0.6, 0.0],
+    "sourdough starter": [0.0, 0.0, 1.0]
+}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _cache(**kwargs):
+    options = dict(threshold=0.9, ttl=3600, refresh_after=600, max_size=10)
+    options.update(kwargs)
+    return SemanticQueryCache(lambda texts: [VECTORS[text] for text in texts], **options)
+
+
+def _store(cache, query, scope=("python", None), payload=None):
+    cache.store(query, cache.embed_query(query), scope, payload or {"query": query})
+
+
+def test_similar_query_in_the_same_scope_hits():
+    cache = _cache()
+    _store(cache, "best python ide")
+
+    entry, similarity = cache.lookup(cache.embed_query("which python ide is best"), ("python", None))
+
+    assert entry.payload == {"query": "best python ide"}
+    assert similarity >= 0.9
+    assert cache.hits == 1
+
+
+def test_query_below_the_threshold_misses():
+    cache = _cache()
+    _store(cache, "best python ide")
+
+    assert cache.lookup(cache.embed_query("python ide for beginners"), ("python", None)) is None
+    assert cache.lookup(cache.embed_query("sourdough starter"), ("python", None)) is None
+    assert cache.misses == 2
+
+
+def test_other_scope_misses():
+    cache = _cache()
+    _store(cache, "best python ide")
+    embedding = cache.embed_query("best python ide")
+
+    assert cache.lookup(embedding, ("python", "week")) is None
+    assert cache.lookup(embedding, ("learnpython", None)) is None
+    assert cache.lookup(embedding, ("python", None)) is not None
+
+
+def test_lookup_returns_the_most_similar_entry():
+    cache = _cache(threshold=0.5)
+    _store(cache, "python ide for beginners")
+    _store(cache, "best python ide")
+
+    entry, _ = cache.lookup(cache.embed_query("which python ide is best"), ("python", None))
+
+    assert entry.query == "best python ide"
+
+
+def test_entries_expire_and_get_flagged_for_refresh(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(query_cache.time, "monotonic", clock)
+    cache = _cache()
+    _store(cache, "best python ide")
+    embedding = cache.embed_query("best python ide")
+
+    clock.now += 601
+    entry, _ = cache.lookup(embedding, ("python", None))
+    assert cache.needs_refresh(entry)
+    entry.refreshing = True
+    assert not cache.needs_refresh(entry)
+
+    clock.now += 3600
+    assert cache.lookup(embedding, ("python", None)) is None
+    assert len(cache) == 0
+
+
+def test_refreshed_entry_replaces_the_old_one():
+    cache = _cache()
+    _store(cache, "best python ide", payload={"version": 1})
+    embedding = cache.embed_query("best python ide")
+    entry, _ = cache.lookup(embedding, ("python", None))
+
+    cache.store("best python ide", embedding, ("python", None), {"version": 2}, replaces=entry)
+
+    assert len(cache) == 1
+    assert cache.lookup(embedding, ("python", None))[0].payload == {"version": 2}
+
+
+def test_oldest_entries_are_evicted(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(query_cache.time, "monotonic", clock)
+    cache = _cache(max_size=2)
+    for query in ["best python ide", "python ide for beginners", "sourdough starter"]:
+        _store(cache, query)
+        clock.now += 1
+
+    assert len(cache) == 2
+    assert cache.lookup(cache.embed_query("best python ide"), ("python", None)) is None
+
+
+def test_zero_ttl_disables_caching():
+    cache = _cache(ttl=0)
+    _store(cache, "best python ide")
+
+    assert len(cache) == 0
+    assert np.isclose(np.linalg.norm(cache.embed_query("which python ide is best")), 1.0)
@@ -0,0 +1,71 @@
+import asyncio
+
+from app.utils.deadline import Deadline
+from app.utils.post import Post
+from app.utils.reddit_client import RedditClient, SearchPage, SubredditStream
+
+
+class FakeStream:
+    """A subreddit stream that returns one page, or never answers."""
+
+    def __init__(self, subreddit, posts=None, stall=False):
+        self.subreddit = subreddit
+        self.posts = posts or []
+        self.stall = stall
+        self.exhausted = False
+
+    async def next_page(self):
+        if self.stall:
+            await asyncio.sleep(3600)
+        self.exhausted = True
+        return self.posts
+
+    def can_improve(self, threshold):
+        return not self.exhausted and not self.stall
+
+
+def _post(post_id, score):
+    return Post(id=post_id, title=f"Post {post_id}", content="", author="someone",
+                subreddit="python", score=score, url="", created_at=0)
+
+
+def test_merge_streams_returns_partial_results_when_a_stream_stalls():
+    client = RedditClient.__new__(RedditClient)
+    deadline = Deadline(None)
+    streams = [
+        FakeStream("python", [_post("a", 10), _post("b", 5)]),
+        FakeStream("learnpython", stall=True)
+    ]
+
+    posts = asyncio.run(client._merge_streams(streams, limit=5, timeout=0.2, deadline=deadline))
+
+    assert [post.id for post in posts] == ["a", "b"]
+    assert deadline.truncated == ["reddit_fetch"]
+
+
+class FakeSearchClient:
+    """Serves prepared search pages and records the cursor each request used."""
+
+    def __init__(self, pages):
+        self.pages = list(pages)
+        self.afters = []
+
+    async def _search_backends(self, query, subreddit, limit, time_filter=None, sort="relevance", after=None):
+        self.afters.append(after)
+        return self.pages.pop(0)
+
+
+def test_subreddit_stream_pages_by_the_raw_listing_cursor():
+    # The listing's last item was filtered out, and one item short of a full page
+    client = FakeSearchClient([
+        SearchPage([_post("a", 10), _post("b", 5)], after="t3_c", raw_count=3),
+        SearchPage([_post("d", 3)], after=None, raw_count=1)
+    ])
+    stream = SubredditStream(client, "query", "python", limit=10, share=3, sort="top")
+
+    asyncio.run(stream.next_page())
+    assert not stream.exhausted
+    asyncio.run(stream.next_page())
+
+    assert client.afters == [None, "t3_c"]
+    assert stream.exhausted
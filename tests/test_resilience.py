@@ -0,0 +1,194 @@
+import asyncio
+
+from app.utils import reddit_client, resilience
+from app.utils.reddit_client import RedditClient, SearchPage
+from app.utils.resilience import CircuitBreaker, hedged
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _breaker(monkeypatch, **kwargs):
+    clock = FakeClock()
+    monkeypatch.setattr(resilience.time, "monotonic", clock)
+    options = dict(failure_rate=0.5, window=4, min_calls=2, reset_timeout=30, slow_call_seconds=1)
+    options.update(kwargs)
+    return CircuitBreaker("test", **options), clock
+
+
+async def _answer(value, delay=0.0):
+    await asyncio.sleep(delay)
+    return value
+
+
+async def _fail():
+    raise RuntimeError("backend down")
+
+
+def test_breaker_opens_then_half_opens_and_closes_after_a_good_trial(monkeypatch):
+    breaker, clock = _breaker(monkeypatch)
+
+    breaker.record(False, 0.1)
+    assert breaker.state == "closed"
+    breaker.record(False, 0.1)
+    assert breaker.state == "open"
+    assert not breaker.available()
+
+    clock.now += 30
+    assert breaker.state == "half_open"
+    assert breaker.available()
+
+    breaker._probing = True  # What call() does for the trial call
+    assert not breaker.available()
+    breaker.record(True, 0.1)
+    assert breaker.state == "closed"
+    assert breaker.failure_rate() == 0.0
+
+
+def test_failed_trial_keeps_the_breaker_open(monkeypatch):
+    breaker, clock = _breaker(monkeypatch)
+    breaker.record(False, 0.1)
+    breaker.record(False, 0.1)
+    clock.now += 30
+
+    breaker._probing = True
+    breaker.record(False, 0.1)
+
+    assert breaker.state == "open"
+    assert not breaker._probing
+
+
+def test_slow_calls_count_as_failures(monkeypatch):
+    breaker, _ = _breaker(monkeypatch)
+
+    breaker.record(True, 2.0)
+    breaker.record(True, 2.0)
+
+    assert breaker.state == "open"
+    assert breaker.latency_percentile() == 2.0
+
+
+def test_cancelled_trial_frees_the_probe(monkeypatch):
+    breaker, clock = _breaker(monkeypatch)
+    breaker.record(False, 0.1)
+    breaker.record(False, 0.1)
+    clock.now += 30
+
+    breaker._probing = True
+    breaker.cancelled(0.1)
+
+    assert breaker.state == "half_open"
+    assert breaker.available()
+
+
+def test_cancelled_slow_trial_reopens_the_breaker(monkeypatch):
+    breaker, clock = _breaker(monkeypatch)
+    breaker.record(False, 0.1)
+    breaker.record(False, 0.1)
+    clock.now += 30
+
+    breaker._probing = True
+    breaker.cancelled(5.0)
+
+    assert breaker.state == "open"
+
+
+def test_call_records_failures():
+    breaker = CircuitBreaker("test", failure_rate=0.5, window=4, min_calls=2, reset_timeout=30)
+
+    for _ in range(2):
+        try:
+            asyncio.run(breaker.call(_fail()))
+        except RuntimeError:
+            pass
+
+    assert breaker.state == "open"
+
+
+def test_hedged_returns_the_secondary_when_the_primary_is_slow():
+    cancelled = []
+
+    async def slow_primary():
+        try:
+            await asyncio.sleep(3600)
+        except asyncio.CancelledError:
+            cancelled.append("primary")
+            raise
+
+    result = asyncio.run(hedged(slow_primary, lambda: _answer(["scraped"]), delay=0.01))
+
+    assert result == ["scraped"]
+    assert cancelled == ["primary"]
+
+
+def test_hedged_starts_the_secondary_right_away_when_the_primary_fails():
+    started = []
+
+    def secondary():
+        started.append(asyncio.get_running_loop().time())
+        return _answer(["scraped"])
+
+    async def run():
+        began = asyncio.get_running_loop().time()
+        result = await hedged(_fail, secondary, delay=3600)
+        return result, started[0] - began
+
+    result, waited = asyncio.run(run())
+
+    assert result == ["scraped"]
+    assert waited < 1
+
+
+def test_hedged_returns_the_last_unaccepted_result():
+    result = asyncio.run(hedged(lambda: _answer([]), lambda: _answer([]), delay=3600))
+
+    assert result == []
+
+
+def _client():
+    client = RedditClient.__new__(RedditClient)
+    client.api_breaker = CircuitBreaker("reddit_api", slow_call_seconds=8)
+    client.scraping_breaker = CircuitBreaker("reddit_scraping")
+    client._search_with_api = lambda *args, **kwargs: _answer(SearchPage())
+    client._search_with_scraping = lambda *args, **kwargs: _answer(SearchPage())
+    return client
+
+
+def _hedge_delay(monkeypatch, client):
+    delays = []
+
+    async def fake_hedged(primary, secondary, delay, accept=bool):
+        delays.append(delay)
+        return SearchPage()
+
+    monkeypatch.setattr(reddit_client, "hedged", fake_hedged)
+    asyncio.run(client._search_backends("query", "python", 10))
+    return delays[0]
+
+
+def test_hedge_delay_follows_the_api_p95(monkeypatch):
+    monkeypatch.setattr(reddit_client, "REDDIT_HEDGE_MIN_DELAY", 0.5)
+    client = _client()
+    for latency in [1.0] * 19 + [3.0]:
+        client.api_breaker.record(True, latency)
+
+    assert _hedge_delay(monkeypatch, client) == 3.0
+
+
+def test_hedge_delay_without_latency_history_is_the_slow_call_threshold(monkeypatch):
+    monkeypatch.setattr(reddit_client, "REDDIT_HEDGE_MIN_DELAY", 0.5)
+
+    assert _hedge_delay(monkeypatch, _client()) == 8
+
+
+def test_hedge_delay_never_drops_below_the_minimum(monkeypatch):
+    monkeypatch.setattr(reddit_client, "REDDIT_HEDGE_MIN_DELAY", 0.5)
+    client = _client()
+    client.api_breaker.record(True, 0.01)
+
+    assert _hedge_delay(monkeypatch, client) == 0.5
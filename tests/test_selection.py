@@ -0,0 +1,33 @@
+import numpy as np
+
+from app.utils.selection import select_diverse
+
+# Two near-identical candidates and one pointing elsewhere
+EMBEDDINGS = np.array([[1.0, 0.0], [0.99, 0.01], [0.0, 1.0]])
+RELEVANCE = np.array([0.9, 0.85, 0.6])
+
+
+def test_without_diversity_picks_by_relevance():
+    assert select_diverse(EMBEDDINGS, RELEVANCE, [1, 1, 1], limit=2, token_budget=100, diversity=0.0) == [0, 1]
+
+
+def test_diversity_skips_near_duplicates():
+    assert select_diverse(EMBEDDINGS, RELEVANCE, [1, 1, 1], limit=2, token_budget=100, diversity=0.5) == [0, 2]
+
+
+def test_candidates_over_the_budget_are_skipped():
+    picked = select_diverse(EMBEDDINGS, RELEVANCE, [50, 60, 40], limit=3, token_budget=100, diversity=0.0)
+
+    assert picked == [0, 2]
+
+
+def test_best_candidate_is_picked_even_over_the_budget():
+    assert select_diverse(EMBEDDINGS, RELEVANCE, [500, 1, 1], limit=1, token_budget=100, diversity=0.0) == [0]
+
+
+def test_zero_vectors_and_empty_input():
+    embeddings = np.array([[0.0, 0.0], [1.0, 0.0]])
+
+    assert select_diverse(embeddings, np.array([0.5, 0.4]), [1, 1], limit=5, token_budget=100, diversity=0.3) == [0, 1]
+    assert select_diverse(np.zeros((0, 2)), np.array([]), [], limit=5, token_budget=100, diversity=0.3) == []
+    assert select_diverse(EMBEDDINGS, RELEVANCE, [1, 1, 1], limit=0, token_budget=100, diversity=0.3) == []
@@ -0,0 +1,84 @@
+from app.utils.post import Post
+from app.utils.simhash import SimHashIndex, drop_near_duplicates, hamming_distance, simhash
+
+TEXT = (
+    "How do I keep my sourdough starter alive while I am away on holiday for two weeks? "
+    "I have been feeding it every day with equal parts flour and water and it lives on the "
+    "counter in a glass jar. Should I put it in the fridge, dry some of it, or ask a neighbour "
+    "to feed it? Last time I left it alone for a week it smelled like nail polish remover."
+)
+OTHER = "Which GPU should I buy for training large language models at home on a budget this year"
+
+
+def _flip(signature, *bits):
+    for bit in bits:
+        signature ^= 1 << bit
+    return signature
+
+
+def _post(post_id, title, content="", crosspost_parent_id=None):
+    return Post(id=post_id, title=title, content=content, author="someone", subreddit="Sourdough",
+                score=1, url="", created_at=0, crosspost_parent_id=crosspost_parent_id)
+
+
+def test_short_texts_have_no_signature():
+    assert simhash("Help?") is None
+
+
+def test_similar_texts_have_close_signatures():
+    edited = TEXT + " Thanks!"
+
+    assert hamming_distance(simhash(TEXT), simhash(edited)) <= 6
+    assert hamming_distance(simhash(TEXT), simhash(OTHER)) > 6
+
+
+def test_find_matches_within_max_distance_in_any_band():
+    index = SimHashIndex(max_distance=3)
+    signature = simhash(TEXT)
+    index.add("a", signature)
+
+    # Three flipped bits land in different bands; at least one band still matches exactly
+    assert index.find(_flip(signature, 0, 20, 40)) == "a"
+    assert index.find(_flip(signature, 0, 1, 2, 3)) is None
+
+
+def test_find_skips_the_excluded_id():
+    index = SimHashIndex(max_distance=3)
+    signature = simhash(TEXT)
+    index.add("a", signature)
+
+    assert index.find(signature, exclude="a") is None
+
+    index.add("b", _flip(signature, 5))
+    assert index.find(signature, exclude="a") == "b"
+
+
+def test_readding_an_id_replaces_its_signature():
+    index = SimHashIndex(max_distance=3)
+    signature = simhash(TEXT)
+    index.add("a", signature)
+    index.add("a", _flip(signature, *range(0, 64, 2)))
+
+    assert index.find(signature) is None
+    assert len(index) == 1
+
+
+def test_persistent_index_is_read_back(tmp_path):
+    path = str(tmp_path / "simhash.log")
+    signature = simhash(TEXT)
+    SimHashIndex(path, max_distance=3).add_many([("a", signature), ("b", None)])
+
+    reloaded = SimHashIndex(path, max_distance=3)
+
+    assert reloaded.signatures() == {"a": signature}
+
+
+def test_drop_near_duplicates_keeps_the_first_of_each_group():
+    posts = [
+        _post("a", TEXT),
+        _post("b", "EDIT: solved. " + TEXT),
+        _post("c", OTHER),
+        _post("d", "Totally different title", crosspost_parent_id="c")
+    ]
+
+    assert [post.id for post in drop_near_duplicates(posts, max_distance=6)] == ["a", "c"]
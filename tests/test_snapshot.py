@@ -0,0 +1,95 @@
+import os
+
+import numpy as np
+import pytest
+
+from app.utils.snapshot import EMBEDDINGS_FILE, Snapshot, SnapshotWriter
+
+
+def _write(path, pages):
+    writer = SnapshotWriter(path)
+    for page in pages:
+        writer.append(*page)
+    return writer.close({"embedding_backend": "test"})
+
+
+def test_roundtrip_keeps_ids_embeddings_documents_and_metadata(tmp_path):
+    path = str(tmp_path / "snapshot")
+    embeddings = np.arange(12, dtype=np.float32).reshape(4, 3)
+    metadatas = [
+        {"subreddit": "python", "score": 10, "ratio": 0.9, "is_self": True, "flair": "Help"},
+        {"subreddit": "rust", "score": -2, "ratio": 0.5, "is_self": False},
+        {"subreddit": "Python", "score": 0, "ratio": 1.0, "is_self": True, "flair": "Ünïcode ✓"},
+        {}
+    ]
+    documents = ["first", "second", "", "fourth"]
+    manifest = _write(path, [
+        (["a", "b"], embeddings[:2], documents[:2], metadatas[:2]),
+        (["c", "d"], embeddings[2:], documents[2:], metadatas[2:])
+    ])
+
+    snapshot = Snapshot(path, verify=True)
+    (ids, vectors, docs, metas), = list(snapshot.batches(10))
+
+    assert manifest["count"] == 4 and manifest["dim"] == 3
+    assert snapshot.manifest["embedding_backend"] == "test"
+    assert ids == ["a", "b", "c", "d"]
+    assert np.array_equal(vectors, embeddings)
+    assert docs == documents
+    assert metas == metadatas
+    assert type(metas[0]["score"]) is int and type(metas[0]["is_self"]) is bool
+
+
+def test_mixed_type_column_keeps_each_value_type(tmp_path):
+    path = str(tmp_path / "snapshot")
+    metadatas = [{"value": 1}, {"value": "one"}, {"value": 1.5}, {"value": False}, {}]
+    _write(path, [(list("abcde"), np.zeros((5, 2)), [""] * 5, metadatas)])
+
+    (_, _, _, metas), = list(Snapshot(path).batches(10))
+
+    assert metas == metadatas
+    assert [type(meta.get("value")) for meta in metas] == [int, str, float, bool, type(None)]
+
+
+def test_batches_split_rows(tmp_path):
+    path = str(tmp_path / "snapshot")
+    _write(path, [([str(i) for i in range(5)], np.ones((5, 2)), [""] * 5, [{"n": i} for i in range(5)])])
+
+    batches = list(Snapshot(path).batches(2))
+
+    assert [ids for ids, _, _, _ in batches] == [["0", "1"], ["2", "3"], ["4"]]
+
+
+def test_empty_snapshot(tmp_path):
+    path = str(tmp_path / "snapshot")
+    _write(path, [])
+
+    assert list(Snapshot(path, verify=True).batches(10)) == []
+
+
+def test_new_snapshot_replaces_the_old_one(tmp_path):
+    path = str(tmp_path / "snapshot")
+    _write(path, [(["old"], np.ones((1, 2)), [""], [{}])])
+    _write(path, [(["new"], np.ones((1, 2)), [""], [{}])])
+
+    assert Snapshot(path).ids == ["new"]
+    assert sorted(os.listdir(tmp_path)) == ["snapshot"]
+
+
+def test_changed_dimension_is_rejected(tmp_path):
+    writer = SnapshotWriter(str(tmp_path / "snapshot"))
+    writer.append(["a"], np.ones((1, 2)), [""], [{}])
+
+    with pytest.raises(ValueError):
+        writer.append(["b"], np.ones((1, 3)), [""], [{}])
+    writer.abort()
+
+
+def test_verify_detects_corruption(tmp_path):
+    path = str(tmp_path / "snapshot")
+    _write(path, [(["a"], np.ones((1, 2)), [""], [{}])])
+    with open(os.path.join(path, EMBEDDINGS_FILE), "r+b") as f:
+        f.write(b"\x00\x00\x00\x00")
+
+    with pytest.raises(ValueError):
+        Snapshot(path, verify=True)